@@ -25,7 +25,7 @@ import {
 
 import { columns } from "./data";
 import { FaEdit, FaPlus, FaSearch, FaTrashAlt } from "react-icons/fa";
-import { deleteProduct, getAllProducts, getMySellerProducts } from "@/lib/api/products";
+import { deleteProduct, getMySellerProducts, getProducts } from "@/lib/api/products";
 import { useRouter } from "next/navigation";
 import { useAppStore } from "@/store/store";
 
@@ -70,6 +70,8 @@ export default function Page() {
 
   const headerColumns = columns;
   const [products, setProducts] = useState<Product[]>([]);
+  // Cursor of the next page of the admin listing; undefined once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
   const { isOpen, onOpen, onClose } = useDisclosure();
   const [deleteId, setdeleteId] = useState<string | undefined>(undefined);
   const { setToast } = useAppStore();
@@ -89,16 +91,28 @@ export default function Page() {
       } catch (e) {
         // ignore and fallback
       }
-      const response = await getAllProducts();
-      if (response) {
+      const page = await getProducts();
+      if (page) {
         setProducts(
-          response.map((p: any) => ({ ...p, _count: p._count || { order: 0 } }))
+          page.items.map((p: any) => ({ ...p, _count: p._count || { order: 0 } }))
         );
+        setNextCursor(page.nextCursor);
       }
     };
     fetchProducts();
   }, []);
 
+  const loadMore = React.useCallback(async () => {
+    const page = await getProducts(nextCursor);
+    if (page) {
+      setProducts((prev) => [
+        ...prev,
+        ...page.items.map((p: any) => ({ ...p, _count: p._count || { order: 0 } })),
+      ]);
+      setNextCursor(page.nextCursor);
+    }
+  }, [nextCursor]);
+
   const handleDelete = React.useCallback(
     (product: Product) => {
       if ((product._count?.order ?? 0) > 0) {
@@ -259,8 +273,13 @@ export default function Page() {
           </div>
         </div>
         <div className="flex justify-between items-center">
-          <span className="text-default-400 text-small">
-            Total {products.length} products
+          <span className="flex items-center gap-3 text-default-400 text-small">
+            {nextCursor ? `First ${products.length}` : `Total ${products.length}`} products
+            {nextCursor && (
+              <Button size="sm" variant="flat" onPress={loadMore}>
+                Load more
+              </Button>
+            )}
           </span>
           <label className="flex items-center text-default-400 text-small">
             Rows per page:
@@ -280,6 +299,8 @@ export default function Page() {
     filterValue,
     onSearchChange,
     products.length,
+    nextCursor,
+    loadMore,
     onRowsPerPageChange,
     onClear,
     router,
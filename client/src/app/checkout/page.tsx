@@ -17,9 +17,11 @@ const Page = () => {
   const router = useRouter();
   const [isCod, setisCod] = useState(false);
   const [orderCreated, setOrderCreated] = useState(false);
+  // One key per checkout so re-runs of the effect and retries don't create duplicate orders
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
   useEffect(() => {
     const handleCreateOrder = async () => {
-      const response = await createOrder(ordersInfo);
+      const response = await createOrder(ordersInfo, idempotencyKey);
 
       if (
         ordersInfo.status.paymentMode === "stripe" &&
@@ -39,7 +41,7 @@ const Page = () => {
       setToast("Please add product in cart.");
       router.push("/");
     }
-  }, [ordersInfo, emptyCart, router, setToast]);
+  }, [ordersInfo, emptyCart, router, setToast, idempotencyKey]);
 
   const appearance = {};
   const options = {};
@@ -75,14 +75,28 @@ export default function Page() {
 
   const { userInfo } = useAppStore();
   const [orders, setOrders] = useState<OrdersType[]>([]);
+  // Cursor of the next page of orders; undefined once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
   useEffect(() => {
     const getOrders = async () => {
-      const response = await getUserOrders(userInfo.id);
-      setOrders(response.reverse());
+      // One page, newest first; more are loaded on request
+      const page = await getUserOrders(userInfo.id);
+      if (page) {
+        setOrders(page.items);
+        setNextCursor(page.nextCursor);
+      }
     };
     if (userInfo) getOrders();
   }, [userInfo]);
 
+  const loadMore = React.useCallback(async () => {
+    const page = await getUserOrders(userInfo.id, nextCursor);
+    if (page) {
+      setOrders((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    }
+  }, [userInfo, nextCursor]);
+
   const headerColumns = columns;
 
   const filteredItems = React.useMemo(() => {
@@ -222,8 +236,13 @@ export default function Page() {
           />
         </div>
         <div className="flex justify-between items-center">
-          <span className="text-default-400 text-small">
-            Total {orders.length} Orders
+          <span className="flex items-center gap-3 text-default-400 text-small">
+            {nextCursor ? `Latest ${orders.length}` : `Total ${orders.length}`} Orders
+            {nextCursor && (
+              <Button size="sm" variant="flat" onPress={loadMore}>
+                Load more
+              </Button>
+            )}
           </span>
           <label className="flex items-center text-default-400 text-small">
             Rows per page:
@@ -243,6 +262,8 @@ export default function Page() {
     filterValue,
     onSearchChange,
     orders.length,
+    nextCursor,
+    loadMore,
     onRowsPerPageChange,
     onClear,
   ]);
@@ -4,7 +4,7 @@ import { HomeCards } from "@/components/client/home-cards";
 import { HomeCarousels } from "@/components/client/home-carousels";
 import { PrimeVideo } from "@/components/client/prime-video";
 import { ProductGrid } from "@/components/client/product-grid";
-import { getAllProducts } from "@/lib/api/products";
+import { getProducts } from "@/lib/api/products";
 import { useAppStore } from "@/store/store";
 import { useEffect, useState } from "react";
 
@@ -13,9 +13,10 @@ export default function Home() {
   const { setToast } = useAppStore();
   useEffect(() => {
     const fetchProducts = async () => {
-      const response = await getAllProducts();
-      if (response) {
-        setProducts(response);
+      // The first page is plenty for the home page grids
+      const page = await getProducts();
+      if (page) {
+        setProducts(page.items);
       }
     };
     fetchProducts();
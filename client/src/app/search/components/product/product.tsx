@@ -65,7 +65,7 @@ const Product = ({ productDetails }: { productDetails: ProductType }) => {
           </div>
           <div className="text-sm mb-1">Save extra with no cost EMI</div>
           <div className="text-sm mb-3">Get it by {deliveryDate}¸</div>
-          <Colors colors={productDetails.colors} />
+          <Colors colors={productDetails.colors ?? []} />
         </div>
         <div className="flex gap-2 w-full">
           <button
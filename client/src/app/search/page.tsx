@@ -6,26 +6,41 @@ import { BiRepeat } from "react-icons/bi";
 import { useSearchParams } from "next/navigation";
 import { getSearchResults } from "@/lib/api/search";
 import { ProductType } from "@/utils/types";
+import { Button } from "@/components/ui/nextui-shim";
 
 const Page = () => {
   const searchParams = useSearchParams();
   const searchTerm = searchParams.get("query");
   const category = searchParams.get("category");
   const [products, setProducts] = useState<ProductType[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
   useEffect(() => {
     const getProducts = async () => {
-      const response: ProductType[] = await getSearchResults(
-        searchTerm as string,
-        category ?? ""
-      );
+      const page = await getSearchResults(searchTerm as string, category ?? "");
 
-      setProducts(response ?? []);
+      setProducts(page?.items ?? []);
+      setNextCursor(page?.nextCursor);
     };
     if (searchTerm || category) {
       getProducts();
     }
   }, [searchTerm, category]);
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    const page = await getSearchResults(
+      searchTerm as string,
+      category ?? "",
+      nextCursor
+    );
+    if (page) {
+      setProducts((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    }
+    setLoadingMore(false);
+  };
+
   return (
     <div className="grid mt-5" style={{ gridTemplateColumns: "15% 85%" }}>
       <Filters />
@@ -40,6 +55,13 @@ const Page = () => {
             <Product key={product.id} productDetails={product} />
           ))}
         </div>
+        {nextCursor && (
+          <div className="flex justify-center pb-10">
+            <Button variant="flat" isLoading={loadingMore} onPress={loadMore}>
+              Load more results
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
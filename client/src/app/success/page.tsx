@@ -1,5 +1,4 @@
 "use client";
-import { recordStripePayment } from "@/lib/api/orders";
 import { useAppStore } from "@/store/store";
 import { useRouter, useSearchParams } from "next/navigation";
 import React, { useEffect } from "react";
@@ -11,11 +10,8 @@ const Page = () => {
   const paymentIntent = searchParams.get("payment_intent");
 
   useEffect(() => {
-    const updateOrderInfo = async () => {
-      const response = await recordStripePayment(paymentIntent as string);
-    };
+    // The order is marked paid by the server's Stripe webhook
     if (paymentIntent) {
-      updateOrderInfo();
       emptyCart();
       setTimeout(() => router.push("/my-orders"), 3000);
     }
@@ -71,5 +71,27 @@ export const patch = axios.patch;
 export const post = axios.post;
 export const axiosDelete = axios.delete;
 
+// -----------------------------------------------------------------------------
+// Cursor pagination: list endpoints return one page and put the token for the
+// next one in the X-Next-Cursor header. getPage fetches a single page and hands
+// the token back, so screens load more only when the user asks for it.
+// -----------------------------------------------------------------------------
+export type Page<T> = { items: T[]; nextCursor?: string };
+
+export const getPage = async <T = any>(
+  endpoint: string,
+  cursor?: string,
+  limit?: number
+): Promise<Page<T>> => {
+  const url = new URL(createUrl(endpoint));
+  if (limit) url.searchParams.set("limit", String(limit));
+  if (cursor) url.searchParams.set("cursor", cursor);
+  const response = await get(url.toString());
+  return {
+    items: response.data ?? [],
+    nextCursor: response.headers["x-next-cursor"] || undefined,
+  };
+};
+
 // Expose base URL for debugging if needed
 export const API_BASE_URL = apiUrl;
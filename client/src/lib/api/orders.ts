@@ -1,55 +1,37 @@
 import { AxiosError, AxiosResponse } from "axios";
-import { createUrl, get, patch, post } from "./api-client";
+import { createUrl, get, getPage, patch, post } from "./api-client";
 import qs from "qs";
 
-export const createOrder = async (orders: any) => {
+export const createOrder = async (orders: any, idempotencyKey?: string) => {
   try {
-    const response = await post(createUrl("/api/orders"), { ...orders });
+    const response = await post(
+      createUrl("/api/orders"),
+      { ...orders },
+      idempotencyKey ? { headers: { "Idempotency-Key": idempotencyKey } } : undefined
+    );
     return response.data;
   } catch (error) {
     console.log(error);
   }
 };
 
-export const getAllOrders = async () => {
+// One page of orders, newest first; pass the returned nextCursor for the next one
+export const getAllOrders = async (cursor?: string) => {
   try {
-    const response = await get(createUrl("/api/orders"));
-    return response.data;
+    return await getPage("/api/orders", cursor);
   } catch (error) {
     console.log(error);
   }
 };
 
-export const recordStripePayment = async (paymnent_intent: string) => {
-  try {
-    const query = qs.stringify({
-      where: {
-        paymentIntent: paymnent_intent,
-      },
-    });
-    const response = await get(createUrl(`/api/orders?${query}`));
-
-    if (response.data.length) {
-      const updateResponse = await patch(
-        createUrl(`/api/orders/${response.data[0].id}`),
-        { paymentStatus: true }
-      );
-      return updateResponse;
-    }
-  } catch (error) {
-    return error;
-  }
-};
-
-export const getUserOrders = async (userId: string) => {
+export const getUserOrders = async (userId: string, cursor?: string) => {
   try {
     const query = qs.stringify({
       where: {
         user: { id: userId },
       },
     });
-    const response = await get(createUrl(`/api/orders?${query}`));
-    return response.data;
+    return await getPage(`/api/orders?${query}`, cursor);
   } catch (error) {
     console.log({ error });
   }
@@ -1,5 +1,5 @@
 import { AxiosError, AxiosResponse } from "axios";
-import { createUrl, post, get, axiosDelete, patch } from "./api-client";
+import { createUrl, post, get, axiosDelete, patch, getPage } from "./api-client";
 
 export const addProduct = async (data: any) => {
   try {
@@ -19,12 +19,10 @@ export const updateProduct = async (data: any, id: string) => {
   }
 };
 
-export const getAllProducts = async () => {
+// One page of the listing; pass the returned nextCursor to get the following one
+export const getProducts = async (cursor?: string) => {
   try {
-    const response = await get(createUrl("/api/products"));
-    if (response.data) {
-      return response.data;
-    }
+    return await getPage("/api/products", cursor);
   } catch (error) {
     console.log(error);
   }
@@ -1,18 +1,17 @@
 import qs from "qs";
-import { createUrl, get } from "./api-client";
+import { getPage } from "./api-client";
 
 export const getSearchResults = async (
   searchTerm: string,
-  category: string
+  category: string,
+  cursor?: string
 ) => {
   try {
     let query;
     if (searchTerm && searchTerm.length > 0) {
-      query = qs.stringify({
-        where: {
-          title: { contains: searchTerm },
-        },
-      });
+      // Ranked full-text search (title + description, prefix matching)
+      query = qs.stringify({ q: searchTerm, category: category || undefined });
+      return await getPage(`/api/search?${query}`, cursor);
     } else if (category && category.length > 0) {
       query = qs.stringify({
         where: {
@@ -21,10 +20,8 @@ export const getSearchResults = async (
       });
     }
 
-    const response = await get(createUrl(`/api/products?${query}`));
-    if (response.data) {
-      return response.data;
-    }
+    // One page; pass the returned nextCursor for the next one
+    return await getPage(`/api/products?${query}`, cursor);
   } catch (error) {
     console.log(error);
   }
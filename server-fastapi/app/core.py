@@ -7,6 +7,15 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
 
 
+def _with_psycopg(url: str) -> str:
+    # If user provided a generic postgresql:// URL, upgrade to psycopg driver
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql+psycopg://", 1)
+    elif url.startswith("postgresql://") and "+" not in url.split("://", 1)[1]:
+        url = url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=str(ENV_PATH), case_sensitive=False, extra="ignore")
     PORT: int = 3000
@@ -17,10 +26,57 @@ class Settings(BaseSettings):
     DB_NAME: str = "postgres"
     DB_HOST: str = "localhost"
     DB_PORT: int = 5432
+    # Optional read replica for read-only catalog handlers (db/replica.py); a user's reads
+    # go to the primary for READ_YOUR_WRITES_SECONDS after their own write
+    DATABASE_READ_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: int = 5
+    # Async handlers use an AsyncSession (psycopg async); false runs them on the sync engine
+    DB_ASYNC: bool = True
+    # Connection pooling (db/pool.py): auto | server | lambda | external (RDS Proxy, pgbouncer);
+    # unset knobs take the profile's defaults
+    DB_POOL_PROFILE: str = "auto"
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: Optional[float] = None
+    DB_POOL_RECYCLE: Optional[int] = None
+    DB_POOL_PRE_PING: Optional[bool] = None
+    # Per-request SQL stats (db/instrumentation.py): Server-Timing header and a log line;
+    # a statement repeated QUERY_REPEAT_THRESHOLD times is reported as a suspected N+1.
+    # QUERY_BUDGET_STRICT (tests/CI) turns requests over QUERY_BUDGET statements into 500s
+    QUERY_STATS: bool = True
+    QUERY_REPEAT_THRESHOLD: int = 5
+    QUERY_BUDGET: Optional[int] = None
+    QUERY_BUDGET_STRICT: bool = False
+    # Seconds /api/_health/ready reuses its last database check
+    READY_CHECK_TTL: float = 5.0
     JWT_SECRET_KEY: str = "changeme"
     JWT_EXPIRATION: int = 3600
+    # How long verified tokens and users' token versions are trusted without a DB check
+    AUTH_CACHE_TTL: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # bcrypt cost (log2 rounds); existing hashes are upgraded on login when it changes
     BCRYPT_SALT: int = 12
+    # Hashing pool (utils/passwords.py): threads (default min(4, CPUs)) and waiting requests
+    BCRYPT_WORKERS: Optional[int] = None
+    BCRYPT_QUEUE_LIMIT: int = 32
     STRIPE_SECRET_KEY: Optional[str] = None
+    # Override the Stripe API host (e.g. http://localhost:12111 for stripe-mock)
+    STRIPE_API_BASE: Optional[str] = None
+    STRIPE_CONNECT_TIMEOUT: float = 3.0
+    STRIPE_READ_TIMEOUT: float = 10.0
+    STRIPE_MAX_RETRIES: int = 2
+    # Signing secret of the /api/webhooks/stripe endpoint (whsec_...)
+    STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_FLUSH_MS: int = 200
+    # Catalog read cache: "memory" (per process), "redis" (shared, needs REDIS_URL) or "none"
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL: int = 60
+    CACHE_MAX_ENTRIES: int = 2048
+    REDIS_URL: Optional[str] = None
+    # Idempotency-Key retention, and how long an unfinished request holds its key
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
 
     @property
     def database_url(self) -> str:
@@ -31,12 +87,12 @@ class Settings(BaseSettings):
                 f"postgresql+psycopg://{self.DB_USER}:{self.DB_PASSWORD}"
                 f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
             )
-        # If user provided a generic postgresql:// URL, upgrade to psycopg driver
-        if url.startswith("postgres://"):
-            url = url.replace("postgres://", "postgresql+psycopg://", 1)
-        elif url.startswith("postgresql://") and "+" not in url.split("://", 1)[1]:
-            url = url.replace("postgresql://", "postgresql+psycopg://", 1)
-        return url
+        return _with_psycopg(url)
+
+    @property
+    def database_read_url(self) -> str:
+        """The replica URL for read-only handlers; the primary when no replica is configured."""
+        return _with_psycopg(self.DATABASE_READ_URL) if self.DATABASE_READ_URL else self.database_url
 
     @property
     def access_token_expires(self) -> timedelta:
@@ -1,15 +1,80 @@
+"""Engines and sessions.
+
+Two ways to reach the database coexist while routers migrate to async:
+
+- ``engine`` / ``SessionLocal`` / ``get_db``: the sync engine, used by sync handlers,
+  CLIs and background threads. Each in-flight sync request holds a threadpool thread.
+- ``get_session`` + ``run_db``: for ``async def`` handlers. With ``DB_ASYNC`` on (the
+  default) the session is an ``AsyncSession`` on the psycopg async driver and ``run_db``
+  runs the handler's ORM code via ``AsyncSession.run_sync``: on the event loop, awaiting
+  the driver instead of blocking a thread. With ``DB_ASYNC=false`` the same handlers
+  get a sync session and ``run_db`` falls back to the threadpool.
+
+Code passed to ``run_db`` should return plain data (schemas, dicts), not ORM objects
+whose lazy attributes would be loaded after it returns.
+
+Both engines pool connections according to ``DB_POOL_PROFILE`` (see ``db.pool``).
+With ``DATABASE_READ_URL`` set, a second pair of engines reaches the replica; handlers
+opt in through ``db.replica.get_read_session``. Without it the read engines are the
+primary ones.
+"""
+from typing import Any, AsyncIterator, Callable, TypeVar, Union
+
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from sqlalchemy import inspect
 from core import settings
+from db.pool import PoolMonitor, engine_options, resolve_profile
+
+T = TypeVar("T")
 
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+pool_profile = resolve_profile()
+
+engine = create_engine(settings.database_url, **engine_options(pool_profile))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# postgresql+psycopg resolves to psycopg's async dialect on an async engine
+async_engine = (
+    create_async_engine(settings.database_url, **engine_options(pool_profile, is_async=True)) if settings.DB_ASYNC else None
+)
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(settings.database_read_url, **engine_options(pool_profile))
+    async_read_engine = (
+        create_async_engine(settings.database_read_url, **engine_options(pool_profile, is_async=True))
+        if settings.DB_ASYNC
+        else None
+    )
+else:
+    read_engine, async_read_engine = engine, async_engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+AsyncReadSessionLocal = (
+    async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+    if async_read_engine is not None
+    else None
+)
+
+pool_monitors = [PoolMonitor("sync", engine, pool_profile)]
+if async_engine is not None:
+    pool_monitors.append(PoolMonitor("async", async_engine.sync_engine, pool_profile))
+if read_engine is not engine:
+    pool_monitors.append(PoolMonitor("sync-read", read_engine, pool_profile))
+    if async_read_engine is not None:
+        pool_monitors.append(PoolMonitor("async-read", async_read_engine.sync_engine, pool_profile))
+
+DBSession = Union[Session, AsyncSession]
+
 
 def get_db():
     db = SessionLocal()
@@ -19,8 +84,33 @@ def get_db():
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for async handlers; the session type follows DB_ASYNC
+get_session = get_async_db if settings.DB_ASYNC else get_db
+
+
+async def run_db(db: DBSession, fn: Callable[..., T], *args: Any) -> T:
+    """Run ``fn(session, *args)`` (sync ORM code) without tying up a worker thread."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+
+def pool_stats() -> list:
+    """Live pool gauges and connection counters of this process's engines."""
+    return [m.stats() for m in pool_monitors]
+
+
 def ensure_schema() -> None:
-    """Create DB tables if they do not exist. Safe to call multiple times."""
+    """Create DB tables if they do not exist. Safe to call multiple times.
+
+    For throwaway development databases only; real schemas (including indexes created
+    CONCURRENTLY) are managed by ``alembic upgrade head``.
+    """
     # Import models to register all tables with Base.metadata
     from db import models  # noqa: F401
 
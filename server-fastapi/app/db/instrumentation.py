@@ -0,0 +1,162 @@
+"""Per-request SQL statistics: statement count, DB time, pool wait, suspected N+1.
+
+``QueryStatsMiddleware`` opens a ``RequestQueries`` for every HTTP request in a
+context variable. Engine events (all engines, sync and async) add each statement's
+execution time, and the pools built by ``db.pool`` add the time spent waiting for a
+connection (including opening a new one). Threadpool workers and ``run_sync``
+greenlets inherit the context, so sync and async handlers are both covered; work on
+other threads (the payment event worker) is not attributed to any request.
+
+When the response starts the middleware:
+
+- adds ``Server-Timing: db;dur=..;desc="N queries", pool;dur=.., app;dur=..``;
+- logs one JSON line on the ``db.instrumentation`` logger (WARNING when a statement
+  ran ``QUERY_REPEAT_THRESHOLD`` or more times, which usually means a lazy load in a
+  loop, i.e. N+1);
+- with ``QUERY_BUDGET_STRICT``, replaces the response with a 500 when the request ran
+  more than ``QUERY_BUDGET`` statements. Meant for tests and CI, not production.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core import settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["RequestQueries"]] = ContextVar("request_queries", default=None)
+
+
+class RequestQueries:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_seconds = 0.0
+        self.pool_seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def suspected_n_plus_one(self) -> List[dict]:
+        return [
+            {"statement": stmt[:300], "count": n}
+            for stmt, n in self.statements.most_common()
+            if n >= settings.QUERY_REPEAT_THRESHOLD
+        ]
+
+    def over_budget(self) -> bool:
+        return settings.QUERY_BUDGET is not None and self.count > settings.QUERY_BUDGET
+
+    def server_timing(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        return ", ".join(
+            [
+                f'db;dur={self.db_seconds * 1000:.1f};desc="{self.count} queries"',
+                f"pool;dur={self.pool_seconds * 1000:.1f}",
+                f"app;dur={elapsed * 1000:.1f}",
+            ]
+        )
+
+
+def current() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_seconds += seconds
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    stats.db_seconds += time.perf_counter() - started.pop()
+    stats.count += 1
+    # Same SQL text, different parameters: the signature of a query issued in a loop
+    stats.statements[statement] += 1
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestQueries()
+        token = _current.set(stats)
+        replaced = False
+
+        async def send_with_stats(message):
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                _log(scope, message["status"], stats)
+                if settings.QUERY_BUDGET_STRICT and stats.over_budget():
+                    replaced = True
+                    await _send_budget_error(send, stats)
+                    return
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+
+
+def _log(scope, status: int, stats: RequestQueries) -> None:
+    suspects = stats.suspected_n_plus_one()
+    line = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "queries": stats.count,
+        "dbMs": round(stats.db_seconds * 1000, 1),
+        "poolMs": round(stats.pool_seconds * 1000, 1),
+        "totalMs": round((time.perf_counter() - stats.started) * 1000, 1),
+    }
+    if suspects:
+        line["suspectedNPlusOne"] = suspects
+    if stats.over_budget():
+        line["overBudget"] = settings.QUERY_BUDGET
+    logger.log(logging.WARNING if suspects or stats.over_budget() else logging.INFO, json.dumps(line))
+
+
+async def _send_budget_error(send, stats: RequestQueries) -> None:
+    body = json.dumps(
+        {
+            "detail": f"Query budget exceeded: {stats.count} statements > {settings.QUERY_BUDGET}",
+            "suspectedNPlusOne": stats.suspected_n_plus_one(),
+        }
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"server-timing", stats.server_timing().encode("latin-1")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
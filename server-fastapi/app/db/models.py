@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Float, ForeignKey, Integer, UniqueConstraint
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, String, Date, DateTime, Boolean, Float, ForeignKey, Index, Integer, REAL, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from datetime import datetime
+from datetime import date, datetime
 from db.database import Base
 
 
@@ -15,7 +15,9 @@ class User(Base):
     username: Mapped[str] = mapped_column(String, unique=True)
     password: Mapped[str] = mapped_column(String)
     roles = mapped_column(JSONB)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Embedded in issued JWTs; bumping it invalidates every token issued before
+    tokenVersion: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
 
     orders = relationship("Order", back_populates="user")
     reviews = relationship("Review", back_populates="user")
@@ -26,13 +28,21 @@ class Category(Base):
     id: Mapped[str] = mapped_column(String, primary_key=True)
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     name: Mapped[str] = mapped_column(String)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     products = relationship("Product", back_populates="category")
 
 
 class Product(Base):
     __tablename__ = "Product"
+    __table_args__ = (
+        # Keyset pagination orderings used by GET /api/products
+        Index("Product_createdAt_id_idx", "createdAt", "id"),
+        Index("Product_discountPrice_id_idx", "discountPrice", "id"),
+        Index("Product_title_id_idx", "title", "id"),
+        Index("Product_categoryId_createdAt_id_idx", "categoryId", "createdAt", "id"),
+        Index("Product_searchVector_idx", "searchVector", postgresql_using="gin"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True)
     categoryId: Mapped[str] = mapped_column(String, ForeignKey("Category.id"))
     colors = mapped_column(JSONB)
@@ -42,8 +52,10 @@ class Product(Base):
     images = mapped_column(JSONB)
     salePrice: Mapped[float] = mapped_column(Float)
     title: Mapped[str] = mapped_column(String)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     variants = mapped_column(JSONB)
+    # Maintained by a DB trigger (see utils/search.py); deferred so normal loads skip it
+    searchVector = mapped_column(TSVECTOR, nullable=True, deferred=True)
 
     category = relationship("Category", back_populates="products")
     order = relationship("Order", secondary="_OrderToProduct", back_populates="products")
@@ -53,11 +65,17 @@ class Product(Base):
 
 class Review(Base):
     __tablename__ = "Review"
+    __table_args__ = (
+        # One review per user and product; also the duplicate check on create
+        Index("Review_productId_userId_key", "productId", "userId", unique=True),
+        # Keyset pagination of GET /api/reviews/product/{id}
+        Index("Review_productId_createdAt_id_idx", "productId", "createdAt", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True)
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     description: Mapped[str] = mapped_column(String)
     rating: Mapped[int] = mapped_column(Integer)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     productId: Mapped[str | None] = mapped_column(String, ForeignKey("Product.id"), nullable=True)
     userId: Mapped[str | None] = mapped_column(String, ForeignKey("User.id"), nullable=True)
@@ -66,14 +84,88 @@ class Review(Base):
     user = relationship("User", back_populates="reviews")
 
 
+class ProductRating(Base):
+    """Review aggregate per product, updated in the transaction of every review write.
+
+    Products without reviews have no row. ``python -m utils.reviews rebuild`` recomputes
+    the rows from ``Review`` if they ever drift.
+    """
+    __tablename__ = "ProductRating"
+    productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True)
+    reviewCount: Mapped[int] = mapped_column(Integer, default=0)
+    ratingSum: Mapped[int] = mapped_column(Integer, default=0)
+    # Histogram: number of reviews with 1..5 stars
+    stars1: Mapped[int] = mapped_column(Integer, default=0)
+    stars2: Mapped[int] = mapped_column(Integer, default=0)
+    stars3: Mapped[int] = mapped_column(Integer, default=0)
+    stars4: Mapped[int] = mapped_column(Integer, default=0)
+    stars5: Mapped[int] = mapped_column(Integer, default=0)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RelatedProduct(Base):
+    """Products most often bought together with ``productId``, best first (utils/related.py).
+
+    One row per product with its top-K neighbours as parallel arrays, so serving a list
+    is a single primary-key lookup.
+    """
+    __tablename__ = "RelatedProduct"
+    productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True)
+    relatedIds = mapped_column(ARRAY(String))
+    scores = mapped_column(ARRAY(REAL))
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ProductSalesDaily(Base):
+    """Units sold and revenue per product and (UTC) order day, rolled up by utils/sales.py."""
+    __tablename__ = "ProductSalesDaily"
+    # Days leaving the bestseller window are read back by day
+    __table_args__ = (Index("ProductSalesDaily_day_idx", "day"),)
+    productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    units: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[float] = mapped_column(Float, default=0)
+
+
+class ProductSalesRank(Base):
+    """Sales ranking keys per product for GET /api/products?sort=bestselling|trending.
+
+    Derived from ``ProductSalesDaily`` by utils/sales.py. ``categoryId`` is a copy of the
+    product's, so each ranking has an index per category as well as overall.
+    """
+    __tablename__ = "ProductSalesRank"
+    __table_args__ = (
+        Index("ProductSalesRank_recentUnits_productId_idx", "recentUnits", "productId"),
+        Index("ProductSalesRank_categoryId_recentUnits_productId_idx", "categoryId", "recentUnits", "productId"),
+        Index("ProductSalesRank_trendScore_productId_idx", "trendScore", "productId"),
+        Index("ProductSalesRank_categoryId_trendScore_productId_idx", "categoryId", "trendScore", "productId"),
+    )
+    productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True)
+    categoryId: Mapped[str] = mapped_column(String, nullable=True)
+    # Units sold in the bestseller window (the last utils.sales.WINDOW_DAYS days)
+    recentUnits: Mapped[int] = mapped_column(Integer, default=0)
+    # Log of the time-decayed units sold; 0 for products that never sold
+    trendScore: Mapped[float] = mapped_column(Float, default=0)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class JobCheckpoint(Base):
+    """How far an incremental batch job has consumed orders (by Order.createdAt)."""
+    __tablename__ = "JobCheckpoint"
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    position: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Comment(Base):
     __tablename__ = "Comment"
+    __table_args__ = (Index("Comment_productId_createdAt_id_idx", "productId", "createdAt", "id"),)
     id: Mapped[str] = mapped_column(String, primary_key=True)
     productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id"))
     userId: Mapped[str] = mapped_column(String, ForeignKey("User.id"))
     content: Mapped[str] = mapped_column(String)
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     product = relationship("Product", back_populates="comments")
     user = relationship("User")
@@ -81,26 +173,34 @@ class Comment(Base):
 
 class Order(Base):
     __tablename__ = "Order"
+    __table_args__ = (
+        Index("Order_paymentIntent_idx", "paymentIntent"),
+        # Keyset pagination of GET /api/orders, per user and overall
+        Index("Order_userId_createdAt_id_idx", "userId", "createdAt", "id"),
+        Index("Order_createdAt_id_idx", "createdAt", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True)
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     paymentIntent: Mapped[str] = mapped_column(String)
     paymentStatus: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
     price: Mapped[float] = mapped_column(Float)
     status = mapped_column(JSONB)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     userId: Mapped[str | None] = mapped_column(String, ForeignKey("User.id"), nullable=True)
     user = relationship("User", back_populates="orders")
     products = relationship("Product", secondary="_OrderToProduct", back_populates="order")
+    items = relationship("OrderItem", back_populates="order")
 
 
 class SellerProfile(Base):
     __tablename__ = "SellerProfile"
+    __table_args__ = (Index("SellerProfile_displayName_idx", "displayName"),)
     id: Mapped[str] = mapped_column(String, primary_key=True)
     userId: Mapped[str] = mapped_column(String, ForeignKey("User.id"), unique=True)
     displayName: Mapped[str] = mapped_column(String)
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User")
     products = relationship("SellerProduct", back_populates="seller")
@@ -108,6 +208,7 @@ class SellerProfile(Base):
 
 class SellerProduct(Base):
     __tablename__ = "SellerProduct"
+    __table_args__ = (Index("SellerProduct_sellerId_idx", "sellerId"),)
     id: Mapped[str] = mapped_column(String, primary_key=True)
     sellerId: Mapped[str] = mapped_column(String, ForeignKey("SellerProfile.id"))
     productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id"), unique=True)
@@ -121,25 +222,27 @@ class Inventory(Base):
     __tablename__ = "Inventory"
     productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id"), primary_key=True)
     stock: Mapped[int] = mapped_column(Integer, default=0)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     product = relationship("Product")
 
 
 class OrderItem(Base):
     __tablename__ = "OrderItem"
+    __table_args__ = (Index("OrderItem_orderId_idx", "orderId"),)
     id: Mapped[str] = mapped_column(String, primary_key=True)
     orderId: Mapped[str] = mapped_column(String, ForeignKey("Order.id"))
     productId: Mapped[str] = mapped_column(String, ForeignKey("Product.id"))
     quantity: Mapped[int] = mapped_column(Integer)
     unitPrice: Mapped[float] = mapped_column(Float)
 
-    order = relationship("Order")
+    order = relationship("Order", back_populates="items")
     product = relationship("Product")
 
 
 class Address(Base):
     __tablename__ = "Address"
+    __table_args__ = (Index("Address_userId_idx", "userId"),)
     id: Mapped[str] = mapped_column(String, primary_key=True)
     userId: Mapped[str] = mapped_column(String, ForeignKey("User.id"))
     line1: Mapped[str] = mapped_column(String)
@@ -151,11 +254,40 @@ class Address(Base):
     phone: Mapped[str | None] = mapped_column(String, nullable=True)
     isDefault: Mapped[bool] = mapped_column(Boolean, default=False)
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User")
 
 
+class IdempotencyKey(Base):
+    """Client-supplied Idempotency-Key for a mutating request and its stored outcome."""
+    __tablename__ = "IdempotencyKey"
+    __table_args__ = (Index("IdempotencyKey_expiresAt_idx", "expiresAt"),)
+    scope: Mapped[str] = mapped_column(String, primary_key=True)
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    requestHash: Mapped[str] = mapped_column(String)
+    # "in_progress" while the first request runs, then "completed"
+    status: Mapped[str] = mapped_column(String)
+    responseCode: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    responseBody = mapped_column(JSONB, nullable=True)
+    createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    lockedUntil: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    expiresAt: Mapped[datetime] = mapped_column(DateTime)
+
+
+class StripeEvent(Base):
+    """Received Stripe webhook event; the primary key deduplicates redeliveries."""
+    __tablename__ = "StripeEvent"
+    __table_args__ = (
+        Index("StripeEvent_unprocessed_idx", "receivedAt", postgresql_where=text('"processedAt" IS NULL')),
+    )
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    type: Mapped[str] = mapped_column(String)
+    paymentIntent: Mapped[str | None] = mapped_column(String, nullable=True)
+    receivedAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    processedAt: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
 # Association table name Prisma uses by default for m-n without explicit model
 from sqlalchemy import Table, MetaData
 
@@ -166,4 +298,6 @@ OrderToProduct = Table(
     metadata,
     Column("A", String, ForeignKey("Order.id"), primary_key=True),
     Column("B", String, ForeignKey("Product.id"), primary_key=True),
+    # Orders containing a product (incremental related-product updates)
+    Index("_OrderToProduct_B_index", "B"),
 )
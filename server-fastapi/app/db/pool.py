@@ -0,0 +1,170 @@
+"""Connection pool profiles and live pool statistics.
+
+``DB_POOL_PROFILE`` picks how engines pool connections for the way the app is deployed:
+
+- ``server``: a QueuePool for long-running uvicorn processes. ``DB_POOL_SIZE``
+  connections stay open, up to ``DB_MAX_OVERFLOW`` more are opened under load, and a
+  request that finds the pool exhausted waits ``DB_POOL_TIMEOUT`` seconds for one
+  rather than opening another. Connections are pinged before use.
+- ``lambda``: a Lambda container serves one request at a time, so one connection
+  per engine and no overflow. Connections are not pinged on checkout; instead they
+  are recycled after ``DB_POOL_RECYCLE`` (default 240 s), which also replaces
+  connections that outlived a frozen container.
+- ``external``: NullPool, for when RDS Proxy or pgbouncer does the pooling. Every
+  session opens (and closes) a connection to the proxy; nothing idles in the process.
+- ``auto`` (default): ``lambda`` when running on AWS Lambda, otherwise ``server``.
+
+Explicit ``DB_POOL_*`` settings override the profile's defaults. A process holds at
+most ``size + overflow`` connections per engine, and with ``DB_ASYNC`` on there are
+two engines; multiply by processes (uvicorn workers, Lambda containers) and keep the
+total under the server's ``max_connections``.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from core import settings
+from db.instrumentation import record_pool_wait
+
+PROFILES = ("server", "lambda", "external")
+
+# Defaults per profile; None means "not applicable"
+_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "server": {"size": 10, "overflow": 10, "timeout": 10.0, "recycle": 1800, "pre_ping": True},
+    "lambda": {"size": 1, "overflow": 0, "timeout": 10.0, "recycle": 240, "pre_ping": False},
+    "external": {"size": None, "overflow": None, "timeout": None, "recycle": None, "pre_ping": False},
+}
+
+
+def resolve_profile() -> str:
+    profile = (settings.DB_POOL_PROFILE or "auto").lower()
+    if profile == "auto":
+        return "lambda" if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else "server"
+    if profile not in PROFILES:
+        raise RuntimeError(f"DB_POOL_PROFILE must be auto or one of {', '.join(PROFILES)}, got {profile!r}")
+    return profile
+
+
+def pool_config(profile: str) -> Dict[str, Any]:
+    """The profile's defaults with explicit DB_POOL_* settings applied."""
+    config = dict(_DEFAULTS[profile])
+    overrides = {
+        "size": settings.DB_POOL_SIZE,
+        "overflow": settings.DB_MAX_OVERFLOW,
+        "timeout": settings.DB_POOL_TIMEOUT,
+        "recycle": settings.DB_POOL_RECYCLE,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if profile != "external":
+        config.update({k: v for k, v in overrides.items() if v is not None})
+    return config
+
+
+class _TimedCheckout:
+    """Reports how long each checkout waited (or spent connecting) to the request stats."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def engine_options(profile: str, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for ``create_engine`` (or ``create_async_engine``, ``is_async``)."""
+    config = pool_config(profile)
+    if profile == "external":
+        return {"poolclass": TimedNullPool}
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": config["size"],
+        "max_overflow": config["overflow"],
+        "pool_timeout": config["timeout"],
+        "pool_recycle": config["recycle"],
+        "pool_pre_ping": config["pre_ping"],
+        # Hand out the most recently used connection; surplus ones stay idle until recycled
+        "pool_use_lifo": True,
+    }
+
+
+class PoolMonitor:
+    """Counts connection events on one engine's pool."""
+
+    def __init__(self, name: str, engine: Engine, profile: str):
+        self.name = name
+        self.engine = engine
+        self.profile = profile
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _bump(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def _on_connect(self, *_):
+        self._bump("connects")
+
+    def _on_checkout(self, *_):
+        self._bump("checkouts")
+
+    def _on_checkin(self, *_):
+        self._bump("checkins")
+
+    def _on_invalidate(self, *_):
+        self._bump("invalidations")
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        config = pool_config(self.profile)
+        out = {
+            "engine": self.name,
+            "profile": self.profile,
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            # Sessions currently holding a connection (NullPool has no other gauge)
+            "inUse": self.checkouts - self.checkins,
+        }
+        if not isinstance(pool, NullPool):
+            out.update(
+                {
+                    "size": pool.size(),
+                    "maxOverflow": config["overflow"],
+                    "checkedIn": pool.checkedin(),
+                    "checkedOut": pool.checkedout(),
+                    # QueuePool reports unopened capacity as negative overflow
+                    "overflow": max(pool.overflow(), 0),
+                    "open": pool.checkedin() + pool.checkedout(),
+                    "timeout": config["timeout"],
+                    "recycle": config["recycle"],
+                    "prePing": config["pre_ping"],
+                }
+            )
+        return out
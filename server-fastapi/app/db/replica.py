@@ -0,0 +1,119 @@
+"""Read-replica routing with a read-your-writes window.
+
+Read-only handlers depend on ``get_read_session`` instead of ``get_session``. With
+``DATABASE_READ_URL`` set it opens the session on the replica, except for a user who
+wrote within the last ``READ_YOUR_WRITES_SECONDS``: their reads stay on the primary, so
+they see their own changes despite replication lag.
+
+Writes are noticed by ``ReadYourWritesMiddleware``: a successful POST/PUT/PATCH/DELETE
+carrying a valid bearer token marks that user. Marks live in the Redis cache backend
+when it is configured (shared by all processes), otherwise in process memory, where a
+user whose next read lands on another process may still read from the replica.
+
+Handlers that fill the shared catalog cache (product and category lookups) stay on the
+primary: a fill from a lagging replica right after an invalidation would keep the old
+version cached for ``CACHE_TTL``. Their misses are rare, so the replica loses little.
+"""
+from typing import Optional
+
+from fastapi import Request
+
+from core import settings
+from db.database import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+)
+from utils.auth import token_subject
+from utils.cache import Cache, MemoryBackend, build_cache
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+replica_enabled = bool(settings.DATABASE_READ_URL)
+
+_recent_writers = (
+    build_cache(ttl=settings.READ_YOUR_WRITES_SECONDS, prefix="ryw:")
+    if settings.CACHE_BACKEND == "redis"
+    else Cache(MemoryBackend(settings.AUTH_CACHE_MAX_ENTRIES), settings.READ_YOUR_WRITES_SECONDS)
+)
+
+
+def _writer_key(user_id: str) -> str:
+    return f"writer:{user_id}"
+
+
+async def note_write(user_id: str) -> None:
+    await _recent_writers.set_async(_writer_key(user_id), True)
+
+
+def wrote_recently(user_id: str) -> bool:
+    return _recent_writers.get(_writer_key(user_id)) is not None
+
+
+async def wrote_recently_async(user_id: str) -> bool:
+    return await _recent_writers.get_async(_writer_key(user_id)) is not None
+
+
+def use_primary(request: Request) -> bool:
+    """Whether this read must see the primary (no replica, or the user just wrote)."""
+    if not replica_enabled:
+        return True
+    user_id = token_subject(request.headers.get("authorization"))
+    return user_id is not None and wrote_recently(user_id)
+
+
+async def use_primary_async(request: Request) -> bool:
+    """``use_primary`` for the event loop (a Redis lookup runs in the threadpool)."""
+    if not replica_enabled:
+        return True
+    user_id = token_subject(request.headers.get("authorization"))
+    return user_id is not None and await wrote_recently_async(user_id)
+
+
+if settings.DB_ASYNC:
+
+    async def get_read_session(request: Request):
+        factory = AsyncSessionLocal if await use_primary_async(request) else AsyncReadSessionLocal
+        async with factory() as db:
+            yield db
+
+else:
+
+    def get_read_session(request: Request):
+        db = (SessionLocal if use_primary(request) else ReadSessionLocal)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Marks the authenticated user of every successful unsafe request as a recent writer."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        user_id = _scope_subject(scope)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_mark(message):
+            # Handlers commit before responding, so the write is visible on the primary
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await note_write(user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
+
+
+def _scope_subject(scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            return token_subject(value.decode("latin-1"))
+    return None
@@ -1,12 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
+from sqlalchemy.orm import configure_mappers
 
 from core import settings
 from routers import auth, products, categories, orders, health
 from routers import addresses, inventory
-from routers import comments, sellers
+from routers import comments, reviews, sellers, search, webhooks, metrics
 from db.database import ensure_schema
+from db.instrumentation import QueryStatsMiddleware
+from db.replica import ReadYourWritesMiddleware, replica_enabled
+from utils.metrics import MetricsMiddleware
+from utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+
+# Resolve the mapper graph while the module loads (Lambda's init phase), not during
+# the first request that queries
+configure_mappers()
 
 app = FastAPI(title="Amazon Clone FastAPI", redirect_slashes=False)
 
@@ -16,17 +25,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
+if settings.QUERY_STATS:
+    app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+if replica_enabled:
+    # Pins a user's reads to the primary for a short window after their writes
+    app.add_middleware(ReadYourWritesMiddleware)
 
+app.include_router(metrics.router, tags=["metrics"])
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(categories.router, prefix="/api", tags=["categories"])
 app.include_router(products.router, prefix="/api", tags=["products"])
+app.include_router(search.router, prefix="/api", tags=["search"])
 app.include_router(orders.router, prefix="/api", tags=["orders"])
 app.include_router(addresses.router, prefix="/api", tags=["addresses"])
 app.include_router(inventory.router, prefix="/api", tags=["inventory"])
 app.include_router(comments.router, prefix="/api", tags=["comments"])
+app.include_router(reviews.router, prefix="/api", tags=["reviews"])
 app.include_router(sellers.router, prefix="/api", tags=["sellers"])
+app.include_router(webhooks.router, prefix="/api", tags=["webhooks"])
 
 
 @app.get("/")
@@ -1,48 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from db.database import get_db
+from db.database import DBSession, get_db, get_session, run_db
 from db import models
 from schemas.auth import Credentials, SignupCredentials, UserInfo, User
-from core import settings
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+from utils.auth import create_token, get_current_user_record, revoke_tokens
+from utils.passwords import hash_password, verify_password
 from typing import Optional
 from pydantic import BaseModel
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from datetime import datetime, timezone
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer(auto_error=False)
-
-
-def create_token(user: models.User) -> str:
-    # Include standard claims (sub, roles, username, exp)
-    exp = int((datetime.now(timezone.utc) + settings.access_token_expires).timestamp())
-    payload = {"sub": user.id, "username": user.username, "roles": user.roles or [], "exp": exp}
-    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm="HS256")
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-    if credentials is None:
-        raise HTTPException(status_code=401, detail="Missing token")
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = db.query(models.User).filter(models.User.id == payload.get("sub")).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
 
 @router.get("/me", response_model=User)
-def me(current_user: models.User = Depends(get_current_user)):
+def me(current_user: models.User = Depends(get_current_user_record)):
     return User(
         id=current_user.id,
         username=current_user.username,
@@ -54,31 +24,53 @@ def me(current_user: models.User = Depends(get_current_user)):
 
 
 @router.post("/login", response_model=UserInfo)
-def login(body: Credentials, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == body.username).first()
-    if not user or not pwd_context.verify(body.password, user.password):
+async def login(body: Credentials, db: DBSession = Depends(get_session)):
+    # bcrypt runs on its own pool (utils.passwords), never while a DB call is pending
+    user = await run_db(db, _find_user, body.username)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return UserInfo(
+    valid, new_hash = await verify_password(body.password, user.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    info = UserInfo(
         accessToken=create_token(user),
         id=user.id,
         roles=user.roles or [],
         username=user.username,
     )
+    if new_hash:
+        # Stored hash used another BCRYPT_SALT cost
+        await run_db(db, _store_hash, user.id, new_hash)
+    return info
+
+
+def _find_user(db: Session, username: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
+def _store_hash(db: Session, user_id: str, hashed: str) -> None:
+    db.query(models.User).filter(models.User.id == user_id).update({models.User.password: hashed})
+    db.commit()
 
 
 @router.post("/signup", response_model=UserInfo)
-def signup(body: SignupCredentials, db: Session = Depends(get_db)):
+async def signup(body: SignupCredentials, db: DBSession = Depends(get_session)):
     # Basic input validation
     if not body.username or not body.password:
         raise HTTPException(status_code=400, detail="username and password are required")
     if body.accountType not in (None, "buyer", "seller"):
         raise HTTPException(status_code=400, detail="accountType must be 'buyer' or 'seller'")
 
-    # Uniqueness checks
-    existing = db.query(models.User).filter(models.User.username == body.username).first()
+    # Uniqueness checks, before spending a hash on the request
+    existing = await run_db(db, _find_user, body.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
 
+    hashed = await hash_password(body.password)
+    return await run_db(db, _create_user, body, hashed)
+
+
+def _create_user(db: Session, body: SignupCredentials, hashed: str) -> UserInfo:
     import uuid
 
     # Assign roles smartly
@@ -87,7 +79,7 @@ def signup(body: SignupCredentials, db: Session = Depends(get_db)):
     user = models.User(
         id=str(uuid.uuid4()),
         username=body.username,
-        password=pwd_context.hash(body.password),
+        password=hashed,
         firstName=body.firstName,
         lastName=body.lastName,
         isAdmin=False,
@@ -109,7 +101,6 @@ def signup(body: SignupCredentials, db: Session = Depends(get_db)):
         seller = models.SellerProfile(id=str(uuid.uuid4()), userId=user.id, displayName=display)
         db.add(seller)
         db.commit()
-
     return UserInfo(accessToken=create_token(user), id=user.id, roles=user.roles or [], username=user.username)
 
 
@@ -120,7 +111,7 @@ class UpgradeToSellerBody(BaseModel):
 @router.post("/upgrade-to-seller", response_model=UserInfo)
 def upgrade_to_seller(
     body: UpgradeToSellerBody,
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_current_user_record),
     db: Session = Depends(get_db),
 ):
     roles = set(current_user.roles or [])
@@ -139,7 +130,8 @@ def upgrade_to_seller(
         import uuid as _uuid
         sp = models.SellerProfile(id=str(_uuid.uuid4()), userId=current_user.id, displayName=display)
         db.add(sp)
-    db.commit()
+    # Tokens issued with the old roles stop working; the response carries a fresh one
+    revoke_tokens(db, current_user)
     db.refresh(current_user)
     return UserInfo(
         accessToken=create_token(current_user),
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from db.database import get_db
+from db.database import DBSession, get_session, run_db
 from db import models
-from typing import List
+from typing import List, Optional
 from schemas.categories import CategoryIn, CategoryOut, CategoryPatch
+from utils.cache import CATEGORIES_KEY, cache, category_key
+from utils.http_cache import latest, make_etag, respond_versioned, rows_etag, versioned
 
 """Category routes.
 
@@ -15,48 +17,80 @@ router = APIRouter(prefix="/categories")
 
 @router.post("", response_model=CategoryOut, status_code=201)
 @router.post("/", response_model=CategoryOut, status_code=201, include_in_schema=False)
-def create_category(body: CategoryIn, db: Session = Depends(get_db)):
-    import uuid
+async def create_category(body: CategoryIn, db: DBSession = Depends(get_session)):
+    def create(db: Session) -> CategoryOut:
+        import uuid
 
-    cat = models.Category(id=str(uuid.uuid4()), name=body.name)
-    db.add(cat)
-    db.commit()
-    db.refresh(cat)
-    return CategoryOut(id=cat.id, name=cat.name)
+        cat = models.Category(id=str(uuid.uuid4()), name=body.name)
+        db.add(cat)
+        db.commit()
+        return CategoryOut(id=cat.id, name=cat.name)
+
+    out = await run_db(db, create)
+    await cache.invalidate_async(CATEGORIES_KEY)
+    return out
+
+
+def load_categories(db: Session) -> dict:
+    rows = db.query(models.Category).order_by(models.Category.id).all()
+    return versioned(
+        [CategoryOut(id=r.id, name=r.name).model_dump() for r in rows],
+        rows_etag("categories", rows),
+        latest(rows),
+    )
+
+
+def load_category(db: Session, id: str) -> Optional[dict]:
+    r = db.query(models.Category).filter(models.Category.id == id).first()
+    if not r:
+        return None
+    return versioned(
+        CategoryOut(id=r.id, name=r.name).model_dump(),
+        make_etag("category", r.id, r.updatedAt),
+        r.updatedAt,
+    )
 
 
 @router.get("", response_model=List[CategoryOut])
 @router.get("/", response_model=List[CategoryOut], include_in_schema=False)
-def list_categories(db: Session = Depends(get_db)):
-    rows = db.query(models.Category).all()
-    return [CategoryOut(id=r.id, name=r.name) for r in rows]
+async def list_categories(request: Request, response: Response, db: DBSession = Depends(get_session)):
+    entry = await cache.get_or_load_async(CATEGORIES_KEY, lambda: run_db(db, load_categories))
+    return respond_versioned(request, response, entry)
 
 
 @router.get("/{id}", response_model=CategoryOut)
-def get_category(id: str, db: Session = Depends(get_db)):
-    r = db.query(models.Category).filter(models.Category.id == id).first()
-    if not r:
+async def get_category(id: str, request: Request, response: Response, db: DBSession = Depends(get_session)):
+    entry = await cache.get_or_load_async(category_key(id), lambda: run_db(db, load_category, id))
+    if entry is None:
         raise HTTPException(status_code=404, detail="Not found")
-    return CategoryOut(id=r.id, name=r.name)
+    return respond_versioned(request, response, entry)
 
 
 @router.patch("/{id}", response_model=CategoryOut)
-def patch_category(id: str, body: CategoryPatch, db: Session = Depends(get_db)):
-    r = db.query(models.Category).filter(models.Category.id == id).first()
-    if not r:
-        raise HTTPException(status_code=404, detail="Not found")
-    if body.name is not None:
-        r.name = body.name
-    db.commit()
-    db.refresh(r)
-    return CategoryOut(id=r.id, name=r.name)
+async def patch_category(id: str, body: CategoryPatch, db: DBSession = Depends(get_session)):
+    def patch(db: Session) -> CategoryOut:
+        r = db.query(models.Category).filter(models.Category.id == id).first()
+        if not r:
+            raise HTTPException(status_code=404, detail="Not found")
+        if body.name is not None:
+            r.name = body.name
+        db.commit()
+        return CategoryOut(id=r.id, name=r.name)
+
+    out = await run_db(db, patch)
+    await cache.invalidate_async(CATEGORIES_KEY, category_key(id))
+    return out
 
 
 @router.delete("/{id}")
-def delete_category(id: str, db: Session = Depends(get_db)):
-    r = db.query(models.Category).filter(models.Category.id == id).first()
-    if not r:
-        raise HTTPException(status_code=404, detail="Not found")
-    db.delete(r)
-    db.commit()
+async def delete_category(id: str, db: DBSession = Depends(get_session)):
+    def delete(db: Session) -> None:
+        r = db.query(models.Category).filter(models.Category.id == id).first()
+        if not r:
+            raise HTTPException(status_code=404, detail="Not found")
+        db.delete(r)
+        db.commit()
+
+    await run_db(db, delete)
+    await cache.invalidate_async(CATEGORIES_KEY, category_key(id))
     return {"ok": True}
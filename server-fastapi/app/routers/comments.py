@@ -1,87 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, load_only
+from typing import List, Optional, Tuple
+from db.database import DBSession, get_session, run_db
+from db.replica import get_read_session
 from db import models
 from schemas.comments import CommentCreate, CommentOut
-from utils.auth import get_current_user
+from utils.auth import Principal, get_current_user
+from utils.cache import cache, comment_count_key
+from utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, paginate
 import uuid
 from datetime import datetime
 
 
 router = APIRouter(prefix="/comments")
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def display_name(user: Optional[models.User]) -> Optional[str]:
+    if not user:
+        return None
+    # Prefer first + last name, else username
+    if user.firstName or user.lastName:
+        return " ".join([p for p in [user.firstName, user.lastName] if p]).strip()
+    return user.username
+
 
 def to_out(c: models.Comment) -> CommentOut:
     user = c.user
-    display_name = None
-    if user:
-        # Prefer first + last name, else username
-        if user.firstName or user.lastName:
-            display_name = " ".join([p for p in [user.firstName, user.lastName] if p]).strip()
-        else:
-            display_name = user.username
     return CommentOut(
         id=c.id,
         productId=c.productId,
         userId=c.userId,
         username=user.username if user else None,
-        userDisplayName=display_name,
+        userDisplayName=display_name(user),
         content=c.content,
         createdAt=c.createdAt.isoformat(),
     )
 
 
-@router.get("/product/{product_id}", response_model=List[CommentOut])
-def list_comments(product_id: str, db: Session = Depends(get_db)):
-    if not db.query(models.Product).filter(models.Product.id == product_id).first():
-        raise HTTPException(status_code=404, detail="Product not found")
-    rows = (
+def count_comments(db: Session, product_id: str) -> int:
+    return db.query(func.count(models.Comment.id)).filter(models.Comment.productId == product_id).scalar()
+
+
+async def comment_page(
+    db: DBSession, response: Response, product_id: str, limit: int, cursor: Optional[str]
+) -> List[CommentOut]:
+    """One page of a product's comments, newest first, with their authors.
+
+    The next page token goes in the X-Next-Cursor header and the product's comment
+    count in X-Total-Count, so the body stays a plain list. The count is cached; a
+    cached count also proves the product exists, so a warm page costs one query.
+    """
+    key = comment_count_key(product_id)
+    cached = await cache.get_async(key)
+    items, total = await run_db(db, _load_page, response, product_id, limit, cursor, cached)
+    if cached is None:
+        await cache.set_async(key, total)
+    return items
+
+
+def _load_page(
+    db: Session, response: Response, product_id: str, limit: int, cursor: Optional[str], total: Optional[int]
+) -> Tuple[List[CommentOut], int]:
+    if total is None:
+        if db.query(models.Product.id).filter(models.Product.id == product_id).first() is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        total = count_comments(db, product_id)
+    q = (
         db.query(models.Comment)
         .filter(models.Comment.productId == product_id)
-        .order_by(models.Comment.createdAt.desc())
-        .all()
+        # Authors come in the same statement instead of one lazy load per comment
+        .options(
+            joinedload(models.Comment.user, innerjoin=True).load_only(
+                models.User.username, models.User.firstName, models.User.lastName
+            )
+        )
+    )
+    page = paginate(
+        q,
+        keys=[models.Comment.createdAt, models.Comment.id],
+        descending=True,
+        limit=limit,
+        cursor=cursor,
+        scope="comments",
     )
-    return [to_out(r) for r in rows]
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    return [to_out(c) for c in page.items], total
+
+
+async def refresh_comment_count(product_id: str, count: int) -> None:
+    # Written through from the primary after a change: letting the next reader fill it
+    # could cache a count read from a lagging replica for CACHE_TTL
+    await cache.set_async(comment_count_key(product_id), count)
+
+
+@router.get("/product/{product_id}", response_model=List[CommentOut])
+async def list_comments(
+    product_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+):
+    return await comment_page(db, response, product_id, limit, cursor)
 
 
 @router.post("", response_model=CommentOut, status_code=201)
 @router.post("/", response_model=CommentOut, status_code=201, include_in_schema=False)
-def create_comment(
+async def create_comment(
     body: CommentCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    # Confirm product exists
-    if not db.query(models.Product).filter(models.Product.id == body.productId).first():
-        raise HTTPException(status_code=404, detail="Product not found")
-    c = models.Comment(
-        id=str(uuid.uuid4()),
-        productId=body.productId,
-        userId=current_user.id,
-        content=body.content,
-        createdAt=datetime.utcnow(),
-        updatedAt=datetime.utcnow(),
-    )
-    db.add(c)
-    db.commit()
-    db.refresh(c)
-    return to_out(c)
+    def run(db: Session):
+        # Confirm product exists
+        if not db.query(models.Product).filter(models.Product.id == body.productId).first():
+            raise HTTPException(status_code=404, detail="Product not found")
+        c = models.Comment(
+            id=str(uuid.uuid4()),
+            productId=body.productId,
+            userId=current_user.id,
+            content=body.content,
+            createdAt=datetime.utcnow(),
+            updatedAt=datetime.utcnow(),
+        )
+        db.add(c)
+        db.commit()
+        db.refresh(c)
+        return to_out(c), count_comments(db, body.productId)
+
+    out, count = await run_db(db, run)
+    await refresh_comment_count(body.productId, count)
+    return out
 
 
 @router.delete("/{comment_id}")
-def delete_comment(
+async def delete_comment(
     comment_id: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    c = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
-    if not c:
-        raise HTTPException(status_code=404, detail="Not found")
-    roles = set(current_user.roles or [])
-    is_admin = current_user.isAdmin or ("admin" in roles)
-    if not is_admin and c.userId != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed")
-    db.delete(c)
-    db.commit()
+    def run(db: Session):
+        c = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+        if not c:
+            raise HTTPException(status_code=404, detail="Not found")
+        if not current_user.is_admin and c.userId != current_user.id:
+            raise HTTPException(status_code=403, detail="Not allowed")
+        product_id = c.productId
+        db.delete(c)
+        db.commit()
+        return product_id, count_comments(db, product_id)
+
+    product_id, count = await run_db(db, run)
+    await refresh_comment_count(product_id, count)
     return {"ok": True}
@@ -1,11 +1,58 @@
-from fastapi import APIRouter
+import threading
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Response
+from sqlalchemy import text
+
+from core import settings
+from utils.cache import cache
+from db.database import engine, pool_stats
 
 router = APIRouter(prefix="/_health")
 
+# Last database check: probes within READY_CHECK_TTL reuse it instead of querying
+_ready_lock = threading.Lock()
+_last_check = {"at": None, "ok": False, "error": None}
+
+
+def check_database() -> dict:
+    """``SELECT 1`` on the primary, at most once per READY_CHECK_TTL per process."""
+    with _ready_lock:
+        now = time.monotonic()
+        at: Optional[float] = _last_check["at"]
+        if at is None or now - at >= settings.READY_CHECK_TTL:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                _last_check.update(ok=True, error=None)
+            except Exception as exc:
+                _last_check.update(ok=False, error=type(exc).__name__)
+            _last_check["at"] = now = time.monotonic()
+        return {
+            "ok": _last_check["ok"],
+            "error": _last_check["error"],
+            "ageSeconds": round(now - _last_check["at"], 3),
+        }
+
 @router.get("/live")
 def live():
     return {"status": "ok"}
 
 @router.get("/ready")
-def ready():
-    return {"status": "ok"}
+def ready(response: Response):
+    """503 until the database answers; the check result is cached for READY_CHECK_TTL."""
+    database = check_database()
+    if not database["ok"]:
+        response.status_code = 503
+    return {"status": "ok" if database["ok"] else "unavailable", "database": database}
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss/eviction counters of this process's catalog cache."""
+    return cache.stats()
+
+@router.get("/pool")
+def db_pool_stats():
+    """Connection pool gauges and counters of this process's database engines."""
+    return pool_stats()
@@ -1,45 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db import models
 from pydantic import BaseModel
-from typing import Optional
-from utils.auth import get_current_user
+from typing import List, Optional
+from datetime import datetime
+from utils.ownership import Ownership, get_ownership
 
 router = APIRouter(prefix="/inventory")
 
+MAX_BULK_ITEMS = 500
+
 
 class InventoryPatch(BaseModel):
     stock: int
 
 
+class InventoryItemPatch(BaseModel):
+    productId: str
+    stock: int
+
+
 @router.get("/{product_id}")
 def get_stock(product_id: str, db: Session = Depends(get_db)):
     inv = db.query(models.Inventory).filter(models.Inventory.productId == product_id).first()
     return {"productId": product_id, "stock": inv.stock if inv else 0}
 
 
+def set_stock(db: Session, stock: dict[str, int]) -> None:
+    """Upsert stock levels for many products in one statement."""
+    now = datetime.utcnow()
+    stmt = insert(models.Inventory).values(
+        [{"productId": pid, "stock": qty, "updatedAt": now} for pid, qty in stock.items()]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.Inventory.productId],
+            set_={"stock": stmt.excluded.stock, "updatedAt": stmt.excluded.updatedAt},
+        )
+    )
+
+
+@router.patch("")
+def update_stock_bulk(
+    body: List[InventoryItemPatch],
+    db: Session = Depends(get_db),
+    ownership: Ownership = Depends(get_ownership),
+):
+    """Set stock for several products; all must belong to the caller (or caller is admin)."""
+    if not body:
+        return []
+    if len(body) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    # Last entry wins for repeated product ids
+    stock = {it.productId: it.stock for it in body}
+    ownership.require(*stock)
+    set_stock(db, stock)
+    db.commit()
+    return [{"productId": pid, "stock": qty} for pid, qty in stock.items()]
+
+
 @router.patch("/{product_id}")
 def update_stock(
     product_id: str,
     body: InventoryPatch,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    ownership: Ownership = Depends(get_ownership),
 ):
     # Authorization: admin or owning seller can update
-    roles = set(current_user.roles or [])
-    is_admin = current_user.isAdmin or ("admin" in roles)
-    if not is_admin:
-        sp = db.query(models.SellerProduct).filter(models.SellerProduct.productId == product_id).first()
-        seller = db.query(models.SellerProfile).filter(models.SellerProfile.userId == current_user.id).first()
-        if not seller or not sp or sp.sellerId != seller.id:
-            raise HTTPException(status_code=403, detail="Not allowed")
-
-    inv = db.query(models.Inventory).filter(models.Inventory.productId == product_id).first()
-    if not inv:
-        inv = models.Inventory(productId=product_id, stock=body.stock)
-        db.add(inv)
-    else:
-        inv.stock = body.stock
+    ownership.require(product_id)
+    set_stock(db, {product_id: body.stock})
     db.commit()
-    return {"productId": product_id, "stock": inv.stock}
+    return {"productId": product_id, "stock": body.stock}
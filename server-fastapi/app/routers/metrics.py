@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from utils.metrics import exposition
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of this process's (or, in multiprocess mode, all workers') metrics."""
+    body, content_type = exposition()
+    return Response(content=body, media_type=content_type)
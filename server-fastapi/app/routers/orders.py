@@ -1,22 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import Integer, String, column, select, update, values
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
-from db.database import get_db
+from db.database import DBSession, get_db, get_session, run_db
 from db import models
-from schemas.orders import OrderCreate, OrderOut, OrderPatch
-from core import settings
+from schemas.orders import OrderCreate, OrderItemOut, OrderOut, OrderPatch
+from routers.products import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    SUMMARY_COLUMNS,
+    ProductView,
+    to_summary,
+)
 import uuid
-import stripe as stripe_sdk
-from utils.auth import get_optional_user
+from collections import defaultdict
+from datetime import datetime
+from utils.auth import Principal, get_optional_user, require_roles
+from utils import idempotency, metrics
+from utils.pagination import NEXT_CURSOR_HEADER, paginate
+from utils.payments import (
+    PaymentError,
+    abandon_order,
+    attach_payment_intent,
+    create_payment_intent,
+    get_stripe,
+    is_stripe_order,
+)
 
 router = APIRouter(prefix="/orders")
 
 
-stripe = None
-if settings.STRIPE_SECRET_KEY:
-    stripe = stripe_sdk.StripeClient(settings.STRIPE_SECRET_KEY)
-
-
 def product_to_dict(p: models.Product) -> dict:
     return {
         "id": p.id,
@@ -31,29 +44,108 @@ def product_to_dict(p: models.Product) -> dict:
     }
 
 
+def product_summaries_by_order(db: Session, order_ids: List[str]) -> dict[str, List[dict]]:
+    """Summaries of every product in the given orders, fetched in one query."""
+    if not order_ids:
+        return {}
+    link = models.OrderToProduct.c
+    rows = (
+        db.query(link.A.label("orderId"), *SUMMARY_COLUMNS)
+        .join(models.Product, models.Product.id == link.B)
+        .filter(link.A.in_(order_ids))
+        .all()
+    )
+    out: dict[str, List[dict]] = defaultdict(list)
+    for r in rows:
+        out[r.orderId].append(to_summary(r).model_dump())
+    return out
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids: List[str]):
+        super().__init__(", ".join(product_ids))
+        self.product_ids = product_ids
+
+
+def reserve_stock(db: Session, qty_map: dict[str, int]) -> None:
+    """Decrement Inventory for every product in ``qty_map`` in two statements.
+
+    Rows are locked with SELECT ... FOR UPDATE in productId order, so concurrent
+    checkouts touching overlapping products always lock in the same order and cannot
+    deadlock; then a single guarded UPDATE applies every decrement. Products without
+    an Inventory row are not stock-tracked. Raises InsufficientStock (nothing is
+    decremented once the caller rolls back) if any product lacks stock. Locks are
+    held until the caller's commit/rollback.
+    """
+    if not qty_map:
+        return
+    inv = models.Inventory
+    locked = db.execute(
+        select(inv.productId, inv.stock)
+        .where(inv.productId.in_(list(qty_map)))
+        .order_by(inv.productId)
+        .with_for_update()
+    ).all()
+    short = [pid for pid, stock in locked if stock < qty_map[pid]]
+    if short:
+        raise InsufficientStock(short)
+    if not locked:
+        return
+    req = values(column("pid", String), column("qty", Integer), name="req").data(
+        [(pid, qty_map[pid]) for pid, _ in locked]
+    )
+    reserved = db.execute(
+        update(inv)
+        .where(inv.productId == req.c.pid, inv.stock >= req.c.qty)
+        .values(stock=inv.stock - req.c.qty, updatedAt=datetime.utcnow())
+        .returning(inv.productId)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if len(reserved) != len(locked):
+        # Unreachable while the row locks are held; kept as a guard against oversell.
+        raise InsufficientStock(sorted({pid for pid, _ in locked} - set(reserved)))
+
+
 @router.post("", response_model=dict)
 @router.post("/", response_model=dict, include_in_schema=False)
 def create_order(
     body: OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias=idempotency.HEADER),
     db: Session = Depends(get_db),
-    current_user: Optional[models.User] = Depends(get_optional_user),
+    current_user: Optional[Principal] = Depends(get_optional_user),
 ):
-    client_secret = ""
-    payment_intent = ""
-    if body.status and body.status.get("paymentMode") == "stripe" and settings.STRIPE_SECRET_KEY:
-        s = stripe_sdk.StripeClient(settings.STRIPE_SECRET_KEY)
-        pi = s.payment_intents.create(
-            amount=int(body.price * 100),
-            currency="usd",
-            automatic_payment_methods={"enabled": True},
-        )
-        payment_intent = pi["id"] if isinstance(pi, dict) else pi.id
-        client_secret = pi["client_secret"] if isinstance(pi, dict) else pi.client_secret
+    if not idempotency_key:
+        return place_order(db, body, current_user)
+    scope = f"orders:{current_user.id if current_user else 'anonymous'}"
+    claim = idempotency.claim(
+        db, scope, idempotency_key, idempotency.request_hash(body.model_dump(mode="json"))
+    )
+    if claim.replay is not None:
+        response.headers[idempotency.REPLAYED_HEADER] = "true"
+        return claim.replay
+    try:
+        return place_order(db, body, current_user, claim)
+    except Exception:
+        idempotency.release(db, claim)
+        raise
+
+
+def place_order(
+    db: Session,
+    body: OrderCreate,
+    current_user: Optional[Principal],
+    claim: Optional[idempotency.Claim] = None,
+) -> dict:
+    """Create the order, then its PaymentIntent; with ``claim``, store the result atomically.
 
+    The order and stock reservation are committed first, so the Stripe call runs with
+    no transaction open and no pooled connection checked out.
+    """
     user_id = current_user.id if current_user else (body.user.id if body.user else None)
     order = models.Order(
         id=str(uuid.uuid4()),
-        paymentIntent=payment_intent,
+        paymentIntent="",
         paymentStatus=False,
         price=body.price or 0.0,
         status=body.status,
@@ -68,8 +160,6 @@ def create_order(
         items.extend([{"id": it.id, "quantity": max(1, int(it.quantity))} for it in body.items])
 
     # Merge duplicate ids, sum quantities
-    from collections import defaultdict
-
     qty_map: dict[str, int] = defaultdict(int)
     for it in items:
         if it.get("id"):
@@ -90,67 +180,131 @@ def create_order(
     for pid, qty in qty_map.items():
         p = pm[pid]
         unit = p.discountPrice if p.discountPrice is not None else p.salePrice
-        inv = db.query(models.Inventory).filter(models.Inventory.productId == pid).first()
-        if inv and inv.stock < qty:
-            raise HTTPException(status_code=409, detail=f"Insufficient stock for product {pid}")
         oi = models.OrderItem(
             id=str(uuid.uuid4()), orderId=order.id, productId=pid, quantity=qty, unitPrice=unit
         )
         db.add(oi)
-        if inv:
-            inv.stock -= qty
         total += unit * qty
         order.products.append(p)
 
     # Compute price if not provided or if negative/zero
     if not body.price or body.price <= 0:
         order.price = total
+    # Reserve stock last so the inventory row locks are held only until the commit below
+    try:
+        reserve_stock(db, qty_map)
+    except InsufficientStock as exc:
+        db.rollback()
+        metrics.orders_rejected.labels("insufficient_stock").inc()
+        raise HTTPException(status_code=409, detail=f"Insufficient stock for product {exc}")
+    order_id, amount = order.id, order.price
+    payment_mode = str((body.status or {}).get("paymentMode") or "unknown")
+    pay_with_stripe = is_stripe_order(body.status) and get_stripe() is not None
+    if not pay_with_stripe:
+        result = {"client_secret": ""}
+        if claim:
+            idempotency.record(db, claim, 200, result)
+        db.commit()
+        metrics.orders_created.labels(payment_mode).inc()
+        return result
     db.commit()
-    return {"client_secret": client_secret}
-
+    metrics.orders_created.labels(payment_mode).inc()
 
-@router.get("", response_model=List[OrderOut])
-@router.get("/", response_model=List[OrderOut], include_in_schema=False)
-def list_orders(request: Request, db: Session = Depends(get_db)):
-    from fastapi import Request  # type: ignore
-
-    qp = request.query_params
-    q = db.query(models.Order)
-    pay_intent = qp.get("where[paymentIntent]")
-    if pay_intent:
-        q = q.filter(models.Order.paymentIntent == pay_intent)
-    user_id = qp.get("where[user][id]")
-    if user_id:
-        q = q.filter(models.Order.userId == user_id)
-    rows = q.all()
-    return [
-        OrderOut(
-            id=r.id,
-            price=r.price,
-            status=r.status,
-            paymentStatus=r.paymentStatus,
-            products=[product_to_dict(p) for p in r.products],
-        )
-        for r in rows
-    ]
+    try:
+        intent_id, client_secret = create_payment_intent(order_id, amount)
+    except PaymentError as exc:
+        abandon_order(db, order_id, "payment_intent_failed")
+        metrics.orders_rejected.labels("payment_intent_failed").inc()
+        raise HTTPException(status_code=502, detail=f"Payment provider error: {exc}")
+    if not attach_payment_intent(db, order_id, intent_id):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order was cancelled while creating the payment")
+    result = {"client_secret": client_secret}
+    if claim:
+        idempotency.record(db, claim, 200, result)
+    db.commit()
+    return result
 
 
-@router.get("/{id}", response_model=OrderOut)
-def get_order(id: str, db: Session = Depends(get_db)):
-    r = db.query(models.Order).filter(models.Order.id == id).first()
-    if not r:
-        raise HTTPException(status_code=404, detail="Not found")
+def order_to_out(r: models.Order, products: List[dict]) -> OrderOut:
     return OrderOut(
         id=r.id,
         price=r.price,
         status=r.status,
         paymentStatus=r.paymentStatus,
-        products=[product_to_dict(p) for p in r.products],
+        createdAt=r.createdAt,
+        products=products,
+        items=[OrderItemOut.model_validate(i, from_attributes=True) for i in r.items],
     )
 
 
+@router.get("", response_model=List[OrderOut])
+@router.get("/", response_model=List[OrderOut], include_in_schema=False)
+async def list_orders(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: ProductView = "summary",
+    db: DBSession = Depends(get_session),
+):
+    def run(db: Session):
+        qp = request.query_params
+        # Items (and, for view=full, products) come from one IN query each instead of
+        # a lazy load per order
+        q = db.query(models.Order).options(selectinload(models.Order.items))
+        if view == "full":
+            q = q.options(selectinload(models.Order.products))
+        pay_intent = qp.get("where[paymentIntent]")
+        if pay_intent:
+            q = q.filter(models.Order.paymentIntent == pay_intent)
+        user_id = qp.get("where[user][id]")
+        if user_id:
+            q = q.filter(models.Order.userId == user_id)
+        # Newest first; the next page token is returned in the X-Next-Cursor header
+        page = paginate(
+            q,
+            keys=[models.Order.createdAt, models.Order.id],
+            descending=True,
+            limit=limit,
+            cursor=cursor,
+            scope="orders",
+        )
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        if view == "full":
+            products = {r.id: [product_to_dict(p) for p in r.products] for r in page.items}
+        else:
+            products = product_summaries_by_order(db, [r.id for r in page.items])
+        return [order_to_out(r, products.get(r.id, [])) for r in page.items]
+
+    return await run_db(db, run)
+
+
+@router.get("/{id}", response_model=OrderOut)
+async def get_order(id: str, db: DBSession = Depends(get_session)):
+    def run(db: Session):
+        r = (
+            db.query(models.Order)
+            .options(selectinload(models.Order.items), selectinload(models.Order.products))
+            .filter(models.Order.id == id)
+            .first()
+        )
+        if not r:
+            raise HTTPException(status_code=404, detail="Not found")
+        return order_to_out(r, [product_to_dict(p) for p in r.products])
+
+    return await run_db(db, run)
+
+
 @router.patch("/{id}", response_model=OrderOut)
-def patch_order(id: str, body: OrderPatch, db: Session = Depends(get_db)):
+def patch_order(
+    id: str,
+    body: OrderPatch,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_roles(["admin"])),
+):
+    """Manual override for admins; payments are confirmed by the Stripe webhook."""
     r = db.query(models.Order).filter(models.Order.id == id).first()
     if not r:
         raise HTTPException(status_code=404, detail="Not found")
@@ -158,10 +312,4 @@ def patch_order(id: str, body: OrderPatch, db: Session = Depends(get_db)):
         r.paymentStatus = body.paymentStatus
     db.commit()
     db.refresh(r)
-    return OrderOut(
-        id=r.id,
-        price=r.price,
-        status=r.status,
-        paymentStatus=r.paymentStatus,
-        products=[product_to_dict(p) for p in r.products],
-    )
+    return order_to_out(r, [product_to_dict(p) for p in r.products])
@@ -1,15 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select, true
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from db.database import get_db
+from typing import List, Literal, Optional, Union
+from db.database import DBSession, get_db, get_session, run_db
+from db.replica import get_read_session
 from db import models
-from schemas.products import ProductCreate, ProductOut, ProductPatch
-from utils.auth import require_roles, get_current_user
+from schemas.products import ProductCreate, ProductOut, ProductPatch, ProductSummary
+from utils.auth import Principal, require_roles
+from utils.ownership import Ownership, get_ownership
+from utils.reviews import average
+from utils.pagination import NEXT_CURSOR_HEADER, paginate
+from utils.cache import cache, comment_count_key, product_key
+from utils.http_cache import (
+    is_conditional,
+    is_not_modified,
+    latest,
+    make_etag,
+    not_modified,
+    respond_versioned,
+    rows_etag,
+    set_validators,
+    versioned,
+)
 from schemas.comments import CommentOut
+from routers import comments
 import uuid
 
 router = APIRouter(prefix="/products")
 
+DEFAULT_PAGE_SIZE = 48
+MAX_PAGE_SIZE = 200
+DEFAULT_RELATED = 10
+MAX_RELATED = 50
+
+# sort name -> (sort column, descending); ties are broken by id in the same direction
+PRODUCT_SORTS = {
+    "newest": (models.Product.createdAt, True),
+    "price_asc": (models.Product.discountPrice, False),
+    "price_desc": (models.Product.discountPrice, True),
+    "title": (models.Product.title, False),
+    # Sales rankings, precomputed per product by utils/sales.py
+    "bestselling": (models.ProductSalesRank.recentUnits, True),
+    "trending": (models.ProductSalesRank.trendScore, True),
+}
+SALES_SORTS = ("bestselling", "trending")
+
+# list endpoints return summaries unless the caller asks for view=full
+ProductView = Literal["summary", "full"]
+
+
+def _rating(column):
+    # Correlated subquery on ProductRating's primary key: ratings come back in the same
+    # statement as the product row, whatever the query joins or how it is ordered
+    return (
+        select(column)
+        .where(models.ProductRating.productId == models.Product.id)
+        .correlate(models.Product)
+        .scalar_subquery()
+    )
+
+
+# Columns needed by grid/list views; the JSONB documents (description, variants,
+# colors and the rest of images) are never read from the table for summaries.
+SUMMARY_COLUMNS = [
+    models.Product.id,
+    models.Product.title,
+    models.Product.discountPrice,
+    models.Product.salePrice,
+    models.Product.categoryId,
+    models.Product.createdAt,
+    models.Product.updatedAt,
+    models.Product.images[0].label("image"),
+    _rating(models.ProductRating.reviewCount).label("ratingCount"),
+    _rating(models.ProductRating.ratingSum).label("ratingSum"),
+]
+
 
 def to_out(p: models.Product) -> ProductOut:
     return ProductOut(
@@ -25,12 +90,35 @@ def to_out(p: models.Product) -> ProductOut:
     )
 
 
+def to_summary(r) -> ProductSummary:
+    """Build a summary from a row selected with SUMMARY_COLUMNS."""
+    return ProductSummary(
+        id=r.id,
+        title=r.title,
+        discountPrice=r.discountPrice,
+        salePrice=r.salePrice,
+        images=[r.image] if r.image is not None else [],
+        category={"id": r.categoryId},
+        ratingAverage=average(r.ratingCount, r.ratingSum),
+        ratingCount=r.ratingCount or 0,
+    )
+
+
+def product_query(db: Session, view: ProductView):
+    """Query for full ORM products or column-restricted summary rows."""
+    return db.query(models.Product) if view == "full" else db.query(*SUMMARY_COLUMNS)
+
+
+def to_view(r, view: ProductView) -> Union[ProductOut, ProductSummary]:
+    return to_out(r) if view == "full" else to_summary(r)
+
+
 @router.post("", response_model=ProductOut, status_code=201)
 @router.post("/", response_model=ProductOut, status_code=201, include_in_schema=False)
 def create_product(
     body: ProductCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_roles(["seller"])),
+    current_user: Principal = Depends(require_roles(["seller"])),
 ):
     cat_id = body.category.get("id") if body.category else None
     if not cat_id:
@@ -47,6 +135,8 @@ def create_product(
         categoryId=cat_id,
     )
     db.add(m)
+    # Unsold until utils.sales counts an order, but listed by the sales orderings
+    db.add(models.ProductSalesRank(productId=m.id, categoryId=cat_id))
     db.commit()
     # ensure inventory row exists
     if not db.query(models.Inventory).filter(models.Inventory.productId == m.id).first():
@@ -58,55 +148,142 @@ def create_product(
         raise HTTPException(status_code=400, detail="Seller profile not found for user")
     db.add(models.SellerProduct(id=str(uuid.uuid4()), sellerId=seller.id, productId=m.id))
     db.commit()
+    cache.invalidate(product_key(m.id))
     db.refresh(m)
     return to_out(m)
 
 
-@router.get("", response_model=List[ProductOut])
-@router.get("/", response_model=List[ProductOut], include_in_schema=False)
-def list_products(request: Request, db: Session = Depends(get_db)):
-    q = db.query(models.Product)
-    qp = request.query_params
-    # Support qs-like nested params: where[title][contains], where[category][id]
-    title_contains = qp.get("where[title][contains]")
-    if title_contains:
-        q = q.filter(models.Product.title.ilike(f"%{title_contains}%"))
-    category_id = qp.get("where[category][id]")
-    if category_id:
-        q = q.filter(models.Product.categoryId == category_id)
+@router.get("", response_model=List[Union[ProductOut, ProductSummary]])
+@router.get("/", response_model=List[Union[ProductOut, ProductSummary]], include_in_schema=False)
+async def list_products(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "newest",
+    view: ProductView = "summary",
+    db: DBSession = Depends(get_read_session),
+):
+    if sort not in PRODUCT_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(PRODUCT_SORTS)}")
 
-    return [to_out(p) for p in q.all()]
+    def run(db: Session):
+        q = product_query(db, view)
+        qp = request.query_params
+        sort_col, descending = PRODUCT_SORTS[sort]
+        keys = [sort_col, models.Product.id]
+        category_col = models.Product.categoryId
+        ranked = sort in SALES_SORTS
+        if ranked:
+            # Walk the ranking's (categoryId, key, productId) index and join the products;
+            # the key is selected too, for the cursor
+            rank = models.ProductSalesRank
+            q = q.join(rank, rank.productId == models.Product.id).add_columns(sort_col.label("rankKey"))
+            keys = [sort_col, rank.productId]
+            category_col = rank.categoryId
+        # Support qs-like nested params: where[title][contains], where[category][id]
+        title_contains = qp.get("where[title][contains]")
+        if title_contains:
+            q = q.filter(models.Product.title.ilike(f"%{title_contains}%"))
+        category_id = qp.get("where[category][id]")
+        if category_id:
+            q = q.filter(category_col == category_id)
+
+        # Keyset pagination; the next page token is returned in the X-Next-Cursor header
+        # so the body stays a plain list for existing clients.
+        page = paginate(
+            q,
+            keys=keys,
+            descending=descending,
+            limit=limit,
+            cursor=cursor,
+            scope=f"products:{sort}",
+            key_values=(lambda row: [row.rankKey, row.Product.id if view == "full" else row.id]) if ranked else None,
+        )
+        items = [row.Product for row in page.items] if ranked and view == "full" else page.items
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        # The page's ids and updatedAt stamps (plus ratings, which do not touch the product
+        # row) determine the body, so a 304 skips serialization
+        ratings = [(r.ratingCount, r.ratingSum) for r in items] if view == "summary" else []
+        etag = rows_etag(f"products:{view}", items, page.next_cursor, *ratings)
+        # Sales rankings reorder products without touching them: validate by ETag only
+        last_modified = None if ranked else latest(items)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        set_validators(response, etag, last_modified)
+        return [to_view(p, view) for p in items]
+
+    return await run_db(db, run)
 
 
 @router.get("/{id}", response_model=ProductOut)
-def get_product(id: str, db: Session = Depends(get_db)):
-    p = db.query(models.Product).filter(models.Product.id == id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Not found")
-    return to_out(p)
+async def get_product(id: str, request: Request, response: Response, db: DBSession = Depends(get_session)):
+    key = product_key(id)
+    entry = await cache.get_async(key)
+    if entry is not None:
+        return respond_versioned(request, response, entry)
 
+    def run(db: Session):
+        if is_conditional(request):
+            # Revalidate against updatedAt alone before loading the JSONB documents
+            updated_at = db.query(models.Product.updatedAt).filter(models.Product.id == id).scalar()
+            if updated_at is None:
+                raise HTTPException(status_code=404, detail="Not found")
+            etag = make_etag("product", id, updated_at)
+            if is_not_modified(request, etag, updated_at):
+                return not_modified(etag, updated_at)
+        p = db.query(models.Product).filter(models.Product.id == id).first()
+        if not p:
+            raise HTTPException(status_code=404, detail="Not found")
+        return versioned(to_out(p).model_dump(), make_etag("product", p.id, p.updatedAt), p.updatedAt)
 
-@router.get("/{id}/comments", response_model=List[CommentOut])
-def list_product_comments_public(id: str, db: Session = Depends(get_db)):
-    p = db.query(models.Product).filter(models.Product.id == id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Not found")
-    rows = (
-        db.query(models.Comment)
-        .filter(models.Comment.productId == id)
-        .order_by(models.Comment.createdAt.desc())
-        .all()
-    )
-    return [
-        CommentOut(
-            id=c.id,
-            productId=c.productId,
-            userId=c.userId,
-            content=c.content,
-            createdAt=c.createdAt.isoformat(),
+    entry = await run_db(db, run)
+    if isinstance(entry, Response):
+        return entry
+    # Filled after run_db returns: under DB_ASYNC that runs on the event loop
+    await cache.set_async(key, entry)
+    return respond_versioned(request, response, entry)
+
+
+@router.get("/{id}/related", response_model=List[ProductSummary])
+async def list_related_products(
+    id: str,
+    limit: int = Query(DEFAULT_RELATED, ge=1, le=MAX_RELATED),
+    db: DBSession = Depends(get_read_session),
+):
+    """Products frequently bought together with this one, best first (see utils/related.py)."""
+
+    def run(db: Session):
+        r = models.RelatedProduct
+        neighbours = (
+            func.unnest(r.relatedIds).table_valued("id", with_ordinality="rank").render_derived("neighbour")
         )
-        for c in rows
-    ]
+        rows = (
+            db.query(*SUMMARY_COLUMNS)
+            .select_from(r)
+            .join(neighbours, true())
+            .join(models.Product, models.Product.id == neighbours.c.id)
+            .filter(r.productId == id)
+            .order_by(neighbours.c.rank)
+            .limit(limit)
+            .all()
+        )
+        return [to_summary(row) for row in rows]
+
+    return await run_db(db, run)
+
+
+@router.get("/{id}/comments", response_model=List[CommentOut])
+async def list_product_comments_public(
+    id: str,
+    response: Response,
+    limit: int = Query(comments.DEFAULT_PAGE_SIZE, ge=1, le=comments.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+):
+    # Same engine as GET /api/comments/product/{id}
+    return await comments.comment_page(db, response, id, limit, cursor)
 
 
 @router.patch("/{id}", response_model=ProductOut)
@@ -114,19 +291,13 @@ def patch_product(
     id: str,
     body: ProductPatch,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    ownership: Ownership = Depends(get_ownership),
 ):
-    p = db.query(models.Product).filter(models.Product.id == id).first()
+    # Authorization: admin or owning seller only
+    ownership.require(id)
+    p = db.get(models.Product, id)
     if not p:
         raise HTTPException(status_code=404, detail="Not found")
-    # Authorization: admin or owning seller only
-    sp = db.query(models.SellerProduct).filter(models.SellerProduct.productId == id).first()
-    roles = set(current_user.roles or [])
-    is_admin = current_user.isAdmin or ("admin" in roles)
-    if not is_admin:
-        seller = db.query(models.SellerProfile).filter(models.SellerProfile.userId == current_user.id).first()
-        if not seller or not sp or sp.sellerId != seller.id:
-            raise HTTPException(status_code=403, detail="Not allowed")
     for field in [
         "title",
         "discountPrice",
@@ -141,7 +312,12 @@ def patch_product(
             setattr(p, field, val)
     if body.category and body.category.get("id"):
         p.categoryId = body.category["id"]
+        # Keep the sales rankings' per-category indexes in step
+        db.query(models.ProductSalesRank).filter(models.ProductSalesRank.productId == id).update(
+            {models.ProductSalesRank.categoryId: p.categoryId}, synchronize_session=False
+        )
     db.commit()
+    cache.invalidate(product_key(id))
     db.refresh(p)
     return to_out(p)
 
@@ -150,19 +326,14 @@ def patch_product(
 def delete_product(
     id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    ownership: Ownership = Depends(get_ownership),
 ):
-    p = db.query(models.Product).filter(models.Product.id == id).first()
+    # Authorization: admin or owning seller only
+    ownership.require(id)
+    p = db.get(models.Product, id)
     if not p:
         raise HTTPException(status_code=404, detail="Not found")
-    # Authorization: admin or owning seller only
-    sp = db.query(models.SellerProduct).filter(models.SellerProduct.productId == id).first()
-    roles = set(current_user.roles or [])
-    is_admin = current_user.isAdmin or ("admin" in roles)
-    if not is_admin:
-        seller = db.query(models.SellerProfile).filter(models.SellerProfile.userId == current_user.id).first()
-        if not seller or not sp or sp.sellerId != seller.id:
-            raise HTTPException(status_code=403, detail="Not allowed")
     db.delete(p)
     db.commit()
+    cache.invalidate(product_key(id), comment_count_key(id))
     return {"ok": True}
@@ -0,0 +1,162 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
+from db.database import DBSession, get_session, run_db
+from db.replica import get_read_session
+from db import models
+from routers.comments import display_name
+from schemas.reviews import RatingSummary, ReviewCreate, ReviewOut
+from utils.auth import Principal, get_current_user
+from utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, paginate
+from utils.reviews import STARS, add_rating, average, remove_rating
+import uuid
+from datetime import datetime
+
+
+router = APIRouter(prefix="/reviews")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def to_out(r: models.Review) -> ReviewOut:
+    user = r.user
+    return ReviewOut(
+        id=r.id,
+        productId=r.productId,
+        userId=r.userId,
+        username=user.username if user else None,
+        userDisplayName=display_name(user),
+        rating=r.rating,
+        description=r.description,
+        createdAt=r.createdAt.isoformat(),
+    )
+
+
+def product_rating(db: Session, product_id: str) -> Optional[models.ProductRating]:
+    """The product's aggregate row (None without reviews); 404 if the product is unknown."""
+    row = (
+        db.query(models.Product.id, models.ProductRating)
+        .outerjoin(models.ProductRating, models.ProductRating.productId == models.Product.id)
+        .filter(models.Product.id == product_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return row.ProductRating
+
+
+@router.get("/product/{product_id}", response_model=List[ReviewOut])
+async def list_reviews(
+    product_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+):
+    """A product's reviews, newest first; X-Total-Count comes from the aggregate row."""
+
+    def run(db: Session):
+        rating = product_rating(db, product_id)
+        q = (
+            db.query(models.Review)
+            .filter(models.Review.productId == product_id)
+            .options(
+                joinedload(models.Review.user).load_only(
+                    models.User.username, models.User.firstName, models.User.lastName
+                )
+            )
+        )
+        page = paginate(
+            q,
+            keys=[models.Review.createdAt, models.Review.id],
+            descending=True,
+            limit=limit,
+            cursor=cursor,
+            scope="reviews",
+        )
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        response.headers[TOTAL_COUNT_HEADER] = str(rating.reviewCount if rating else 0)
+        return [to_out(r) for r in page.items]
+
+    return await run_db(db, run)
+
+
+@router.get("/product/{product_id}/summary", response_model=RatingSummary)
+async def rating_summary(product_id: str, db: DBSession = Depends(get_read_session)):
+    def run(db: Session):
+        rating = product_rating(db, product_id)
+        return RatingSummary(
+            productId=product_id,
+            count=rating.reviewCount if rating else 0,
+            average=average(rating.reviewCount, rating.ratingSum) if rating else None,
+            histogram={str(n): getattr(rating, f"stars{n}") if rating else 0 for n in STARS},
+        )
+
+    return await run_db(db, run)
+
+
+@router.post("", response_model=ReviewOut, status_code=201)
+@router.post("/", response_model=ReviewOut, status_code=201, include_in_schema=False)
+async def create_review(
+    body: ReviewCreate,
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    def run(db: Session):
+        if not db.query(models.Product.id).filter(models.Product.id == body.productId).first():
+            raise HTTPException(status_code=404, detail="Product not found")
+        r = models.Review(
+            id=str(uuid.uuid4()),
+            productId=body.productId,
+            userId=current_user.id,
+            rating=body.rating,
+            description=body.description,
+            createdAt=datetime.utcnow(),
+            updatedAt=datetime.utcnow(),
+        )
+        db.add(r)
+        try:
+            # Flush first so a duplicate fails before the aggregate is touched
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="You have already reviewed this product")
+        add_rating(db, body.productId, body.rating)
+        db.commit()
+        db.refresh(r)
+        return to_out(r)
+
+    return await run_db(db, run)
+
+
+@router.delete("/{review_id}")
+async def delete_review(
+    review_id: str,
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    def run(db: Session):
+        author = db.query(models.Review.userId).filter(models.Review.id == review_id).first()
+        if not author:
+            raise HTTPException(status_code=404, detail="Not found")
+        if not current_user.is_admin and author.userId != current_user.id:
+            raise HTTPException(status_code=403, detail="Not allowed")
+        # RETURNING tells us whether this request removed the row, so a concurrent
+        # delete of the same review cannot uncount it twice
+        deleted = db.execute(
+            delete(models.Review)
+            .where(models.Review.id == review_id)
+            .returning(models.Review.productId, models.Review.rating)
+        ).first()
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Not found")
+        if deleted.productId is not None and deleted.rating in STARS:
+            remove_rating(db, deleted.productId, deleted.rating)
+        db.commit()
+        return {"ok": True}
+
+    return await run_db(db, run)
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional, Union
+from db.database import DBSession, run_db
+from db.replica import get_read_session
+from db import models
+from schemas.products import ProductOut, ProductSummary
+from routers.products import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    SUMMARY_COLUMNS,
+    ProductView,
+    to_out,
+    to_summary,
+)
+from utils.pagination import NEXT_CURSOR_HEADER, paginate
+from utils.search import search_query
+
+router = APIRouter(prefix="/search")
+
+
+@router.get("", response_model=List[Union[ProductOut, ProductSummary]])
+@router.get("/", response_model=List[Union[ProductOut, ProductSummary]], include_in_schema=False)
+async def search_products(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: ProductView = "summary",
+    db: DBSession = Depends(get_read_session),
+):
+    """Ranked, prefix-matching product search over title and description."""
+
+    def run(db: Session):
+        full = view == "full"
+        entities = [models.Product] if full else SUMMARY_COLUMNS
+        query, rank = search_query(db, q, entities, category_id=category)
+        if query is None:
+            return []
+        page = paginate(
+            query,
+            keys=[rank, models.Product.id],
+            descending=True,
+            limit=limit,
+            cursor=cursor,
+            scope=f"search:{q}:{category or ''}",
+            key_values=lambda row: [row.rank, row.Product.id if full else row.id],
+        )
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return [to_out(row.Product) if full else to_summary(row) for row in page.items]
+
+    return await run_db(db, run)
@@ -1,88 +1,85 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Union
 
-from db.database import get_db
+from db.database import DBSession, run_db
+from db.replica import get_read_session
 from db import models
-from schemas.products import ProductOut
-from utils.auth import require_roles
+from schemas.products import ProductOut, ProductSummary
+from routers.products import ProductView, product_query, to_view
+from utils.auth import Principal, require_roles
 
 
 router = APIRouter(prefix="/sellers")
 
 
-def product_to_out(p: models.Product) -> ProductOut:
-    return ProductOut(
-        id=p.id,
-        title=p.title,
-        discountPrice=p.discountPrice,
-        salePrice=p.salePrice,
-        description=p.description,
-        colors=p.colors,
-        images=p.images,
-        variants=p.variants,
-        category={"id": p.categoryId},
-    )
+@router.get("/me/products", response_model=List[Union[ProductOut, ProductSummary]])
+async def list_my_products(
+    view: ProductView = "summary",
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(require_roles(["seller"])),
+):
+    def run(db: Session):
+        # Get seller profile for current user
+        seller = (
+            db.query(models.SellerProfile)
+            .filter(models.SellerProfile.userId == current_user.id)
+            .first()
+        )
+        if not seller:
+            raise HTTPException(status_code=404, detail="Seller profile not found")
+        links = (
+            db.query(models.SellerProduct)
+            .filter(models.SellerProduct.sellerId == seller.id)
+            .all()
+        )
+        if not links:
+            return []
+        product_ids = [l.productId for l in links]
+        products = (
+            product_query(db, view)
+            .filter(models.Product.id.in_(product_ids))
+            .all()
+        )
+        return [to_view(p, view) for p in products]
 
+    return await run_db(db, run)
 
-@router.get("/me/products", response_model=List[ProductOut])
-def list_my_products(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_roles(["seller"])),
-):
-    # Get seller profile for current user
-    seller = (
-        db.query(models.SellerProfile)
-        .filter(models.SellerProfile.userId == current_user.id)
-        .first()
-    )
-    if not seller:
-        raise HTTPException(status_code=404, detail="Seller profile not found")
-    links = (
-        db.query(models.SellerProduct)
-        .filter(models.SellerProduct.sellerId == seller.id)
-        .all()
-    )
-    if not links:
-        return []
-    product_ids = [l.productId for l in links]
-    products = (
-        db.query(models.Product)
-        .filter(models.Product.id.in_(product_ids))
-        .all()
-    )
-    return [product_to_out(p) for p in products]
 
+@router.get("/{email}/products", response_model=List[Union[ProductOut, ProductSummary]])
+async def list_products_by_seller_email(
+    email: str, view: ProductView = "summary", db: DBSession = Depends(get_read_session)
+):
+    def run(db: Session):
+        # Find user by username (email)
+        user = db.query(models.User).filter(models.User.username == email).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="Seller user not found")
 
-@router.get("/{email}/products", response_model=List[ProductOut])
-def list_products_by_seller_email(email: str, db: Session = Depends(get_db)):
-    # Find user by username (email)
-    user = db.query(models.User).filter(models.User.username == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Seller user not found")
+        # Find seller profile
+        seller = (
+            db.query(models.SellerProfile)
+            .filter(models.SellerProfile.userId == user.id)
+            .first()
+        )
+        if not seller:
+            raise HTTPException(status_code=404, detail="Seller profile not found")
 
-    # Find seller profile
-    seller = (
-        db.query(models.SellerProfile)
-        .filter(models.SellerProfile.userId == user.id)
-        .first()
-    )
-    if not seller:
-        raise HTTPException(status_code=404, detail="Seller profile not found")
+        # Find product links
+        links = (
+            db.query(models.SellerProduct)
+            .filter(models.SellerProduct.sellerId == seller.id)
+            .all()
+        )
+        product_ids = [l.productId for l in links]
+        if not product_ids:
+            return []
 
-    # Find product links
-    links = (
-        db.query(models.SellerProduct)
-        .filter(models.SellerProduct.sellerId == seller.id)
-        .all()
-    )
-    product_ids = [l.productId for l in links]
-    if not product_ids:
-        return []
+        products = (
+            product_query(db, view)
+            .filter(models.Product.id.in_(product_ids))
+            .all()
+        )
+        return [to_view(p, view) for p in products]
 
-    products = (
-        db.query(models.Product)
-        .filter(models.Product.id.in_(product_ids))
-        .all()
-    )
-    return [product_to_out(p) for p in products]
+    return await run_db(db, run)
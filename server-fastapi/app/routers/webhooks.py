@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from db.database import SessionLocal
+from utils import payment_events
+
+router = APIRouter(prefix="/webhooks")
+
+
+def _record(ev: payment_events.PaymentEvent) -> bool:
+    db = SessionLocal()
+    try:
+        return payment_events.record(db, ev)
+    finally:
+        db.close()
+
+
+@router.post("/stripe")
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(default=None, alias="Stripe-Signature"),
+):
+    """Receive Stripe events; payment_intent outcomes are applied asynchronously in batches."""
+    event = payment_events.verify(await request.body(), stripe_signature)
+    ev = payment_events.parse(event)
+    # Record before acknowledging: once Stripe gets a 2xx the event is durable
+    if await run_in_threadpool(_record, ev):
+        payment_events.worker.submit(ev)
+    return {"received": True}
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import Any, List, Optional
 
@@ -21,12 +22,19 @@ class OrderCreate(BaseModel):
     paymentIntent: Optional[str] = None
     price: Optional[float] = None
 
+class OrderItemOut(BaseModel):
+    productId: str
+    quantity: int
+    unitPrice: float
+
 class OrderOut(BaseModel):
     id: str
     price: float
     status: Any
     paymentStatus: Optional[bool] = None
+    createdAt: Optional[datetime] = None
     products: List[dict]
+    items: List[OrderItemOut] = []
 
 class OrderPatch(BaseModel):
     paymentStatus: Optional[bool] = None
@@ -25,6 +25,17 @@ class ProductOut(BaseModel):
     variants: Any
     category: dict
 
+class ProductSummary(BaseModel):
+    """Compact list/grid representation; images holds at most the first image."""
+    id: str
+    title: str
+    discountPrice: float
+    salePrice: float
+    images: List[Any]
+    category: dict
+    ratingAverage: Optional[float] = None
+    ratingCount: int = 0
+
 class ProductPatch(BaseModel):
     title: Optional[str] = None
     discountPrice: Optional[float] = None
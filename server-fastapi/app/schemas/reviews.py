@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+
+class ReviewCreate(BaseModel):
+    productId: str
+    rating: int = Field(ge=1, le=5)
+    description: str
+
+
+class ReviewOut(BaseModel):
+    id: str
+    productId: str
+    userId: str
+    username: str | None = None
+    userDisplayName: str | None = None
+    rating: int
+    description: str
+    createdAt: str
+
+
+class RatingSummary(BaseModel):
+    productId: str
+    count: int
+    average: Optional[float] = None
+    # "1".."5" -> number of reviews with that many stars
+    histogram: Dict[str, int]
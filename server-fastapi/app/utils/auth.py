@@ -1,11 +1,87 @@
-from typing import Optional, List, Callable
+"""Request authentication from JWT claims.
+
+Tokens carry the user's id, username, roles and ``tokenVersion``. Most handlers only
+need those, so ``get_current_user`` returns a ``Principal`` built from the verified
+claims instead of loading the ``User`` row:
+
+- verified tokens are kept in a per-process LRU for ``AUTH_CACHE_TTL`` seconds, so a
+  repeat request skips signature verification;
+- each user's current ``tokenVersion`` and admin flag are cached (in the configured
+  cache backend) for the same TTL; a token whose version is older is rejected.
+  Bumping the version (``revoke_tokens``, role changes) therefore locks out older
+  tokens within the TTL, and immediately in this process (or everywhere with the
+  Redis backend).
+
+Handlers that read or modify other user columns depend on ``get_current_user_record``.
+``jose`` (and the cryptography backend it loads) is imported on the first token
+encode or decode, so anonymous requests on a cold process skip it.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, List, Callable, NamedTuple, Tuple
+
 from fastapi import Depends, Header, HTTPException
 from sqlalchemy.orm import Session
-from jose import jwt, JWTError
 
 from core import settings
 from db.database import get_db
 from db import models
+from utils.cache import Cache, MemoryBackend, build_cache
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as described by their token."""
+
+    id: str
+    username: str
+    roles: Tuple[str, ...]
+    isAdmin: bool
+    tokenVersion: int
+
+    @property
+    def is_admin(self) -> bool:
+        return bool(self.isAdmin) or "admin" in self.roles
+
+
+# Bearer tokens are credentials: keep them in process memory only, never in Redis
+_tokens = Cache(MemoryBackend(settings.AUTH_CACHE_MAX_ENTRIES), settings.AUTH_CACHE_TTL)
+_states = build_cache(
+    ttl=settings.AUTH_CACHE_TTL, max_entries=settings.AUTH_CACHE_MAX_ENTRIES, prefix="auth:"
+)
+
+
+def auth_caches() -> dict:
+    """The auth caches by name, for metrics."""
+    return {"auth-tokens": _tokens, "auth-states": _states}
+
+
+class _Claims(NamedTuple):
+    sub: str
+    username: str
+    roles: Tuple[str, ...]
+    ver: int
+    exp: int
+
+
+def _state_key(user_id: str) -> str:
+    return f"user-state:{user_id}"
+
+
+def create_token(user: models.User) -> str:
+    # Include standard claims (sub, roles, username, exp) plus what authorization needs
+    exp = int((datetime.now(timezone.utc) + settings.access_token_expires).timestamp())
+    payload = {
+        "sub": user.id,
+        "username": user.username,
+        "roles": user.roles or [],
+        "ver": user.tokenVersion or 0,
+        "exp": exp,
+    }
+    from jose import jwt
+
+    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm="HS256")
 
 
 def parse_bearer(auth_header: Optional[str]) -> Optional[str]:
@@ -18,45 +94,125 @@ def parse_bearer(auth_header: Optional[str]) -> Optional[str]:
 
 
 def decode_token(token: str) -> dict:
+    from jose import jwt, JWTError
+
     try:
         return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def _verified_claims(token: str) -> _Claims:
+    cached = _tokens.get(token)
+    # Never trust a cached token past its own expiry
+    if cached is not None and cached.exp > time.time():
+        return cached
+    payload = decode_token(token)
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    claims = _Claims(
+        sub=payload["sub"],
+        username=payload.get("username", ""),
+        roles=tuple(payload.get("roles") or ()),
+        # Tokens issued before versioning carry no "ver"
+        ver=int(payload.get("ver", 0)),
+        exp=int(payload.get("exp", 0)),
+    )
+    _tokens.set(token, claims)
+    return claims
+
+
+def token_subject(auth_header: Optional[str]) -> Optional[str]:
+    """The user id of a valid bearer token in ``auth_header``, else None; never raises."""
+    token = parse_bearer(auth_header)
+    if not token:
+        return None
+    try:
+        return _verified_claims(token).sub
+    except HTTPException:
+        return None
+
+
+def _user_state(db: Session, user_id: str) -> Optional[dict]:
+    """The user's current token version and admin flag, or None if the user is gone."""
+    state = _states.get(_state_key(user_id))
+    if state is None:
+        row = (
+            db.query(models.User.tokenVersion, models.User.isAdmin)
+            .filter(models.User.id == user_id)
+            .first()
+        )
+        if row is None:
+            return None
+        state = {"tokenVersion": row.tokenVersion or 0, "isAdmin": bool(row.isAdmin)}
+        _states.set(_state_key(user_id), state)
+    return state
+
+
+def authenticate(token: str, db: Session) -> Principal:
+    claims = _verified_claims(token)
+    state = _user_state(db, claims.sub)
+    if state is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if claims.ver < state["tokenVersion"]:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return Principal(
+        id=claims.sub,
+        username=claims.username,
+        roles=claims.roles,
+        isAdmin=state["isAdmin"],
+        tokenVersion=claims.ver,
+    )
+
+
+def revoke_tokens(db: Session, user: models.User) -> None:
+    """Invalidate every token issued to ``user`` so far; commits.
+
+    Issue a fresh token with ``create_token(user)`` afterwards if the user stays
+    signed in.
+    """
+    user.tokenVersion = (user.tokenVersion or 0) + 1
+    db.commit()
+    _states.invalidate(_state_key(user.id))
+
+
 def get_optional_user(
     authorization: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
-) -> Optional[models.User]:
+) -> Optional[Principal]:
     token = parse_bearer(authorization)
     if not token:
         return None
-    payload = decode_token(token)
-    user = db.query(models.User).filter(models.User.id == payload.get("sub")).first()
-    return user
+    return authenticate(token, db)
 
 
 def get_current_user(
     authorization: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
-) -> models.User:
+) -> Principal:
     token = parse_bearer(authorization)
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
-    payload = decode_token(token)
-    user = db.query(models.User).filter(models.User.id == payload.get("sub")).first()
+    return authenticate(token, db)
+
+
+def get_current_user_record(
+    principal: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> models.User:
+    """The authenticated user's full row, for handlers that need more than the claims."""
+    user = db.get(models.User, principal.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 def require_roles(required: List[str]) -> Callable:
-    def dependency(user: models.User = Depends(get_current_user)) -> models.User:
-        user_roles = set((user.roles or []))
+    def dependency(user: Principal = Depends(get_current_user)) -> Principal:
         # Admin overrides
-        if user.isAdmin or ("admin" in user_roles):
+        if user.is_admin:
             return user
-        if not set(required).issubset(user_roles):
+        if not set(required).issubset(user.roles):
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return user
 
@@ -0,0 +1,234 @@
+"""Read-through cache for hot catalog reads (products, categories, comment counts).
+
+Values are JSON-compatible payloads (what the handler would return). Two backends:
+
+- ``memory``: per-process LRU with a TTL per entry; invalidation is local, so other
+  processes/Lambdas see a change at the latest after ``CACHE_TTL`` seconds.
+- ``redis``: any server speaking the Redis protocol (``REDIS_URL``), shared by every
+  process. Needs the optional ``redis`` package (``pip install .[cache]``).
+
+Set ``CACHE_BACKEND=none`` to disable caching. Backend failures are logged and treated
+as misses so an unavailable cache never fails a request.
+
+``async def`` code uses the ``*_async`` methods: Redis round trips then run in the
+threadpool instead of blocking the event loop, while memory lookups stay inline.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from core import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def product_key(product_id: str) -> str:
+    return f"product:{product_id}"
+
+
+def category_key(category_id: str) -> str:
+    return f"category:{category_id}"
+
+
+def comment_count_key(product_id: str) -> str:
+    return f"comments:count:{product_id}"
+
+
+CATEGORIES_KEY = "categories:all"
+
+
+class MemoryBackend:
+    """Thread-safe LRU mapping with per-entry expiry."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    """Shared backend over the Redis protocol; values are stored as JSON strings."""
+
+    blocking = True  # network round trips
+
+    def __init__(self, url: str, prefix: str = "catalog:"):
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - depends on optional extra
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self.prefix = prefix
+        self.evictions = 0  # evictions happen server-side (maxmemory-policy)
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+    def get(self, key: str) -> Any:
+        raw = self._client.get(self.prefix + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        self._client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*[self.prefix + k for k in keys])
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class Cache:
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for ``key`` or None on a miss."""
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            logger.warning("cache get failed for %s", key, exc_info=True)
+            self.errors += 1
+            value = _MISSING
+        if value is _MISSING:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.backend is None or value is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception:
+            logger.warning("cache set failed for %s", key, exc_info=True)
+            self.errors += 1
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` or call ``loader`` and cache its result.
+
+        A loader result of ``None`` (e.g. row not found) is returned but not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    async def get_or_load_async(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """``get_or_load`` for async handlers; ``loader`` returns an awaitable."""
+        value = await self.get_async(key)
+        if value is None:
+            value = await loader()
+            await self.set_async(key, value)
+        return value
+
+    async def _off_loop(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if getattr(self.backend, "blocking", False):
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get_async(self, key: str) -> Any:
+        return await self._off_loop(self.get, key)
+
+    async def set_async(self, key: str, value: Any) -> None:
+        await self._off_loop(self.set, key, value)
+
+    async def invalidate_async(self, *keys: str) -> None:
+        await self._off_loop(self.invalidate, *keys)
+
+    def invalidate(self, *keys: str) -> None:
+        if self.backend is None:
+            return
+        self.invalidations += len(keys)
+        try:
+            self.backend.delete(*keys)
+        except Exception:
+            logger.warning("cache invalidation failed for %s", keys, exc_info=True)
+            self.errors += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": settings.CACHE_BACKEND if self.backend is not None else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits / lookups) if lookups else None,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "size": self.backend.size() if self.backend is not None else 0,
+            "maxEntries": getattr(self.backend, "max_entries", None),
+            "ttl": self.ttl,
+        }
+
+
+def build_cache(
+    ttl: Optional[int] = None, max_entries: Optional[int] = None, prefix: str = "catalog:"
+) -> Cache:
+    kind = (settings.CACHE_BACKEND or "none").lower()
+    if kind == "memory":
+        backend = MemoryBackend(max_entries or settings.CACHE_MAX_ENTRIES)
+    elif kind == "redis":
+        if not settings.REDIS_URL:
+            raise RuntimeError("CACHE_BACKEND=redis requires REDIS_URL")
+        backend = RedisBackend(settings.REDIS_URL, prefix=prefix)
+    elif kind == "none":
+        backend = None
+    else:
+        raise RuntimeError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+    return Cache(backend, ttl or settings.CACHE_TTL)
+
+
+cache = build_cache()
@@ -0,0 +1,45 @@
+"""Positions of incremental batch jobs over orders (``JobCheckpoint``).
+
+A job consumes orders with ``checkpoint <= Order.createdAt < cutoff`` and stores the
+cutoff in the same transaction as its output, so a crashed run is simply repeated. The
+cutoff lags the clock by ``lag`` so orders whose transaction began earlier but commits
+later are not skipped.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db import models
+
+DEFAULT_LAG = timedelta(minutes=1)
+
+
+def cutoff(lag: timedelta = DEFAULT_LAG) -> datetime:
+    return datetime.utcnow() - lag
+
+
+def lock(db: Session, name: str) -> None:
+    """Serialize runs of job ``name`` until the caller's transaction ends.
+
+    Take it before ``get`` in jobs whose output is not idempotent (counters), so a
+    second run waits and then reads the checkpoint the first one stored.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
+
+
+def get(db: Session, name: str) -> Optional[datetime]:
+    return db.query(models.JobCheckpoint.position).filter(models.JobCheckpoint.name == name).scalar()
+
+
+def store(db: Session, name: str, position: datetime) -> None:
+    """Record ``position`` for ``name``; the caller commits."""
+    stmt = insert(models.JobCheckpoint).values(name=name, position=position, updatedAt=datetime.utcnow())
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.JobCheckpoint.name],
+            set_={"position": stmt.excluded.position, "updatedAt": stmt.excluded.updatedAt},
+        )
+    )
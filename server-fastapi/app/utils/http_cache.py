@@ -0,0 +1,99 @@
+"""Conditional GET support: strong ETags, Last-Modified and 304 responses.
+
+Validators are derived from row ids and ``updatedAt`` (maintained on every ORM write),
+so they can be computed, and a 304 answered, without serializing the body.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+# Bump when the serialized shape of cached resources changes so old ETags stop matching.
+REPRESENTATION_VERSION = "2"
+
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    h = hashlib.sha256(REPRESENTATION_VERSION.encode())
+    for part in parts:
+        h.update(b"\x1f")
+        h.update(part.isoformat().encode() if isinstance(part, datetime) else str(part).encode())
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def rows_etag(kind: str, rows: Iterable, *extra) -> str:
+    """ETag for a collection from its members' (id, updatedAt) pairs, in order."""
+    parts = [kind, *extra]
+    for r in rows:
+        parts.extend((r.id, r.updatedAt))
+    return make_etag(*parts)
+
+
+def latest(rows: Iterable) -> Optional[datetime]:
+    return max((r.updatedAt for r in rows if r.updatedAt is not None), default=None)
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # DB timestamps are naive UTC (datetime.utcnow)
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def http_date(dt: datetime) -> str:
+    return format_datetime(_as_utc(dt), usegmt=True)
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (RFC 9110 precedence)."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip() for t in inm.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        # HTTP dates have one-second resolution
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def versioned(data, etag: str, last_modified: Optional[datetime]) -> dict:
+    """Cache entry carrying a payload together with its validators."""
+    return {
+        "data": data,
+        "etag": etag,
+        "lastModified": last_modified.isoformat() if last_modified else None,
+    }
+
+
+def respond_versioned(request: Request, response: Response, entry: dict):
+    """Return a 304 for a matching conditional request, else the entry's payload."""
+    last_modified = datetime.fromisoformat(entry["lastModified"]) if entry["lastModified"] else None
+    if is_not_modified(request, entry["etag"], last_modified):
+        return not_modified(entry["etag"], last_modified)
+    set_validators(response, entry["etag"], last_modified)
+    return entry["data"]
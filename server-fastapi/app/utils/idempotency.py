@@ -0,0 +1,175 @@
+"""Idempotency-Key support for mutating endpoints (POST /api/orders).
+
+A request carrying ``Idempotency-Key`` first *claims* the key by inserting an
+``in_progress`` row (committed immediately, so concurrent duplicates see it). The
+handler then records its response in the same transaction as its own writes, so a
+retry either replays the stored response or finds no trace of the first attempt.
+
+- same key + same payload, completed   -> stored response is replayed
+- same key + same payload, in progress -> 409 (the first request is still running)
+- same key + different payload         -> 422
+- key expired (IDEMPOTENCY_TTL) or abandoned past its lock -> the key is reclaimed
+
+Expired keys are removed by the sweeper, e.g. from a scheduled job:
+
+    python -m utils.idempotency sweep   (cwd: server-fastapi/app)
+"""
+import argparse
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core import settings
+from db import models
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class Claim:
+    scope: str
+    key: str
+    # Set when the key already completed: the stored response to replay
+    replay: Optional[Any] = None
+    status_code: Optional[int] = None
+
+
+def request_hash(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def claim(db: Session, scope: str, key: str, req_hash: str) -> Claim:
+    """Claim ``key`` for this request or return the stored outcome of an earlier one."""
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+    now = datetime.utcnow()
+    lock_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_TTL)
+    inserted = db.execute(
+        insert(models.IdempotencyKey)
+        .values(
+            scope=scope,
+            key=key,
+            requestHash=req_hash,
+            status="in_progress",
+            createdAt=now,
+            lockedUntil=lock_until,
+            expiresAt=expires_at,
+        )
+        .on_conflict_do_nothing()
+        .returning(models.IdempotencyKey.key)
+    ).first()
+    if inserted:
+        db.commit()
+        return Claim(scope, key)
+
+    row = db.execute(
+        select(models.IdempotencyKey)
+        .where(models.IdempotencyKey.scope == scope, models.IdempotencyKey.key == key)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if row is None:
+        # Swept between our INSERT and SELECT; start over.
+        db.rollback()
+        return claim(db, scope, key, req_hash)
+    if row.expiresAt > now:
+        if row.requestHash != req_hash:
+            db.rollback()
+            raise HTTPException(
+                status_code=422, detail=f"{HEADER} was already used with a different request"
+            )
+        if row.status == "completed":
+            replay = Claim(scope, key, replay=row.responseBody, status_code=row.responseCode)
+            db.rollback()
+            return replay
+        if row.lockedUntil and row.lockedUntil > now:
+            db.rollback()
+            raise HTTPException(
+                status_code=409, detail=f"A request with this {HEADER} is already in progress"
+            )
+    # Expired, or abandoned by a request that never finished: take it over.
+    row.requestHash = req_hash
+    row.status = "in_progress"
+    row.responseCode = None
+    row.responseBody = None
+    row.createdAt = now
+    row.lockedUntil = lock_until
+    row.expiresAt = expires_at
+    db.commit()
+    return Claim(scope, key)
+
+
+def record(db: Session, c: Claim, status_code: int, body: Any) -> None:
+    """Store the response; call before the handler's commit so both land atomically."""
+    db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.scope == c.scope, models.IdempotencyKey.key == c.key
+    ).update(
+        {
+            models.IdempotencyKey.status: "completed",
+            models.IdempotencyKey.responseCode: status_code,
+            models.IdempotencyKey.responseBody: body,
+            models.IdempotencyKey.lockedUntil: None,
+        },
+        synchronize_session=False,
+    )
+
+
+def release(db: Session, c: Claim) -> None:
+    """Forget an unfinished claim after the handler failed, so the client may retry."""
+    db.rollback()
+    db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.scope == c.scope,
+        models.IdempotencyKey.key == c.key,
+        models.IdempotencyKey.status == "in_progress",
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def sweep(db: Session, batch_size: int = 1000) -> int:
+    """Delete expired keys in bounded batches; returns the number removed."""
+    removed = 0
+    table = models.IdempotencyKey
+    while True:
+        expired = (
+            select(table.scope, table.key)
+            .where(table.expiresAt < datetime.utcnow())
+            .limit(batch_size)
+        )
+        n = db.execute(
+            delete(table).where(tuple_(table.scope, table.key).in_(expired))
+        ).rowcount
+        db.commit()
+        removed += n
+        if n < batch_size:
+            return removed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Idempotency key maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sw = sub.add_parser("sweep", help="delete expired idempotency keys")
+    sw.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "sweep":
+            print(f"removed {sweep(db, batch_size=args.batch_size)} expired keys")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
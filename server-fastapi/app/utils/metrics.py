@@ -0,0 +1,164 @@
+"""Prometheus metrics.
+
+Served as text exposition on ``GET /metrics`` (``routers/metrics.py``):
+
+- ``http_requests_total`` / ``http_request_duration_seconds`` per method, route
+  template (``/api/products/{id}``, never the raw path) and status;
+  ``http_requests_in_flight`` per method (the route is only known once routing ran);
+- ``db_pool_*`` gauges per engine and ``cache_*_total`` counters per cache, sampled
+  from ``db.database.pool_stats()`` and ``Cache.stats()`` at most once a second per
+  process, and on every scrape;
+- ``orders_created_total``, ``orders_rejected_total`` and ``payments_total``,
+  incremented where orders are placed and payment events applied.
+
+Under uvicorn with several workers set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory (cleared before start): every worker writes its samples there and any worker
+answering the scrape reports the sum. Without it, as behind Mangum where each Lambda
+container is its own process, a scrape reports the answering process only.
+"""
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+SAMPLE_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests = Counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+http_latency = Histogram(
+    "http_request_duration_seconds",
+    "Time to the end of the response body",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+http_in_flight = Gauge(
+    "http_requests_in_flight", "Requests being served", ["method"], multiprocess_mode="livesum"
+)
+
+db_pool_size = Gauge("db_pool_size", "Configured pool size", ["engine"], multiprocess_mode="livesum")
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections in use", ["engine"], multiprocess_mode="livesum"
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size", ["engine"], multiprocess_mode="livesum"
+)
+db_pool_connects = Counter("db_pool_connects_total", "New database connections", ["engine"])
+
+cache_hits = Counter("cache_hits_total", "Cache lookups served from the cache", ["cache"])
+cache_misses = Counter("cache_misses_total", "Cache lookups that went to the loader", ["cache"])
+cache_evictions = Counter("cache_evictions_total", "Entries evicted for space", ["cache"])
+
+orders_created = Counter("orders_created_total", "Orders committed", ["payment_mode"])
+orders_rejected = Counter("orders_rejected_total", "Orders refused or abandoned", ["reason"])
+payments = Counter("payments_total", "Orders whose payment status was set by a Stripe event", ["outcome"])
+
+_sample_lock = threading.Lock()
+_last_sample = 0.0
+# (family, label) -> cumulative value already added to the counter
+_seen: Dict[Tuple[str, str], float] = {}
+
+
+def _advance(counter: Counter, family: str, label: str, total: float) -> None:
+    """Add the growth of a cumulative value that is tracked elsewhere to ``counter``."""
+    key = (family, label)
+    delta = total - _seen.get(key, 0)
+    if delta > 0:
+        counter.labels(label).inc(delta)
+    _seen[key] = total
+
+
+def sample(force: bool = False) -> None:
+    """Copy pool and cache statistics into the metrics; throttled unless ``force``."""
+    global _last_sample
+    now = time.monotonic()
+    if not force and now - _last_sample < SAMPLE_INTERVAL:
+        return
+    if not _sample_lock.acquire(blocking=force):
+        return
+    try:
+        _last_sample = now
+        from db.database import pool_stats
+        from utils.auth import auth_caches
+        from utils.cache import cache
+
+        for pool in pool_stats():
+            engine = pool["engine"]
+            db_pool_size.labels(engine).set(pool.get("size", 0))
+            db_pool_checked_out.labels(engine).set(pool.get("checkedOut", pool["inUse"]))
+            db_pool_overflow.labels(engine).set(pool.get("overflow", 0))
+            _advance(db_pool_connects, "connects", engine, pool["connects"])
+        for name, c in {"catalog": cache, **auth_caches()}.items():
+            stats = c.stats()
+            _advance(cache_hits, "hits", name, stats["hits"])
+            _advance(cache_misses, "misses", name, stats["misses"])
+            _advance(cache_evictions, "evictions", name, stats["evictions"])
+    finally:
+        _sample_lock.release()
+
+
+def exposition() -> Tuple[bytes, str]:
+    """The metrics text and its content type."""
+    sample(force=True)
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def route_template(scope) -> str:
+    """The matched route's path template including router prefixes, or "unmatched"."""
+    route = scope.get("route")
+    regex = getattr(route, "path_regex", None)
+    if regex is None:
+        return "unmatched"
+    # Routes of included routers may carry their path without the include prefix;
+    # the prefix is whatever precedes the part of the request path the route matched
+    path = scope["path"]
+    for i, ch in enumerate(path):
+        if ch == "/" and regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+        http_in_flight.labels(method).inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.labels(method).dec()
+            template = route_template(scope)
+            http_requests.labels(method, template, str(status)).inc()
+            http_latency.labels(method, template).observe(time.perf_counter() - started)
+            sample()
@@ -0,0 +1,64 @@
+"""Product ownership checks for seller mutations.
+
+"May this user change product P?" (admin, or the seller the product is listed under)
+is answered for any number of products with one query joining Product ->
+SellerProduct -> SellerProfile. Handlers depend on ``get_ownership``; FastAPI builds
+one ``Ownership`` per request, so its answers are memoized for the rest of the request.
+"""
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from db.database import get_db
+from db import models
+from utils.auth import Principal, get_current_user
+
+
+class Ownership:
+    def __init__(self, db: Session, principal: Principal):
+        self.db = db
+        self.principal = principal
+        # product id -> may modify; products found not to exist are recorded as None
+        self._known: Dict[str, Optional[bool]] = {}
+
+    def _resolve(self, product_ids: Iterable[str]) -> None:
+        pending = {pid for pid in product_ids if pid not in self._known}
+        if not pending:
+            return
+        rows = (
+            self.db.query(models.Product.id, models.SellerProfile.userId)
+            .outerjoin(models.SellerProduct, models.SellerProduct.productId == models.Product.id)
+            .outerjoin(models.SellerProfile, models.SellerProfile.id == models.SellerProduct.sellerId)
+            .filter(models.Product.id.in_(pending))
+            .all()
+        )
+        for r in rows:
+            self._known[r.id] = self.principal.is_admin or r.userId == self.principal.id
+        for pid in pending:
+            self._known.setdefault(pid, None)
+
+    def owned(self, product_ids: Iterable[str]) -> Set[str]:
+        """The subset of ``product_ids`` the user may modify (existing products only)."""
+        product_ids = list(product_ids)
+        self._resolve(product_ids)
+        return {pid for pid in product_ids if self._known[pid]}
+
+    def owns(self, product_id: str) -> bool:
+        return product_id in self.owned([product_id])
+
+    def require(self, *product_ids: str) -> None:
+        """404 if any product does not exist, 403 if any is not the user's."""
+        self._resolve(product_ids)
+        missing = [pid for pid in product_ids if self._known[pid] is None]
+        if missing:
+            raise HTTPException(status_code=404, detail="Not found")
+        if not all(self._known[pid] for pid in product_ids):
+            raise HTTPException(status_code=403, detail="Not allowed")
+
+
+def get_ownership(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+) -> Ownership:
+    return Ownership(db, current_user)
@@ -0,0 +1,86 @@
+"""Keyset (cursor) pagination helpers shared by list endpoints.
+
+Cursors are opaque, URL-safe tokens carrying the sort key and id of the last
+row of a page plus the name of the ordering they belong to. Pages are fetched
+with a row comparison on ``(sort key, id)`` so every page costs one index
+range scan, no matter how deep the client has paged.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(scope: str, values: List[Any]) -> str:
+    payload = [scope] + [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, scope: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(payload, list) or not payload or payload[0] != scope:
+        raise HTTPException(status_code=400, detail="Cursor does not match this query")
+    return payload[1:]
+
+
+def _coerce(column, value: Any) -> Any:
+    # JSON has no datetime type; restore it from the column definition.
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def paginate(
+    q,
+    *,
+    keys: list,
+    descending: bool,
+    limit: int,
+    cursor: Optional[str],
+    scope: str,
+    key_values: Optional[Callable[[Any], List[Any]]] = None,
+) -> Page:
+    """Apply keyset pagination to a Query ordered by ``keys`` (last key must be unique).
+
+    Fetches ``limit + 1`` rows to learn whether a further page exists without a COUNT.
+    ``key_values`` extracts the sort values from a row when ``keys`` are not plain
+    attributes of it (e.g. computed expressions).
+    """
+    if cursor:
+        values = decode_cursor(cursor, scope)
+        if len(values) != len(keys):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        bound = tuple_(*[literal(_coerce(k, v), k.type) for k, v in zip(keys, values)])
+        row = tuple_(*keys)
+        q = q.filter(row < bound if descending else row > bound)
+    q = q.order_by(*[k.desc() if descending else k.asc() for k in keys])
+    rows = q.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    last = rows[-1]
+    values = key_values(last) if key_values else [getattr(last, k.key) for k in keys]
+    return Page(rows, encode_cursor(scope, values))
@@ -0,0 +1,91 @@
+"""Password hashing on a dedicated, bounded worker pool.
+
+bcrypt at cost 12 costs ~250 ms of CPU per hash or verify. Running it on the request
+threadpool lets a burst of logins take every worker thread and stall unrelated
+requests, so hashing runs on its own small thread pool (bcrypt releases the GIL,
+so threads hash in parallel) behind an admission limit:
+
+- at most ``BCRYPT_WORKERS`` hashes run at once;
+- at most ``BCRYPT_QUEUE_LIMIT`` more wait for a worker;
+- anything beyond that is rejected immediately with 503 and ``Retry-After``.
+
+Hashes use the ``BCRYPT_SALT`` cost (bcrypt log rounds). Hashes made with another
+cost still verify and are replaced on the next successful login.
+
+passlib and the bcrypt backend are loaded on first use, not at import: only login and
+signup need them, so other requests on a cold process do not pay for them.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from core import settings
+
+RETRY_AFTER_SECONDS = 1
+
+
+@lru_cache(maxsize=1)
+def pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_SALT,
+        # Any other cost counts as outdated, so verify_and_update rehashes it
+        bcrypt__min_rounds=settings.BCRYPT_SALT,
+        bcrypt__max_rounds=settings.BCRYPT_SALT,
+    )
+
+
+def _hash(password: str) -> str:
+    return pwd_context().hash(password)
+
+
+def _verify(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context().verify_and_update(password, hashed)
+
+
+class HashingPool:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests, retry shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+pool = HashingPool(
+    settings.BCRYPT_WORKERS or min(4, os.cpu_count() or 1),
+    settings.BCRYPT_QUEUE_LIMIT,
+)
+
+
+async def hash_password(password: str) -> str:
+    return await pool.run(_hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Return (matches, replacement hash if the stored one uses an outdated cost)."""
+    return await pool.run(_verify, password, hashed)
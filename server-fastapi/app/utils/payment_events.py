@@ -0,0 +1,248 @@
+"""Stripe webhook ingestion: verify, deduplicate, then apply in batches off the request.
+
+The webhook handler only verifies the signature and inserts the event into
+``StripeEvent`` (``ON CONFLICT DO NOTHING`` on the event id drops redeliveries), then
+hands it to an in-process worker and returns. The worker groups queued events, marks
+paid orders with one statement and abandons canceled ones (stock returned, state set).
+
+``payment_intent.payment_failed`` only reports a failed attempt: the customer may
+retry on the same intent, so the order keeps its reserved stock. Only a canceled
+intent can no longer be paid.
+
+The queue is an optimization, not the source of truth: events that were recorded but
+not applied (full queue, process frozen or killed, e.g. a Lambda after its response)
+are picked up when a worker starts, or by a scheduled
+
+    python -m utils.payment_events drain   (cwd: server-fastapi/app)
+"""
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core import settings
+from db import models
+from utils import metrics
+from utils.payments import abandon_order, settle_late_payment
+
+logger = logging.getLogger(__name__)
+
+SUCCEEDED = {"payment_intent.succeeded"}
+CANCELED = {"payment_intent.canceled"}
+
+
+class PaymentEvent(NamedTuple):
+    id: str
+    type: str
+    payment_intent: Optional[str]
+
+
+def verify(payload: bytes, signature: Optional[str]) -> dict:
+    """Check the Stripe-Signature header and return the decoded event."""
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Stripe webhooks are not configured")
+    import stripe as stripe_sdk
+
+    try:
+        stripe_sdk.WebhookSignature.verify_header(
+            payload, signature, settings.STRIPE_WEBHOOK_SECRET, stripe_sdk.Webhook.DEFAULT_TOLERANCE
+        )
+        return json.loads(payload)
+    except (stripe_sdk.SignatureVerificationError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+
+def parse(event: dict) -> PaymentEvent:
+    obj = (event.get("data") or {}).get("object") or {}
+    intent = obj.get("id") if obj.get("object") == "payment_intent" else None
+    return PaymentEvent(event["id"], event.get("type", ""), intent)
+
+
+def record(db: Session, ev: PaymentEvent) -> bool:
+    """Persist the event; False if this id was already received."""
+    inserted = db.execute(
+        insert(models.StripeEvent)
+        .values(id=ev.id, type=ev.type, paymentIntent=ev.payment_intent, receivedAt=datetime.utcnow())
+        .on_conflict_do_nothing()
+        .returning(models.StripeEvent.id)
+    ).first()
+    db.commit()
+    return inserted is not None
+
+
+def apply(db: Session, events: Iterable[PaymentEvent]) -> None:
+    """Apply a batch of events to orders, then mark them processed.
+
+    Successes on live orders are one UPDATE. An order settled before its intent
+    succeeded (abandoned, stock returned) goes through ``settle_late_payment`` instead,
+    which reserves the stock again. Each canceled order goes through ``abandon_order``,
+    which returns its reserved stock and sets its state. Both skip orders already
+    handled, so a batch interrupted before the events are marked is safely applied
+    again by drain.
+    """
+    events = list(events)
+    if not events:
+        return
+    paid = {e.payment_intent for e in events if e.type in SUCCEEDED and e.payment_intent}
+    canceled = {e.payment_intent for e in events if e.type in CANCELED and e.payment_intent} - paid
+    succeeded = failures = review = 0
+    if paid:
+        succeeded = db.execute(
+            update(models.Order)
+            .where(
+                models.Order.paymentIntent.in_(paid),
+                models.Order.paymentStatus.is_not(True),
+                models.Order.status["state"].astext.is_(None),
+            )
+            .values(paymentStatus=True, updatedAt=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        settled = [
+            r.id
+            for r in db.query(models.Order.id).filter(
+                models.Order.paymentIntent.in_(paid),
+                models.Order.paymentStatus.is_not(True),
+                models.Order.status["state"].astext.is_not(None),
+            )
+        ]
+        db.rollback()
+        for order_id in settled:
+            outcome = settle_late_payment(db, order_id)
+            succeeded += outcome == "reserved"
+            review += outcome == "needs_review"
+    if canceled:
+        # A success is final: late or out-of-order cancellations never revert it.
+        unpaid = [
+            r.id
+            for r in db.query(models.Order.id).filter(
+                models.Order.paymentIntent.in_(canceled),
+                models.Order.paymentStatus.is_not(True),
+                models.Order.status["state"].astext.is_(None),
+            )
+        ]
+        db.rollback()
+        for order_id in unpaid:
+            failures += abandon_order(db, order_id, "payment_canceled")
+    db.execute(
+        update(models.StripeEvent)
+        .where(models.StripeEvent.id.in_([e.id for e in events]))
+        .values(processedAt=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    metrics.payments.labels("succeeded").inc(succeeded)
+    metrics.payments.labels("failed").inc(failures)
+    metrics.payments.labels("needs_review").inc(review)
+
+
+def drain(db: Session, batch_size: int = 500) -> int:
+    """Apply every recorded-but-unprocessed event, oldest first; returns the count."""
+    total = 0
+    while True:
+        rows = (
+            db.query(models.StripeEvent.id, models.StripeEvent.type, models.StripeEvent.paymentIntent)
+            .filter(models.StripeEvent.processedAt.is_(None))
+            .order_by(models.StripeEvent.receivedAt)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return total
+        apply(db, [PaymentEvent(*r) for r in rows])
+        total += len(rows)
+
+
+class EventWorker:
+    """Daemon thread applying queued events in batches of up to WEBHOOK_BATCH_SIZE."""
+
+    def __init__(self, batch_size: int, flush_interval: float, maxsize: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[PaymentEvent]" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, ev: PaymentEvent) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(ev)
+        except queue.Full:
+            # Already durable in StripeEvent; the next drain applies it.
+            logger.warning("payment event queue full; %s left for drain", ev.id)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="payment-events", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[PaymentEvent]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        from db.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            drain(db)  # backlog left by earlier processes
+        except Exception:
+            logger.exception("draining pending payment events failed")
+            db.rollback()
+        finally:
+            db.close()
+        while True:
+            batch = self._next_batch()
+            db = SessionLocal()
+            try:
+                apply(db, batch)
+            except Exception:
+                logger.exception("applying %d payment events failed; left for drain", len(batch))
+                db.rollback()
+            finally:
+                db.close()
+
+
+worker = EventWorker(settings.WEBHOOK_BATCH_SIZE, settings.WEBHOOK_FLUSH_MS / 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stripe webhook event maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    dr = sub.add_parser("drain", help="apply recorded events that were never processed")
+    dr.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "drain":
+            print(f"applied {drain(db, batch_size=args.batch_size)} events")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
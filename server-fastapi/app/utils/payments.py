@@ -0,0 +1,199 @@
+"""Stripe integration: one shared client and PaymentIntent creation/reconciliation.
+
+The client is built once per process with explicit timeouts and a pooled HTTP session
+(connections are reused across requests). ``STRIPE_API_BASE`` points it at another
+server, e.g. a local stripe-mock, for development and load tests.
+
+Orders are committed before the PaymentIntent is created, so no DB connection is
+held during the Stripe round trip. If creation fails the order is abandoned (stock
+returned) right away; orders left without an intent by a crash are abandoned by:
+
+    python -m utils.payments reconcile   (cwd: server-fastapi/app)
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from core import settings
+from db import models
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentError(Exception):
+    pass
+
+
+@lru_cache(maxsize=1)
+def get_stripe():
+    """The process-wide StripeClient, or None when STRIPE_SECRET_KEY is unset."""
+    if not settings.STRIPE_SECRET_KEY:
+        return None
+    import stripe as stripe_sdk
+
+    kwargs = {}
+    if settings.STRIPE_API_BASE:
+        kwargs["base_addresses"] = {"api": settings.STRIPE_API_BASE}
+    return stripe_sdk.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        http_client=stripe_sdk.RequestsClient(
+            timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT)
+        ),
+        max_network_retries=settings.STRIPE_MAX_RETRIES,
+        **kwargs,
+    )
+
+
+def is_stripe_order(status) -> bool:
+    return bool(status) and status.get("paymentMode") == "stripe"
+
+
+def create_payment_intent(order_id: str, amount: float) -> Tuple[str, str]:
+    """Create the PaymentIntent for an order; returns (intent id, client secret).
+
+    Uses the order id as Stripe's idempotency key, so the SDK's network retries can
+    never create a second intent for the same order.
+    """
+    client = get_stripe()
+    if client is None:
+        raise PaymentError("Stripe is not configured")
+    import stripe as stripe_sdk
+
+    try:
+        pi = client.payment_intents.create(
+            params={
+                "amount": int(round(amount * 100)),
+                "currency": "usd",
+                "automatic_payment_methods": {"enabled": True},
+                "metadata": {"orderId": order_id},
+            },
+            options={"idempotency_key": f"order:{order_id}"},
+        )
+    except stripe_sdk.StripeError as exc:
+        raise PaymentError(str(exc)) from exc
+    return pi.id, pi.client_secret
+
+
+def attach_payment_intent(db: Session, order_id: str, intent_id: str) -> bool:
+    """Store the intent on a still-live order; False if it was abandoned meanwhile."""
+    n = (
+        db.query(models.Order)
+        .filter(models.Order.id == order_id, models.Order.status["state"].astext.is_(None))
+        .update({models.Order.paymentIntent: intent_id}, synchronize_session=False)
+    )
+    return n == 1
+
+
+def abandon_order(db: Session, order_id: str, reason: str) -> bool:
+    """Return an unpaid order's stock and mark it failed; commits.
+
+    False if the order is gone, paid or already settled, so repeating a call is harmless.
+    """
+    # Row lock: concurrent abandon/attach attempts on one order serialize here
+    order = db.get(models.Order, order_id, with_for_update=True)
+    if order is None or order.paymentStatus or (order.status or {}).get("state"):
+        db.rollback()
+        return False
+    inv = models.Inventory
+    item = models.OrderItem
+    db.execute(
+        update(inv)
+        .where(inv.productId == item.productId, item.orderId == order_id)
+        .values(stock=inv.stock + item.quantity, updatedAt=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    order.status = {**(order.status or {}), "state": "payment_failed", "reason": reason}
+    db.commit()
+    return True
+
+
+def settle_late_payment(db: Session, order_id: str) -> str:
+    """Mark paid an order that was settled (abandoned) before its intent succeeded; commits.
+
+    Its stock went back when it was abandoned, so the units are reserved again. If that
+    is no longer possible the order is still marked paid (the money was taken) but left
+    in state ``needs_review`` for a refund or manual fulfilment. Returns ``"reserved"``,
+    ``"needs_review"``, or ``""`` if the order is gone, already paid or still live.
+    """
+    from routers.orders import InsufficientStock, reserve_stock
+
+    order = db.get(models.Order, order_id, with_for_update=True)
+    if order is None or order.paymentStatus or not (order.status or {}).get("state"):
+        db.rollback()
+        return ""
+    qty_map: dict = {}
+    for pid, qty in db.query(models.OrderItem.productId, models.OrderItem.quantity).filter(
+        models.OrderItem.orderId == order_id, models.OrderItem.productId.is_not(None)
+    ):
+        qty_map[pid] = qty_map.get(pid, 0) + qty
+    status = {k: v for k, v in (order.status or {}).items() if k not in ("state", "reason")}
+    try:
+        with db.begin_nested():
+            reserve_stock(db, qty_map)
+        outcome = "reserved"
+    except InsufficientStock:
+        logger.warning("order %s was paid after it was abandoned and is out of stock", order_id)
+        status.update(state="needs_review", reason="paid_after_abandon")
+        outcome = "needs_review"
+    order.status = status
+    order.paymentStatus = True
+    order.updatedAt = datetime.utcnow()
+    db.commit()
+    return outcome
+
+
+def reconcile(db: Session, older_than: timedelta, limit: int = 100) -> int:
+    """Abandon Stripe orders that never got an intent (e.g. the process died mid-checkout).
+
+    Their client never received a client secret, so nothing can pay them; a retry
+    with the same Idempotency-Key creates a fresh order. Returns the number abandoned.
+    """
+    if get_stripe() is None:
+        return 0
+    cutoff = datetime.utcnow() - older_than
+    ids = [
+        r.id
+        for r in db.query(models.Order.id)
+        .filter(
+            models.Order.paymentIntent == "",
+            models.Order.paymentStatus.is_not(True),
+            models.Order.createdAt < cutoff,
+            models.Order.status["paymentMode"].astext == "stripe",
+            models.Order.status["state"].astext.is_(None),
+        )
+        .order_by(models.Order.createdAt)
+        .limit(limit)
+        .all()
+    ]
+    db.rollback()
+    for order_id in ids:
+        abandon_order(db, order_id, "payment_intent_missing")
+    return len(ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Payment maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rc = sub.add_parser("reconcile", help="settle orders whose PaymentIntent creation failed")
+    rc.add_argument("--older-than", type=int, default=300, help="seconds")
+    rc.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "reconcile":
+            n = reconcile(db, timedelta(seconds=args.older_than), limit=args.limit)
+            print(f"abandoned {n} orders without a PaymentIntent")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+""""Frequently bought together": top-K co-purchased products per product.
+
+Computed offline from order history (``_OrderToProduct``) and stored in
+``RelatedProduct``, one row per product with its neighbours best first;
+``GET /api/products/{id}/related`` is a primary-key lookup joined to the summaries.
+
+    python -m utils.related rebuild   # from every order         (cwd: server-fastapi/app)
+    python -m utils.related update    # products in orders placed since the last run
+
+Scoring: with X the binary order x product matrix, C = X^T X counts the orders
+containing both products of a pair, and n (orders per product) its diagonal. A pair
+scores C[a, b] / sqrt(n[a] * n[b]) (cosine), so best-sellers do not top every list.
+Pairs bought together fewer than ``--min-count`` times are noise and dropped; orders
+with more than ``--max-order-size`` products (bulk buys) add many pairs and little
+signal, so they do not count towards C.
+
+Memory: X is held as a sparse matrix, row- and column-major, about 16 bytes per order
+line; ids are mapped to integers chunk by chunk while streaming. C is never materialized:
+products are processed in blocks whose rows of C fit ``--memory-mb`` (a block's size is
+known in advance, X^T times the order sizes), each block's top-K is written and the
+block is dropped.
+
+Incremental: ``update`` finds the products in orders created since the checkpoint
+(``utils.checkpoints``) and recomputes exactly their rows from every order containing
+them. Other products' scores towards them drift slightly as their popularity changes;
+the periodic ``rebuild`` corrects that.
+
+Needs numpy and scipy (``pip install .[recommendations]``); the API only reads the table.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError as exc:  # pragma: no cover - depends on optional extra
+    raise RuntimeError("utils.related needs numpy and scipy: pip install .[recommendations]") from exc
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from utils import checkpoints
+
+CHECKPOINT = "related_products"
+TOP_K = 20
+MIN_COUNT = 2
+MAX_ORDER_SIZE = 50
+MEMORY_MB = 256
+FETCH_SIZE = 100_000
+# Working set per entry of a block of C: coordinates, count, score and sort order
+BYTES_PER_ENTRY = 48
+
+_ORDER_LINES = """
+SELECT l."A", l."B" FROM "_OrderToProduct" l JOIN "Order" o ON o.id = l."A"
+WHERE o."createdAt" < %(cutoff)s {extra}
+ORDER BY l."A"
+"""
+
+
+class Orders(NamedTuple):
+    products: np.ndarray  # sorted product ids (object array); column i of x is products[i]
+    x: sparse.csr_matrix  # orders x products, 1 where the order contains the product
+    n: np.ndarray  # orders per product, including orders over the size limit
+
+
+def _driver(db: Session):
+    return db.connection().connection.driver_connection
+
+
+def product_ids(db: Session) -> np.ndarray:
+    ids = [r[0] for r in db.execute(text('SELECT id FROM "Product"'))]
+    return np.unique(np.array(ids, dtype=object))
+
+
+def load_orders(
+    db: Session, products: np.ndarray, cutoff: datetime, max_order_size: int, touched: Optional[List[str]] = None
+) -> Orders:
+    """Order lines before ``cutoff`` (only orders containing ``touched``, if given) as X.
+
+    Orders over ``max_order_size`` are left out of X but still count towards n.
+    """
+    extra = 'AND l."A" IN (SELECT "A" FROM "_OrderToProduct" WHERE "B" = ANY(%(touched)s))' if touched else ""
+    size_parts: List[np.ndarray] = []  # lines per order
+    product_parts: List[np.ndarray] = []
+    last_order = None
+    with _driver(db).cursor(name="related_order_lines") as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(_ORDER_LINES.format(extra=extra), {"cutoff": cutoff, "touched": touched})
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            a, b = (np.array(col, dtype=object) for col in zip(*rows))
+            product_parts.append(np.searchsorted(products, b).astype(np.int32))
+            # Lines arrive grouped by order: a new order starts wherever the id changes
+            changes = np.flatnonzero(a[1:] != a[:-1]) + 1
+            starts = changes if a[0] == last_order else np.concatenate(([0], changes))
+            # Lines before the first start continue the previous chunk's last order
+            head = starts[0] if len(starts) else len(a)
+            if head:
+                size_parts[-1][-1] += head
+            if len(starts):
+                size_parts.append(np.diff(np.append(starts, len(a))).astype(np.int32))
+            last_order = a[-1]
+    indices = np.concatenate(product_parts) if product_parts else np.empty(0, dtype=np.int32)
+    del product_parts
+    sizes = np.concatenate(size_parts) if size_parts else np.empty(0, dtype=np.int32)
+    del size_parts
+    n = np.bincount(indices, minlength=len(products))
+    keep = sizes <= max_order_size
+    if not keep.all():
+        indices = indices[np.repeat(keep, sizes)]
+        sizes = sizes[keep]
+    # Lines are grouped by order, so the CSR arrays are built directly
+    indptr = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=indptr[1:])
+    x = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr), shape=(len(sizes), len(products)))
+    return Orders(products, x, n)
+
+
+def order_counts(db: Session, products: np.ndarray, columns: np.ndarray, cutoff: datetime, chunk: int = 5000) -> np.ndarray:
+    """Orders before ``cutoff`` per product, for the products at ``columns``."""
+    n = np.zeros(len(products), dtype=np.int64)
+    for i in range(0, len(columns), chunk):
+        ids = products[columns[i : i + chunk]].tolist()
+        rows = db.execute(
+            text(
+                'SELECT l."B", count(*) FROM "_OrderToProduct" l JOIN "Order" o ON o.id = l."A" '
+                'WHERE l."B" = ANY(:ids) AND o."createdAt" < :cutoff GROUP BY l."B"'
+            ),
+            {"ids": ids, "cutoff": cutoff},
+        ).all()
+        if rows:
+            found, counts = zip(*rows)
+            n[np.searchsorted(products, np.array(found, dtype=object))] = counts
+    return n
+
+
+def blocks(x: sparse.csr_matrix, targets: np.ndarray, memory_mb: int) -> Iterator[np.ndarray]:
+    """Split ``targets`` into runs whose rows of C stay within ``memory_mb``.
+
+    Row p of C has at most sum(size of each order containing p) entries; a product
+    over budget on its own still gets a block of its own.
+    """
+    sizes = np.diff(x.indptr).astype(np.int64)
+    cost = np.asarray(x.T @ sizes).ravel()[targets]
+    budget = max(memory_mb * 2**20 // BYTES_PER_ENTRY, 1)
+    start = 0
+    cum = np.cumsum(cost)
+    while start < len(targets):
+        base = cum[start - 1] if start else 0
+        end = max(int(np.searchsorted(cum, base + budget, side="right")), start + 1)
+        yield targets[start:end]
+        start = end
+
+
+def top_k(
+    xc: sparse.csc_matrix, x: sparse.csr_matrix, n: np.ndarray, block: np.ndarray, k: int, min_count: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Best ``k`` neighbours of each product in ``block``: (row, column, score), row-major."""
+    c = (xc[:, block].T @ x).tocoo()
+    rows = block[c.row]
+    keep = (c.col != rows) & (c.data >= min_count)
+    rows, cols, counts = rows[keep], c.col[keep], c.data[keep]
+    scores = counts / np.sqrt(n[rows].astype(np.float64) * n[cols])
+    # Best first within each row; ties go to the lower column for stable output
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    position = np.arange(len(rows))
+    rank = position - np.maximum.accumulate(np.where(first, position, 0))
+    keep = rank < k
+    return rows[keep], cols[keep], scores[keep]
+
+
+def _copy(db: Session, products: np.ndarray, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray) -> int:
+    if not len(rows):
+        return 0
+    splits = np.flatnonzero(rows[1:] != rows[:-1]) + 1
+    now = datetime.utcnow()
+    written = 0
+    with _driver(db).cursor() as cur:
+        with cur.copy('COPY "RelatedProduct" ("productId", "relatedIds", "scores", "updatedAt") FROM STDIN') as copy:
+            for r, c, s in zip(np.split(rows, splits), np.split(cols, splits), np.split(scores, splits)):
+                copy.write_row((products[r[0]], products[c].tolist(), s.astype(np.float32).tolist(), now))
+                written += 1
+    return written
+
+
+def _compute(db: Session, orders: Orders, targets: np.ndarray, args, replace: bool) -> int:
+    x = orders.x
+    xc = x.tocsc()
+    written = 0
+    for block in blocks(x, targets, args.memory_mb):
+        if replace:
+            db.execute(
+                text('DELETE FROM "RelatedProduct" WHERE "productId" = ANY(:ids)'),
+                {"ids": orders.products[block].tolist()},
+            )
+        written += _copy(db, orders.products, *top_k(xc, x, orders.n, block, args.top_k, args.min_count))
+    return written
+
+
+def rebuild(db: Session, args) -> int:
+    """Recompute every product's neighbours from all orders; returns rows written."""
+    cutoff = checkpoints.cutoff(timedelta(seconds=args.lag_seconds))
+    orders = load_orders(db, product_ids(db), cutoff, args.max_order_size)
+    targets = np.flatnonzero(orders.n).astype(np.int32)
+    # Readers keep seeing the previous lists until the commit
+    db.execute(text('DELETE FROM "RelatedProduct"'))
+    written = _compute(db, orders, targets, args, replace=False)
+    checkpoints.store(db, CHECKPOINT, cutoff)
+    db.commit()
+    return written
+
+
+def update(db: Session, args) -> int:
+    """Recompute the neighbours of products bought since the checkpoint; returns rows written."""
+    since = checkpoints.get(db, CHECKPOINT)
+    if since is None:
+        raise SystemExit("no checkpoint yet; run: python -m utils.related rebuild")
+    cutoff = checkpoints.cutoff(timedelta(seconds=args.lag_seconds))
+    touched = [
+        r[0]
+        for r in db.execute(
+            text(
+                'SELECT DISTINCT l."B" FROM "_OrderToProduct" l JOIN "Order" o ON o.id = l."A" '
+                'WHERE o."createdAt" >= :since AND o."createdAt" < :cutoff'
+            ),
+            {"since": since, "cutoff": cutoff},
+        )
+    ]
+    written = 0
+    if touched:
+        products = product_ids(db)
+        orders = load_orders(db, products, cutoff, args.max_order_size, touched=touched)
+        # X holds only orders containing touched products, so it undercounts everyone
+        # else's popularity; fetch n for every product that appears
+        columns = np.flatnonzero(orders.n)
+        orders = orders._replace(n=order_counts(db, products, columns, cutoff))
+        targets = np.searchsorted(products, np.array(touched, dtype=object)).astype(np.int32)
+        written = _compute(db, orders, np.sort(targets), args, replace=True)
+    checkpoints.store(db, CHECKPOINT, cutoff)
+    db.commit()
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Frequently-bought-together neighbours")
+    parser.add_argument("command", choices=["rebuild", "update"])
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="neighbours kept per product")
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT, help="orders a pair needs in common")
+    parser.add_argument("--max-order-size", type=int, default=MAX_ORDER_SIZE, help="larger orders are ignored")
+    parser.add_argument("--memory-mb", type=int, default=MEMORY_MB, help="budget for one block of C")
+    parser.add_argument("--lag-seconds", type=float, default=checkpoints.DEFAULT_LAG.total_seconds())
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        written = (rebuild if args.command == "rebuild" else update)(db, args)
+    finally:
+        db.close()
+    print(f"wrote {written} related-product lists in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Per-product review aggregates (``ProductRating``): count, rating sum, 1-5 star histogram.
+
+Every review write calls ``add_rating`` or ``remove_rating`` before its commit, so the
+aggregate changes in the same transaction as the review. Each call is one upsert that
+increments the row in place; concurrent reviews of a product serialize on that row
+instead of recounting. Readers (product summaries, the rating summary endpoint) read
+one row by primary key and never scan ``Review``.
+
+If the aggregates drift (rows edited by hand, a bug, a restored backup) recompute them:
+
+    python -m utils.reviews rebuild [--product ID]   (cwd: server-fastapi/app)
+"""
+import argparse
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db import models
+
+STARS = range(1, 6)
+
+_REBUILD = """
+INSERT INTO "ProductRating"
+    ("productId", "reviewCount", "ratingSum", stars1, stars2, stars3, stars4, stars5, "updatedAt")
+SELECT "productId", count(*), sum(rating),
+       count(*) FILTER (WHERE rating = 1), count(*) FILTER (WHERE rating = 2),
+       count(*) FILTER (WHERE rating = 3), count(*) FILTER (WHERE rating = 4),
+       count(*) FILTER (WHERE rating = 5), :now
+FROM "Review"
+WHERE "productId" IS NOT NULL AND rating BETWEEN 1 AND 5 {product_filter}
+GROUP BY "productId"
+ON CONFLICT ("productId") DO UPDATE SET
+    "reviewCount" = excluded."reviewCount", "ratingSum" = excluded."ratingSum",
+    stars1 = excluded.stars1, stars2 = excluded.stars2, stars3 = excluded.stars3,
+    stars4 = excluded.stars4, stars5 = excluded.stars5, "updatedAt" = excluded."updatedAt"
+"""
+
+_DELETE_EMPTY = """
+DELETE FROM "ProductRating" r
+WHERE NOT EXISTS (
+    SELECT 1 FROM "Review" v
+    WHERE v."productId" = r."productId" AND v.rating BETWEEN 1 AND 5
+) {product_filter}
+"""
+
+
+def _apply(db: Session, product_id: str, rating: int, sign: int) -> None:
+    R = models.ProductRating
+    values = {
+        "productId": product_id,
+        "reviewCount": sign,
+        "ratingSum": sign * rating,
+        **{f"stars{n}": sign if n == rating else 0 for n in STARS},
+        "updatedAt": datetime.utcnow(),
+    }
+    stmt = insert(R).values(values)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[R.productId],
+            set_={
+                "reviewCount": R.reviewCount + stmt.excluded.reviewCount,
+                "ratingSum": R.ratingSum + stmt.excluded.ratingSum,
+                f"stars{rating}": getattr(R, f"stars{rating}") + sign,
+                "updatedAt": stmt.excluded.updatedAt,
+            },
+        )
+    )
+
+
+def add_rating(db: Session, product_id: str, rating: int) -> None:
+    """Count a new ``rating`` (1-5) for the product; the caller commits."""
+    _apply(db, product_id, rating, 1)
+
+
+def remove_rating(db: Session, product_id: str, rating: int) -> None:
+    """Uncount a deleted review's ``rating``; the caller commits."""
+    _apply(db, product_id, rating, -1)
+
+
+def average(reviews: Optional[int], total: Optional[int]) -> Optional[float]:
+    return round(total / reviews, 2) if reviews else None
+
+
+def rebuild(db: Session, product_id: Optional[str] = None) -> int:
+    """Recompute aggregates from ``Review`` (one product or all); returns rows written.
+
+    Review writes are blocked until the commit (SHARE lock), so an increment cannot
+    land between the recount and its upsert and be overwritten.
+    """
+    db.execute(text('LOCK TABLE "Review" IN SHARE MODE'))
+    only = product_id is not None
+    written = db.execute(
+        text(_REBUILD.format(product_filter='AND "productId" = :product_id' if only else "")),
+        {"now": datetime.utcnow(), "product_id": product_id},
+    ).rowcount
+    db.execute(
+        text(_DELETE_EMPTY.format(product_filter='AND r."productId" = :product_id' if only else "")),
+        {"product_id": product_id},
+    )
+    db.commit()
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Review aggregate maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rb = sub.add_parser("rebuild", help="recompute ProductRating rows from Review")
+    rb.add_argument("--product", help="only this product id")
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(f"rebuilt {rebuild(db, args.product)} product ratings")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
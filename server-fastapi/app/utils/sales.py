@@ -0,0 +1,185 @@
+"""Daily sales rollups and the bestselling / trending rankings derived from them.
+
+``ProductSalesDaily`` counts units and revenue per product and order day (UTC);
+``ProductSalesRank`` keeps one row per product with the two ranking keys, indexed
+overall and per category, so ``GET /api/products?sort=bestselling|trending`` is an
+index range scan and never aggregates ``OrderItem``.
+
+    python -m utils.sales rebuild   # from every order             (cwd: server-fastapi/app)
+    python -m utils.sales update    # orders placed since the last run
+
+- bestselling: units sold in the last ``WINDOW_DAYS`` days. ``update`` adds the new
+  orders' units and subtracts the days that have left the window since the previous run,
+  read back from the daily rollup.
+- trending: units with exponential time decay (half-life ``HALF_LIFE_DAYS``). Decaying
+  every score each day would rewrite every row; instead a sale on day d weighs
+  exp(decay * (d - EPOCH)) and the score is the log of the sum. Scaling all scores by
+  the same factor does not change their order, so only products that sold are touched,
+  and the log keeps the weights in range however far d is from EPOCH.
+
+Only sales count: Stripe orders once paid (``paymentStatus``), other payment modes
+(cash on delivery) as placed, and never orders whose payment failed. The default
+``--lag-seconds`` leaves an hour for card payments to settle; a Stripe order paid
+later, or a failure after that, is only reflected by the next ``rebuild``.
+
+Runs are serialized on the checkpoint, so a job started twice cannot count orders twice.
+"""
+import argparse
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from utils import checkpoints
+
+CHECKPOINT = "sales_rollup"
+WINDOW_DAYS = 30
+HALF_LIFE_DAYS = 7
+EPOCH = date(2000, 1, 1)
+DEFAULT_LAG = timedelta(hours=1)
+WORK_MEM = "256MB"
+
+DECAY = math.log(2) / HALF_LIFE_DAYS
+# exp() below this underflows double precision; such weights are negligible anyway
+_MIN_EXPONENT = -700
+
+_ORDER_SALES = """
+SELECT i."productId", o."createdAt"::date AS day,
+       sum(i.quantity) AS units, sum(i.quantity * i."unitPrice") AS revenue
+FROM "OrderItem" i JOIN "Order" o ON o.id = i."orderId"
+WHERE o."createdAt" < :cutoff {since_filter}
+  AND i."productId" IS NOT NULL AND i.quantity > 0
+  AND (o."paymentStatus" IS TRUE OR coalesce(o.status ->> 'paymentMode', '') <> 'stripe')
+  AND coalesce(o.status ->> 'state', '') <> 'payment_failed'
+GROUP BY 1, 2
+"""
+
+# Ranking keys of the (productId, day, units) rows of {source}: units inside the window,
+# and log(sum(units * exp(decay * (day - EPOCH)))). The sum is taken relative to the
+# cutoff day's weight (no day is later), so exp() stays in range
+_RANK_KEYS = f"""
+SELECT "productId",
+       coalesce(sum(units) FILTER (WHERE day >= :window_start), 0) AS "recentUnits",
+       :top + ln(sum(units * exp(greatest(:decay * (day - DATE '{EPOCH.isoformat()}') - :top, {_MIN_EXPONENT}))))
+           AS "trendScore"
+FROM {{source}}
+GROUP BY "productId"
+"""
+
+# log(exp(a) + exp(b)) without overflow
+_LOG_ADD = f"""greatest({{a}}, {{b}}) + CASE WHEN abs({{a}} - {{b}}) > {-_MIN_EXPONENT} THEN 0
+    ELSE ln(1 + exp(-abs({{a}} - {{b}}))) END"""
+
+_UPDATE = f"""
+WITH delta AS ({_ORDER_SALES.format(since_filter='AND o."createdAt" >= :since')}),
+daily AS (
+    INSERT INTO "ProductSalesDaily" ("productId", day, units, revenue)
+    SELECT "productId", day, units, revenue FROM delta
+    ON CONFLICT ("productId", day) DO UPDATE SET
+        units = "ProductSalesDaily".units + excluded.units,
+        revenue = "ProductSalesDaily".revenue + excluded.revenue
+)
+INSERT INTO "ProductSalesRank" ("productId", "categoryId", "recentUnits", "trendScore", "updatedAt")
+SELECT k."productId", p."categoryId", k."recentUnits", k."trendScore", :now
+FROM ({_RANK_KEYS.format(source="delta")}) k JOIN "Product" p ON p.id = k."productId"
+ON CONFLICT ("productId") DO UPDATE SET
+    "categoryId" = excluded."categoryId",
+    "recentUnits" = "ProductSalesRank"."recentUnits" + excluded."recentUnits",
+    "trendScore" = CASE WHEN "ProductSalesRank"."trendScore" = 0 THEN excluded."trendScore"
+        ELSE {_LOG_ADD.format(a='"ProductSalesRank"."trendScore"', b='excluded."trendScore"')} END,
+    "updatedAt" = excluded."updatedAt"
+"""
+
+_EXPIRE = """
+UPDATE "ProductSalesRank" r SET "recentUnits" = r."recentUnits" - x.units, "updatedAt" = :now
+FROM (
+    SELECT "productId", sum(units) AS units FROM "ProductSalesDaily"
+    WHERE day >= :old_start AND day < :new_start GROUP BY "productId"
+) x
+WHERE r."productId" = x."productId"
+"""
+
+_REBUILD = f"""
+WITH sales AS ({_ORDER_SALES.format(since_filter="")}),
+daily AS (
+    INSERT INTO "ProductSalesDaily" ("productId", day, units, revenue)
+    SELECT "productId", day, units, revenue FROM sales ORDER BY "productId", day
+)
+INSERT INTO "ProductSalesRank" ("productId", "categoryId", "recentUnits", "trendScore", "updatedAt")
+SELECT p.id, p."categoryId", coalesce(k."recentUnits", 0), coalesce(k."trendScore", 0), :now
+FROM "Product" p LEFT JOIN ({_RANK_KEYS.format(source="sales")}) k ON k."productId" = p.id
+"""
+
+
+def window_start(position: datetime) -> date:
+    """First day counted by the bestseller window for orders up to ``position``."""
+    return position.date() - timedelta(days=WINDOW_DAYS - 1)
+
+
+def _params(cutoff: datetime, **extra) -> dict:
+    return {
+        "cutoff": cutoff,
+        "window_start": window_start(cutoff),
+        "decay": DECAY,
+        "top": DECAY * (cutoff.date() - EPOCH).days,
+        "now": datetime.utcnow(),
+        **extra,
+    }
+
+
+def rebuild(db: Session, lag: timedelta = DEFAULT_LAG) -> int:
+    """Recompute the rollups and every product's ranking keys; returns rank rows written."""
+    checkpoints.lock(db, CHECKPOINT)
+    cutoff = checkpoints.cutoff(lag)
+    # Only these jobs read the daily rollup, and they hold the lock; readers keep seeing
+    # the previous rankings until the commit
+    db.execute(text('TRUNCATE "ProductSalesDaily"'))
+    db.execute(text('DELETE FROM "ProductSalesRank"'))
+    # One pass over the order lines, inserted in key order; the grouping is large
+    # enough to spill to disk at the default work_mem
+    db.execute(text(f"SET LOCAL work_mem = '{WORK_MEM}'"))
+    written = db.execute(text(_REBUILD), _params(cutoff)).rowcount
+    checkpoints.store(db, CHECKPOINT, cutoff)
+    db.commit()
+    return written
+
+
+def update(db: Session, lag: timedelta = DEFAULT_LAG) -> int:
+    """Fold orders placed since the checkpoint into the rollups; returns products touched."""
+    checkpoints.lock(db, CHECKPOINT)
+    since: Optional[datetime] = checkpoints.get(db, CHECKPOINT)
+    if since is None:
+        raise SystemExit("no checkpoint yet; run: python -m utils.sales rebuild")
+    cutoff = max(checkpoints.cutoff(lag), since)
+    now = datetime.utcnow()
+    # Before adding new units, so days that were counted leave the window exactly once
+    db.execute(text(_EXPIRE), {"old_start": window_start(since), "new_start": window_start(cutoff), "now": now})
+    touched = db.execute(text(_UPDATE), _params(cutoff, since=since, now=now)).rowcount
+    checkpoints.store(db, CHECKPOINT, cutoff)
+    db.commit()
+    return touched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sales rollups and rankings")
+    parser.add_argument("command", choices=["rebuild", "update"])
+    parser.add_argument("--lag-seconds", type=float, default=DEFAULT_LAG.total_seconds())
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        job = rebuild if args.command == "rebuild" else update
+        written = job(db, timedelta(seconds=args.lag_seconds))
+    finally:
+        db.close()
+    print(f"updated sales rankings of {written} products in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
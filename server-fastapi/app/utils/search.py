@@ -0,0 +1,101 @@
+"""Product full-text search.
+
+``Product.searchVector`` is a tsvector over the title (weight A) and every string
+inside the JSONB description (weight B). It is maintained by the
+``product_search_vector_trg`` trigger (see migration 0003), so application writes
+need no extra work; rows created before the trigger existed are filled in with
+the batched backfill below:
+
+    python -m utils.search backfill --batch-size 1000   (cwd: server-fastapi/app)
+"""
+import argparse
+import re
+from typing import Optional
+
+from sqlalchemy import REAL, func, text
+from sqlalchemy.orm import Session
+
+from db import models
+
+SEARCH_CONFIG = "english"
+MAX_QUERY_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_tsquery(q: str) -> Optional[str]:
+    """Turn free text into a prefix-matching to_tsquery() string, or None if empty.
+
+    Only word characters survive, so tsquery operators in user input cannot leak through.
+    ``"wireless head"`` -> ``"wireless:* & head:*"`` (type-ahead friendly).
+    """
+    terms = _TERM_RE.findall(q or "")[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{t}:*" for t in terms)
+
+
+def search_query(db: Session, q: str, entities: list, category_id: Optional[str] = None):
+    """Return (query, rank expression) for products matching ``q``, or (None, None).
+
+    ``entities`` are the columns/entities to select; the rank is appended as ``rank``.
+    """
+    tsquery = build_tsquery(q)
+    if tsquery is None:
+        return None, None
+    ts = func.to_tsquery(text(f"'{SEARCH_CONFIG}'::regconfig"), tsquery)
+    rank = func.ts_rank(models.Product.searchVector, ts, type_=REAL).label("rank")
+    query = db.query(*entities, rank).filter(models.Product.searchVector.bool_op("@@")(ts))
+    if category_id:
+        query = query.filter(models.Product.categoryId == category_id)
+    return query, rank
+
+
+def backfill(db: Session, batch_size: int = 1000) -> int:
+    """Populate searchVector for existing rows in id order, one transaction per batch.
+
+    Touching ``title`` fires the maintenance trigger, so the vector expression lives
+    only in the migration. Returns the number of rows updated.
+    """
+    last_id = ""
+    updated = 0
+    while True:
+        ids = [
+            r[0]
+            for r in db.query(models.Product.id)
+            .filter(models.Product.id > last_id, models.Product.searchVector.is_(None))
+            .order_by(models.Product.id)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            return updated
+        db.execute(
+            text('UPDATE "Product" SET title = title WHERE id = ANY(:ids)'),
+            {"ids": ids},
+        )
+        db.commit()
+        updated += len(ids)
+        last_id = ids[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Product search maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bf = sub.add_parser("backfill", help="fill searchVector for rows that lack it")
+    bf.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            n = backfill(db, batch_size=args.batch_size)
+            print(f"backfilled {n} products")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
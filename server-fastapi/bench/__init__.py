@@ -0,0 +1,12 @@
+"""Load and contention tools for the FastAPI backend.
+
+Run from server-fastapi/ as modules, e.g. `python -m bench.stock_contention`.
+They use the database configured for the app (DATABASE_URL / DB_*).
+"""
+import sys
+from pathlib import Path
+
+# Application modules import each other as top-level packages (core, db, ...)
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
@@ -0,0 +1,176 @@
+"""Cold start of the Lambda handler: import cost and time to first response.
+
+    python -m bench.cold_start --runs 5 --path /api/categories
+    python -m bench.cold_start --write-baseline      # after an intended change
+
+Each run starts a fresh interpreter (``python -X importtime``) in app/, imports
+``main`` and sends GET ``--path`` through ``main.handler`` (Mangum) as an API Gateway
+HTTP API event, twice. Reported per run and as medians:
+
+- ``processMs``: interpreter start to first response, as seen from outside;
+- ``importMs``: ``import main``;
+- ``firstResponseMs`` / ``warmResponseMs``: the first and second invocation;
+
+plus the modules with the largest cumulative import time. The script exits with
+status 1 when
+
+- ``import main`` loads a module that must stay lazy (``LAZY_MODULES``),
+- a median exceeds the baseline by more than ``--tolerance`` (and ``--slack-ms``,
+  so a few ms of noise on a short phase is not a regression), or
+- there is no baseline for ``--path``.
+
+``bench/cold_start_baseline.json`` is committed; it holds medians measured on the
+reference machine, so record your own with ``--write-baseline`` before comparing on
+different hardware. The default path needs the database; use
+``--path /api/_health/live`` (with its own baseline) without one.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from bench import APP_DIR
+
+# Only needed by a few endpoints; importing them in main's import chain is a regression
+LAZY_MODULES = ["stripe", "passlib", "bcrypt", "jose", "cryptography", "redis", "numpy", "scipy"]
+METRICS = ["processMs", "importMs", "firstResponseMs"]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "cold_start_baseline.json"
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+event = {
+    "version": "2.0",
+    "routeKey": "$default",
+    "rawPath": PATH,
+    "rawQueryString": "",
+    "headers": {"host": "bench", "accept": "application/json"},
+    "requestContext": {
+        "accountId": "000000000000",
+        "apiId": "bench",
+        "domainName": "bench",
+        "domainPrefix": "bench",
+        "http": {"method": "GET", "path": PATH, "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1", "userAgent": "bench"},
+        "requestId": "bench",
+        "routeKey": "$default",
+        "stage": "$default",
+        "time": "01/Jan/2030:00:00:00 +0000",
+        "timeEpoch": 0,
+    },
+    "isBase64Encoded": False,
+}
+class Context:
+    function_name = "bench"
+    aws_request_id = "bench"
+first = main.handler(event, Context())
+responded = time.perf_counter()
+main.handler(event, Context())
+warm = time.perf_counter()
+print(json.dumps({
+    "status": first["statusCode"],
+    "importMs": (imported - start) * 1000,
+    "firstResponseMs": (responded - imported) * 1000,
+    "warmResponseMs": (warm - responded) * 1000,
+    "lazyLoaded": [m for m in LAZY if m in sys.modules],
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """(module, cumulative ms) rows of ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append({"module": name.strip(), "cumulativeMs": int(cumulative) / 1000})
+    return rows
+
+
+def probe(path: str) -> dict:
+    code = PROBE.replace("PATH", json.dumps(path)).replace("LAZY", json.dumps(LAZY_MODULES))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"probe failed with status {proc.returncode}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["processMs"] = elapsed
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def top_imports(imports: List[dict], n: int) -> List[dict]:
+    # Cumulative times nest (a package includes its submodules), so read this as a tree
+    return sorted(imports, key=lambda r: r["cumulativeMs"], reverse=True)[:n]
+
+
+def compare(medians: Dict[str, float], baseline: Dict[str, float], tolerance: float, slack_ms: float) -> List[str]:
+    regressions = []
+    for metric in METRICS:
+        if metric not in baseline:
+            regressions.append(f"baseline has no {metric}; rewrite it with --write-baseline")
+        elif medians[metric] > baseline[metric] * (1 + tolerance) + slack_ms:
+            regressions.append(
+                f"{metric} {medians[metric]:.0f} ms > baseline {baseline[metric]:.0f} ms +{tolerance:.0%} +{slack_ms:.0f} ms"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/api/categories")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to report")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline")
+    parser.add_argument("--slack-ms", type=float, default=10, help="allowed absolute slowdown on top")
+    parser.add_argument("--write-baseline", action="store_true")
+    args = parser.parse_args()
+
+    runs = [probe(args.path) for _ in range(args.runs)]
+    medians = {m: round(statistics.median(r[m] for r in runs), 1) for m in METRICS + ["warmResponseMs"]}
+    lazy_loaded = sorted({m for r in runs for m in r["lazyLoaded"]})
+    report = {
+        "path": args.path,
+        "status": runs[0]["status"],
+        "runs": args.runs,
+        "median": medians,
+        "lazyLoaded": lazy_loaded,
+        "slowestImports": top_imports(runs[-1]["imports"], args.top),
+    }
+
+    failures = []
+    if lazy_loaded:
+        failures.append(f"import main loads {', '.join(lazy_loaded)}; keep them lazy")
+    if args.write_baseline:
+        baseline = {"path": args.path, "runs": args.runs, **{m: medians[m] for m in METRICS}}
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+    elif not args.baseline.exists():
+        failures.append(f"no baseline at {args.baseline}; record one with --write-baseline")
+    else:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("path") != args.path:
+            failures.append(f"baseline was recorded for {baseline.get('path')}, not {args.path}")
+        else:
+            failures += compare(medians, baseline, args.tolerance, args.slack_ms)
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
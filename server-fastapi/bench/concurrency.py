@@ -0,0 +1,136 @@
+"""Concurrency ceiling of sync vs async handlers.
+
+    python -m bench.concurrency --concurrency 200 --latency-ms 50 --requests 2000
+
+Mounts two equivalent endpoints on a throwaway app, each running one query that takes
+``--latency-ms`` in Postgres (``pg_sleep``):
+
+- ``sync``: a ``def`` handler on a sync ``Session``, like the unconverted routers; every
+  in-flight request holds one AnyIO worker thread (40 by default);
+- ``async``: an ``async def`` handler on an ``AsyncSession`` through ``run_db``, like the
+  converted routers; waiting requests hold no thread.
+
+Each engine gets ``--pool-size`` connections so the pool is not the first limit (keep
+it below the server's max_connections). The
+sync variant tops out near ``threads / latency`` requests per second whatever the
+offered concurrency; the async one scales until the pool (or Postgres) is saturated.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+import anyio
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from core import settings
+from db.database import run_db
+
+
+def query(db: Session, latency: float) -> dict:
+    db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+    return {"ok": True}
+
+
+def build_app(mode: str, pool_size: int, latency: float):
+    """App with one endpoint at /{mode}; returns (app, engine) so the engine can be disposed."""
+    app = FastAPI()
+    if mode == "sync":
+        engine = create_engine(settings.database_url, pool_size=pool_size, max_overflow=0)
+        sessions = sessionmaker(bind=engine)
+
+        def get_db():
+            db = sessions()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.get("/sync")
+        def sync_endpoint(db: Session = Depends(get_db)):
+            return query(db, latency)
+
+    else:
+        engine = create_async_engine(settings.database_url, pool_size=pool_size, max_overflow=0)
+        sessions = async_sessionmaker(bind=engine)
+
+        async def get_db():
+            async with sessions() as db:
+                yield db
+
+        @app.get("/async")
+        async def async_endpoint(db=Depends(get_db)):
+            return await run_db(db, query, latency)
+
+    return app, engine
+
+
+async def drive(app: FastAPI, path: str, concurrency: int, total: int) -> dict:
+    latencies = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await client.get(path)  # warm the pool
+
+        async def one():
+            nonlocal errors
+            async with sem:
+                start = time.perf_counter()
+                r = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(total)])
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+async def run(args) -> dict:
+    result = {
+        "concurrency": args.concurrency,
+        "latencyMs": args.latency_ms,
+        "poolSize": args.pool_size,
+        "threadLimit": anyio.to_thread.current_default_thread_limiter().total_tokens,
+    }
+    # One engine at a time, so both fit under max_connections
+    for mode in args.modes:
+        app, engine = build_app(mode, args.pool_size, args.latency_ms / 1000)
+        try:
+            result[mode] = await drive(app, f"/{mode}", args.concurrency, args.requests)
+        finally:
+            disposed = engine.dispose()
+            if asyncio.iscoroutine(disposed):
+                await disposed
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Minimal local stand-in for a Redis server (strings only).
+
+    python -m bench.fake_redis --port 16379
+
+Point the app at it with CACHE_BACKEND=redis and REDIS_URL=redis://localhost:16379/0.
+Implements the commands ``utils.cache.RedisBackend`` sends: GET, SET (with EX/PX),
+DEL, SCAN (MATCH/COUNT), plus TTL, PING and the connection handshake (HELLO, for
+RESP2 or RESP3 clients). Keys expire lazily on access, like the real server from a
+client's point of view.
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Store:
+    """Keys -> (value, expires_at or None), shared by every connection."""
+
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes]):
+        cmd = args[0].upper()
+        with self.lock:
+            if cmd == b"PING":
+                return "PONG"
+            if cmd in (b"CLIENT", b"SELECT"):
+                return "OK"
+            if cmd == b"GET":
+                return self._live(args[1])
+            if cmd == b"SET":
+                expires_at = None
+                opts = [a.upper() for a in args[3:]]
+                for i, opt in enumerate(opts):
+                    if opt == b"EX":
+                        expires_at = time.monotonic() + int(args[4 + i])
+                    elif opt == b"PX":
+                        expires_at = time.monotonic() + int(args[4 + i]) / 1000
+                self.data[args[1]] = (args[2], expires_at)
+                return "OK"
+            if cmd == b"DEL":
+                return sum(self.data.pop(k, None) is not None for k in args[1:])
+            if cmd == b"TTL":
+                if self._live(args[1]) is None:
+                    return -2
+                expires_at = self.data[args[1]][1]
+                return -1 if expires_at is None else max(round(expires_at - time.monotonic()), 0)
+            if cmd == b"SCAN":
+                # One pass over everything; the returned cursor 0 ends the iteration
+                match = b"*"
+                for i, opt in enumerate(args[2:]):
+                    if opt.upper() == b"MATCH":
+                        match = args[3 + i]
+                pattern = match.decode()
+                keys = [k for k in list(self.data) if self._live(k) is not None]
+                return [b"0", [k for k in keys if fnmatch.fnmatchcase(k.decode(), pattern)]]
+            return Exception(f"ERR unknown command '{cmd.decode()}'")
+
+
+def _encode(value, proto: int) -> bytes:
+    if isinstance(value, dict):
+        # HELLO reply; a RESP2 connection gets it as a flat array instead
+        return b"%%%d\r\n" % len(value) + b"".join(
+            _encode(k, proto) + _encode(v, proto) for k, v in value.items()
+        )
+    if value is None:
+        return b"_\r\n" if proto == 3 else b"$-1\r\n"
+    if isinstance(value, Exception):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(v, proto) for v in value)
+
+
+def make_handler(store: Store):
+    class Handler(socketserver.StreamRequestHandler):
+        def _read_command(self) -> Optional[List[bytes]]:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if not line.startswith(b"*"):
+                return line.split()  # inline command
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+            return args
+
+        def _hello(self, args: List[bytes]):
+            proto = int(args[1]) if len(args) > 1 else 2
+            if proto not in (2, 3):
+                return Exception("NOPROTO unsupported protocol version")
+            self.proto = proto
+            info = {"server": "fake_redis", "version": "7.0.0", "proto": proto, "mode": "standalone"}
+            return info if proto == 3 else [x for kv in info.items() for x in kv]
+
+        def handle(self):
+            self.proto = 2
+            while True:
+                args = self._read_command()
+                if args is None:
+                    return
+                if args:
+                    reply = self._hello(args) if args[0].upper() == b"HELLO" else store.execute(args)
+                    self.wfile.write(_encode(reply, self.proto))
+                    self.wfile.flush()
+
+    return Handler
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(host: str = "127.0.0.1", port: int = 0) -> Server:
+    """Start a stand-in in a background thread; ``port=0`` picks a free port."""
+    server = Server((host, port), make_handler(Store()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=16379)
+    args = parser.parse_args()
+    server = Server((args.host, args.port), make_handler(Store()))
+    print(f"fake Redis listening on redis://{args.host}:{args.port}/0")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Minimal local stand-in for the Stripe PaymentIntents API.
+
+    python -m bench.fake_stripe --port 12111 --latency-ms 400 [--fail-rate 0.1]
+
+Point the app at it with STRIPE_API_BASE=http://localhost:12111 and any
+STRIPE_SECRET_KEY. ``--latency-ms`` simulates a slow provider (the DB pool must not be
+held across it); ``--fail-rate`` answers that share of requests with a 500 to exercise
+the abandon/reconcile path. Requests with a repeated Idempotency-Key get the same
+intent back, like the real API.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+def make_handler(latency: float, fail_rate: float):
+    intents: dict = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: dict) -> None:
+            out = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode())
+            if self.path.rstrip("/") != "/v1/payment_intents":
+                return self._send(404, {"error": {"message": "unknown path", "type": "invalid_request_error"}})
+            time.sleep(latency)
+            if random.random() < fail_rate:
+                return self._send(500, {"error": {"message": "injected failure", "type": "api_error"}})
+            key = self.headers.get("Idempotency-Key") or str(uuid.uuid4())
+            with lock:
+                if key not in intents:
+                    pi_id = f"pi_{uuid.uuid4().hex[:24]}"
+                    intents[key] = {
+                        "id": pi_id,
+                        "object": "payment_intent",
+                        "amount": int(form.get("amount", ["0"])[0]),
+                        "currency": form.get("currency", ["usd"])[0],
+                        "status": "requires_payment_method",
+                        "client_secret": f"{pi_id}_secret_{uuid.uuid4().hex[:16]}",
+                    }
+                intent = intents[key]
+            self._send(200, intent)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(args.latency_ms / 1000, args.fail_rate)
+    )
+    print(f"fake Stripe listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Concurrent scenario load test with per-route latency percentiles.
+
+    python -m bench.load                                                # compare to the baseline
+    python -m bench.load --save-baseline                                # store as baseline
+    python -m bench.load --concurrency 50 --duration 60 --no-compare    # explore, in-process
+    python -m bench.load --url http://localhost:8000 --no-compare       # over uvicorn
+
+Virtual users loop over weighted scenarios (``--mix``) until ``--duration`` ends:
+
+- ``browse``: categories, a product list page and the next one, a product, its comments;
+- ``search``: a one- or two-word product search;
+- ``checkout``: a product, a cash-on-delivery order (with Idempotency-Key), order list;
+- ``seller``: the seller's products, a stock read and a stock update.
+
+Accounts and ids come from the database the app is configured for, loaded by
+``bench.seed`` (so run that first, against the same database). In-process mode sends
+requests through ``httpx.ASGITransport`` to ``main.app``: no network, but the app and
+the driver share one CPU, so compare runs of the same mode only.
+
+The JSON report has throughput and p50/p95/p99 overall and per route template.
+Unless ``--no-compare`` is given, the run is compared with ``--baseline`` (the
+committed ``bench/load_baseline.json``: the default settings, in-process, on the
+reference machine, against ``bench.seed --truncate --products 50000 --users 5000
+--sellers 200 --orders 20000 --comments 30000``; re-record it with ``--save-baseline``
+on other hardware or data). The script exits with status 1 when
+
+- the baseline is missing or was recorded with another target, concurrency or mix;
+- overall throughput fell, or overall p95 grew, by more than ``--tolerance``;
+- the p95 of a route with at least ``--min-requests`` requests in both runs grew by
+  more than ``--tolerance`` (sparser routes are too noisy to judge);
+- the error rate rose by more than one percentage point.
+
+Runs of the same settings vary by roughly 15% in throughput and 25% in route p95,
+hence the default tolerance of 35%.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+from bench.seed import PASSWORD, WORDS
+from sqlalchemy import text
+
+DEFAULT_MIX = "browse=70,search=15,checkout=10,seller=5"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "load_baseline.json"
+SAMPLE_SIZE = 500
+
+
+class Samples:
+    """Ids and accounts the scenarios draw from."""
+
+    def __init__(self, products: List[str], users: List[str], sellers: Dict[str, List[str]]):
+        self.products = products
+        self.users = users
+        # seller username -> ids of products listed under them
+        self.sellers = sellers
+
+
+def load_samples() -> Samples:
+    from db.database import engine
+
+    with engine.connect() as conn:
+        products = [r[0] for r in conn.execute(text('SELECT id FROM "Product" TABLESAMPLE SYSTEM (5) LIMIT :n'), {"n": SAMPLE_SIZE})]
+        if len(products) < 10:
+            products = [r[0] for r in conn.execute(text('SELECT id FROM "Product" LIMIT :n'), {"n": SAMPLE_SIZE})]
+        users = [
+            r[0]
+            for r in conn.execute(
+                text('SELECT username FROM "User" WHERE username LIKE \'bench-user-%\' AND roles = \'[]\'::jsonb LIMIT :n'),
+                {"n": SAMPLE_SIZE},
+            )
+        ]
+        sellers: Dict[str, List[str]] = defaultdict(list)
+        rows = conn.execute(
+            text(
+                'SELECT u.username, sp."productId" FROM "User" u '
+                'JOIN "SellerProfile" s ON s."userId" = u.id '
+                'JOIN "SellerProduct" sp ON sp."sellerId" = s.id '
+                "WHERE u.username LIKE 'bench-user-%' LIMIT :n"
+            ),
+            {"n": SAMPLE_SIZE * 4},
+        )
+        for username, product_id in rows:
+            sellers[username].append(product_id)
+    if not products or not users or not sellers:
+        raise SystemExit("no seeded data found; run python -m bench.seed first")
+    return Samples(products, users, dict(sellers))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        # Only requests finishing inside [start, stop) are measured
+        self.start = math.inf
+        self.stop = math.inf
+
+    def add(self, route: str, seconds: float, ok: bool) -> None:
+        if not self.start <= time.monotonic() < self.stop:
+            return
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, samples: Samples, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.samples = samples
+        self.recorder = recorder
+        self.rng = rng
+        # (auth headers, user id) of the customer and seller accounts, once logged in
+        self.customer: Optional[Tuple[dict, str]] = None
+        self.seller_account: Optional[Tuple[dict, str]] = None
+        self.seller_products: List[str] = []
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        r = await self.client.request(method, url, **kwargs)
+        self.recorder.add(route, time.perf_counter() - start, r.status_code < 400)
+        return r
+
+    async def login(self, username: str) -> Tuple[dict, str]:
+        r = await self.call("POST /api/login", "POST", "/api/login", json={"username": username, "password": PASSWORD})
+        r.raise_for_status()
+        body = r.json()
+        return {"authorization": f"Bearer {body['accessToken']}"}, body["id"]
+
+    def product(self) -> str:
+        return self.rng.choice(self.samples.products)
+
+    async def browse(self) -> None:
+        await self.call("GET /api/categories", "GET", "/api/categories")
+        r = await self.call("GET /api/products", "GET", "/api/products", params={"limit": 24})
+        cursor = r.headers.get("x-next-cursor")
+        if cursor:
+            await self.call("GET /api/products", "GET", "/api/products", params={"limit": 24, "cursor": cursor})
+        pid = self.product()
+        await self.call("GET /api/products/{id}", "GET", f"/api/products/{pid}")
+        await self.call("GET /api/products/{id}/comments", "GET", f"/api/products/{pid}/comments")
+
+    async def search(self) -> None:
+        q = " ".join(self.rng.sample(WORDS, self.rng.randint(1, 2)))
+        await self.call("GET /api/search", "GET", "/api/search", params={"q": q, "limit": 24})
+
+    async def checkout(self) -> None:
+        if self.customer is None:
+            self.customer = await self.login(self.rng.choice(self.samples.users))
+        auth, user_id = self.customer
+        pid = self.product()
+        await self.call("GET /api/products/{id}", "GET", f"/api/products/{pid}")
+        items = [{"id": p, "quantity": self.rng.randint(1, 2)} for p in {pid, self.product()}]
+        await self.call(
+            "POST /api/orders",
+            "POST",
+            "/api/orders",
+            headers={**auth, "Idempotency-Key": uuid.uuid4().hex},
+            json={"items": items, "status": {"paymentMode": "cash-on-delivery"}},
+        )
+        await self.call(
+            "GET /api/orders", "GET", "/api/orders", params={"where[user][id]": user_id, "limit": 10}
+        )
+
+    async def seller(self) -> None:
+        if self.seller_account is None:
+            username = self.rng.choice(list(self.samples.sellers))
+            self.seller_account = await self.login(username)
+            self.seller_products = self.samples.sellers[username]
+        auth, _ = self.seller_account
+        await self.call("GET /api/sellers/me/products", "GET", "/api/sellers/me/products", headers=auth)
+        pid = self.rng.choice(self.seller_products)
+        await self.call("GET /api/inventory/{id}", "GET", f"/api/inventory/{pid}")
+        await self.call(
+            "PATCH /api/inventory/{id}",
+            "PATCH",
+            f"/api/inventory/{pid}",
+            headers=auth,
+            json={"stock": self.rng.randint(100_000, 1_000_000)},
+        )
+
+    async def run(self, mix: Dict[str, int], deadline: float) -> None:
+        names, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("browse", "search", "checkout", "seller"):
+            raise SystemExit(f"unknown scenario {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))]
+
+
+def summarize(recorder: Recorder, seconds: float) -> dict:
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": recorder.errors.get(route, 0),
+            "rps": round(len(latencies) / seconds, 1),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        }
+    total = sum(r["requests"] for r in routes.values())
+    every = sorted(x for latencies in recorder.latencies.values() for x in latencies)
+    return {
+        "requests": total,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "rps": round(total / seconds, 1),
+        "p95_ms": round(percentile(every, 0.95) * 1000, 1) if every else None,
+        "routes": routes,
+    }
+
+
+SETTINGS = ["target", "concurrency", "mix"]
+
+
+def _error_rate(run: dict) -> float:
+    return run["errors"] / run["requests"] if run["requests"] else 0.0
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_requests: int) -> List[str]:
+    for key in SETTINGS:
+        if baseline.get(key) != report[key]:
+            return [f"baseline was recorded with {key}={baseline.get(key)!r}, this run has {report[key]!r}"]
+    regressions = []
+    if report["rps"] < baseline["rps"] * (1 - tolerance):
+        regressions.append(f"overall: {report['rps']} rps vs baseline {baseline['rps']} rps")
+    if report["p95_ms"] is not None and report["p95_ms"] > baseline["p95_ms"] * (1 + tolerance):
+        regressions.append(f"overall: p95 {report['p95_ms']} ms vs baseline {baseline['p95_ms']} ms")
+    if _error_rate(report) > _error_rate(baseline) + 0.01:
+        regressions.append(f"overall: {report['errors']} errors in {report['requests']} requests")
+    for route, base in baseline.get("routes", {}).items():
+        now = report["routes"].get(route)
+        if now is None or min(now["requests"], base["requests"]) < min_requests:
+            continue
+        if now["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {now['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+    return regressions
+
+
+async def run(args) -> dict:
+    samples = load_samples()
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    async with client:
+        users = [VirtualUser(client, samples, recorder, random.Random(rng.random())) for _ in range(args.concurrency)]
+        recorder.start = time.monotonic() + args.warmup
+        recorder.stop = recorder.start + args.duration
+        await asyncio.gather(*[u.run(mix, recorder.stop) for u in users])
+    return {
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "durationSeconds": args.duration,
+        "mix": mix,
+        **summarize(recorder, args.duration),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="base URL of a running server; default: the app in-process")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="also write the report here")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the report as the baseline")
+    parser.add_argument("--no-compare", action="store_true", help="only report, e.g. for other settings")
+    parser.add_argument("--tolerance", type=float, default=0.35, help="allowed p95/throughput change")
+    parser.add_argument("--min-requests", type=int, default=100, help="fewer samples: route p95 not compared")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+    elif args.no_compare:
+        pass
+    elif not args.baseline.exists():
+        report["regressions"] = [f"no baseline at {args.baseline}; record one with --save-baseline"]
+    else:
+        baseline = json.loads(args.baseline.read_text())
+        report["regressions"] = compare(report, baseline, args.tolerance, args.min_requests)
+    text_report = json.dumps(report, indent=2)
+    print(text_report)
+    if args.out:
+        args.out.write_text(text_report + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
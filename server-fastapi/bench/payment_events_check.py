@@ -0,0 +1,206 @@
+"""Run Stripe webhook outcomes through ``utils.payment_events.apply`` and check the orders.
+
+    python -m bench.payment_events_check
+
+Creates unpaid Stripe orders holding reserved stock, then applies events the way the
+webhook worker does, in consecutive batches: a declined card (the customer may still
+retry), a cancellation, a success, a failure and a success in one batch or in two, a
+success after the order was abandoned, and failures or cancellations arriving after a
+success. Between batches the second product sells out, so the late success on its
+order cannot get its units back. The same outcomes are then delivered again.
+
+Declined orders must stay live with their stock; canceled ones must end in state
+``payment_failed`` with their stock returned exactly once; paid orders must be paid,
+live and hold their stock, except the sold-out one, which must be paid and flagged
+``needs_review``. Otherwise the script exits with status 1. The temporary rows are
+removed afterwards.
+"""
+import sys
+import uuid
+from typing import Dict, List
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+from db.database import SessionLocal
+from db import models
+from utils import payment_events
+from utils.payment_events import PaymentEvent
+
+STOCK = 100
+QUANTITY = 3
+FAILED = "payment_intent.payment_failed"
+CANCELED = "payment_intent.canceled"
+SUCCEEDED = "payment_intent.succeeded"
+# order name -> event types for its intent, one list per worker batch
+SCENARIOS = {
+    "declined": [[FAILED]],
+    "canceled": [[CANCELED]],
+    "paid": [[SUCCEEDED]],
+    "retried": [[FAILED, SUCCEEDED]],
+    "failed_then_paid": [[FAILED], [SUCCEEDED]],
+    "canceled_then_paid": [[CANCELED], [SUCCEEDED]],
+    "sold_out_then_paid": [[CANCELED], [SUCCEEDED]],
+    "paid_then_failed": [[FAILED]],
+    "paid_then_canceled": [[CANCELED]],
+}
+# Paid before the first batch: later failures must not revert them
+PAID_BEFORE = {"paid_then_failed", "paid_then_canceled"}
+# Ordered from the second product, which sells out between the batches
+SOLD_OUT = "sold_out_then_paid"
+# name -> (paymentStatus, state, holds its units)
+EXPECTED = {
+    "declined": (False, None, True),
+    "canceled": (False, "payment_failed", False),
+    SOLD_OUT: (True, "needs_review", False),
+}
+PAID = (True, None, True)
+
+
+def _product(ids: Dict[str, str], name: str) -> models.Product:
+    return models.Product(
+        id=ids[name],
+        categoryId=ids["category"],
+        title=f"bench payment events {name}",
+        discountPrice=1.0,
+        salePrice=1.0,
+        description=[],
+        colors=[],
+        images=[],
+        variants=[],
+    )
+
+
+def _setup() -> Dict[str, str]:
+    """Rows for the check; returns name -> id (orders by scenario name)."""
+    db = SessionLocal()
+    try:
+        ids = {k: str(uuid.uuid4()) for k in ("user", "category", "product", "sold_out_product")}
+        db.add(models.User(id=ids["user"], username=f"bench-payment-events-{ids['user']}", password="x", roles=[]))
+        db.add(models.Category(id=ids["category"], name="bench-payment-events"))
+        db.flush()
+        db.add(_product(ids, "product"))
+        db.add(_product(ids, "sold_out_product"))
+        db.flush()
+        # Stock as left after reserving every order's units
+        db.add(models.Inventory(productId=ids["product"], stock=STOCK - QUANTITY * (len(SCENARIOS) - 1)))
+        db.add(models.Inventory(productId=ids["sold_out_product"], stock=0))
+        for name in SCENARIOS:
+            order_id = str(uuid.uuid4())
+            ids[name] = order_id
+            db.add(
+                models.Order(
+                    id=order_id,
+                    userId=ids["user"],
+                    paymentIntent=f"pi_bench_{order_id}",
+                    paymentStatus=name in PAID_BEFORE,
+                    price=1.0,
+                    status={"paymentMode": "stripe"},
+                )
+            )
+            db.flush()
+            db.add(
+                models.OrderItem(
+                    id=str(uuid.uuid4()),
+                    orderId=order_id,
+                    productId=ids["sold_out_product" if name == SOLD_OUT else "product"],
+                    quantity=QUANTITY,
+                    unitPrice=1.0,
+                )
+            )
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def _teardown(ids: Dict[str, str]) -> None:
+    db = SessionLocal()
+    try:
+        orders = [ids[name] for name in SCENARIOS]
+        products = [ids["product"], ids["sold_out_product"]]
+        intents = [f"pi_bench_{order_id}" for order_id in orders]
+        db.query(models.StripeEvent).filter(models.StripeEvent.paymentIntent.in_(intents)).delete()
+        db.query(models.OrderItem).filter(models.OrderItem.orderId.in_(orders)).delete()
+        db.query(models.Order).filter(models.Order.id.in_(orders)).delete()
+        db.query(models.Inventory).filter(models.Inventory.productId.in_(products)).delete()
+        db.query(models.Product).filter(models.Product.id.in_(products)).delete()
+        db.query(models.Category).filter(models.Category.id == ids["category"]).delete()
+        db.query(models.User).filter(models.User.id == ids["user"]).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _sell_out(ids: Dict[str, str]) -> None:
+    """Other customers buy whatever the cancellation returned to the second product."""
+    db = SessionLocal()
+    try:
+        db.query(models.Inventory).filter(models.Inventory.productId == ids["sold_out_product"]).update(
+            {models.Inventory.stock: 0}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _deliver(ids: Dict[str, str]) -> None:
+    """Record and apply each scenario's events, one worker batch per step."""
+    for step in range(max(len(batches) for batches in SCENARIOS.values())):
+        events = [
+            PaymentEvent(f"evt_bench_{uuid.uuid4().hex}", event_type, f"pi_bench_{ids[name]}")
+            for name, batches in SCENARIOS.items()
+            if step < len(batches)
+            for event_type in batches[step]
+        ]
+        db = SessionLocal()
+        try:
+            for ev in events:
+                payment_events.record(db, ev)
+            payment_events.apply(db, events)
+        finally:
+            db.close()
+        if step == 0:
+            _sell_out(ids)
+
+
+def check(ids: Dict[str, str]) -> List[str]:
+    problems = []
+    db = SessionLocal()
+    try:
+        holding = 0
+        for name in SCENARIOS:
+            order = db.get(models.Order, ids[name])
+            got = (bool(order.paymentStatus), (order.status or {}).get("state"))
+            paid, state, holds = EXPECTED.get(name, PAID)
+            if got != (paid, state):
+                problems.append(f"{name}: paymentStatus {got[0]!r}, state {got[1]!r}; expected {paid!r}, {state!r}")
+            holding += holds
+        stock = db.get(models.Inventory, ids["product"]).stock
+        expected = STOCK - QUANTITY * holding
+        if stock != expected:
+            problems.append(f"stock {stock}, expected {expected} (canceled orders' units returned once)")
+        sold_out = db.get(models.Inventory, ids["sold_out_product"]).stock
+        if sold_out != 0:
+            problems.append(f"sold-out product stock {sold_out}, expected 0")
+    finally:
+        db.close()
+    return problems
+
+
+def main() -> None:
+    ids = _setup()
+    try:
+        _deliver(ids)
+        # The same outcomes again (later attempts, replays): nothing may change
+        _deliver(ids)
+        problems = check(ids)
+    finally:
+        _teardown(ids)
+    for p in problems:
+        print(p)
+    print("payment events: " + ("FAILED" if problems else "ok"))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Fail if a hot query's plan falls back to a sequential scan.
+
+    python -m bench.plan_check --orders 20000
+
+Seeds a synthetic dataset (users, products, sales ranks, orders, items, comments,
+reviews, addresses, sellers) inside one transaction, runs ANALYZE, then EXPLAINs the
+lookups the API issues on every request. Plans are taken with ``enable_seqscan`` off,
+so the planner only falls back to a ``Seq Scan`` when no index can serve the query,
+however small a seeded table is. Any such scan on the table a query is meant to reach
+through an index is reported and the script exits with status 1. The transaction is
+rolled back at the end, so the database is left as it was; run it against a migrated
+database (``alembic upgrade head``), e.g. in CI after a schema change.
+"""
+import argparse
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql
+
+from db.database import engine
+from db import models
+
+SEED_TABLES = [
+    models.User,
+    models.Category,
+    models.Product,
+    models.ProductSalesRank,
+    models.SellerProfile,
+    models.SellerProduct,
+    models.Order,
+    models.OrderItem,
+    models.Comment,
+    models.Review,
+    models.Address,
+]
+
+
+class HotQuery(NamedTuple):
+    name: str
+    table: str
+    statement: object
+
+
+def _uid() -> str:
+    return str(uuid.uuid4())
+
+
+def _chunks(rows: List[dict], size: int = 2000) -> Iterator[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def seed(conn, n_orders: int, rng: random.Random) -> Dict[str, str]:
+    """Insert a dataset proportional to ``n_orders``; returns sample lookup values."""
+    n_users = max(n_orders // 10, 10)
+    n_products = max(n_orders // 4, 10)
+    n_sellers = max(n_products // 25, 2)
+    now = datetime.utcnow()
+
+    def ts() -> datetime:
+        return now - timedelta(seconds=rng.randrange(365 * 86400))
+
+    users = [
+        {
+            "id": _uid(),
+            "username": f"plan-check-{i}-{_uid()}",
+            "password": "x",
+            "roles": [],
+            "createdAt": ts(),
+            "updatedAt": now,
+        }
+        for i in range(n_users)
+    ]
+    categories = [{"id": _uid(), "name": f"plan-check {i}", "createdAt": now, "updatedAt": now} for i in range(20)]
+    products = [
+        {
+            "id": _uid(),
+            "categoryId": rng.choice(categories)["id"],
+            "title": f"plan check product {i}",
+            "discountPrice": float(rng.randrange(1, 500)),
+            "salePrice": float(rng.randrange(1, 500)),
+            "description": [],
+            "colors": [],
+            "images": [],
+            "variants": [],
+            "createdAt": ts(),
+            "updatedAt": now,
+        }
+        for i in range(n_products)
+    ]
+    sales_ranks = [
+        {
+            "productId": p["id"],
+            "categoryId": p["categoryId"],
+            "recentUnits": rng.randrange(50),
+            "trendScore": rng.random() * 100,
+            "updatedAt": now,
+        }
+        for p in products
+    ]
+    sellers = [
+        {"id": _uid(), "userId": u["id"], "displayName": f"plan-check seller {i}", "createdAt": now, "updatedAt": now}
+        for i, u in enumerate(users[:n_sellers])
+    ]
+    seller_products = [
+        {"id": _uid(), "sellerId": rng.choice(sellers)["id"], "productId": p["id"], "createdAt": now}
+        for p in products
+    ]
+    orders = [
+        {
+            "id": _uid(),
+            "userId": rng.choice(users)["id"],
+            "paymentIntent": f"pi_{uuid.uuid4().hex}",
+            "paymentStatus": True,
+            "price": 10.0,
+            "status": {"paymentMode": "stripe"},
+            "createdAt": ts(),
+            "updatedAt": now,
+        }
+        for _ in range(n_orders)
+    ]
+    items = [
+        {"id": _uid(), "orderId": o["id"], "productId": rng.choice(products)["id"], "quantity": 1, "unitPrice": 5.0}
+        for o in orders
+        for _ in range(2)
+    ]
+    comments = [
+        {
+            "id": _uid(),
+            "productId": rng.choice(products)["id"],
+            "userId": rng.choice(users)["id"],
+            "content": "plan check",
+            "createdAt": ts(),
+            "updatedAt": now,
+        }
+        for _ in range(n_orders)
+    ]
+    # One review per (product, user) pair, as the unique index requires
+    review_pairs = {(rng.randrange(n_products), rng.randrange(n_users)) for _ in range(n_orders)}
+    reviews = [
+        {
+            "id": _uid(),
+            "productId": products[p]["id"],
+            "userId": users[u]["id"],
+            "rating": rng.randint(1, 5),
+            "description": "plan check",
+            "createdAt": ts(),
+            "updatedAt": now,
+        }
+        for p, u in review_pairs
+    ]
+    addresses = [
+        {
+            "id": _uid(),
+            "userId": u["id"],
+            "line1": "1 Main St",
+            "city": "Springfield",
+            "postalCode": "00000",
+            "country": "US",
+            "isDefault": True,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        for u in users
+    ]
+    for model, rows in [
+        (models.User, users),
+        (models.Category, categories),
+        (models.Product, products),
+        (models.ProductSalesRank, sales_ranks),
+        (models.SellerProfile, sellers),
+        (models.SellerProduct, seller_products),
+        (models.Order, orders),
+        (models.OrderItem, items),
+        (models.Comment, comments),
+        (models.Review, reviews),
+        (models.Address, addresses),
+    ]:
+        for chunk in _chunks(rows):
+            conn.execute(insert(model), chunk)
+    return {
+        "userId": users[0]["id"],
+        "orderIds": [o["id"] for o in orders[:48]],
+        "paymentIntent": orders[0]["paymentIntent"],
+        "productId": products[0]["id"],
+        "categoryId": categories[0]["id"],
+        "sellerId": sellers[0]["id"],
+        "displayName": sellers[0]["displayName"],
+    }
+
+
+def hot_queries(sample: Dict[str, str]) -> List[HotQuery]:
+    """The lookups routers issue, in the shape they issue them."""
+    O, P, R = models.Order, models.Product, models.ProductSalesRank
+    page = 49  # limit + 1, as utils.pagination.paginate fetches
+    return [
+        HotQuery("order by paymentIntent", "Order", select(O).where(O.paymentIntent == sample["paymentIntent"])),
+        HotQuery(
+            "orders of a user, newest first",
+            "Order",
+            select(O).where(O.userId == sample["userId"]).order_by(O.createdAt.desc(), O.id.desc()).limit(page),
+        ),
+        HotQuery("orders, newest first", "Order", select(O).order_by(O.createdAt.desc(), O.id.desc()).limit(page)),
+        HotQuery(
+            "items of a page of orders",
+            "OrderItem",
+            select(models.OrderItem).where(models.OrderItem.orderId.in_(sample["orderIds"])),
+        ),
+        HotQuery(
+            "comments of a product, newest first",
+            "Comment",
+            select(models.Comment)
+            .where(models.Comment.productId == sample["productId"])
+            .order_by(models.Comment.createdAt.desc()),
+        ),
+        HotQuery(
+            "reviews of a product, newest first",
+            "Review",
+            select(models.Review)
+            .where(models.Review.productId == sample["productId"])
+            .order_by(models.Review.createdAt.desc(), models.Review.id.desc())
+            .limit(page),
+        ),
+        HotQuery(
+            "products of a seller",
+            "SellerProduct",
+            select(models.SellerProduct).where(models.SellerProduct.sellerId == sample["sellerId"]),
+        ),
+        HotQuery("addresses of a user", "Address", select(models.Address).where(models.Address.userId == sample["userId"])),
+        HotQuery(
+            "products in a category, newest first",
+            "Product",
+            select(P).where(P.categoryId == sample["categoryId"]).order_by(P.createdAt.desc(), P.id.desc()).limit(page),
+        ),
+        HotQuery(
+            "bestselling products in a category",
+            "ProductSalesRank",
+            select(P.id)
+            .join(R, R.productId == P.id)
+            .where(R.categoryId == sample["categoryId"])
+            .order_by(R.recentUnits.desc(), R.productId.desc())
+            .limit(page),
+        ),
+        HotQuery(
+            "seller by display name",
+            "SellerProfile",
+            select(models.SellerProfile).where(models.SellerProfile.displayName == sample["displayName"]),
+        ),
+    ]
+
+
+def _nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def explain(conn, statement) -> dict:
+    # Inline parameters: expanding IN lists are only rendered at execute time
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    return conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()[0]["Plan"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--orders", type=int, default=20000, help="seeded orders; other tables scale with it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    failures = []
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            sample = seed(conn, args.orders, random.Random(args.seed))
+            for model in SEED_TABLES:
+                conn.execute(text(f'ANALYZE "{model.__tablename__}"'))
+            # Small tables are legitimately cheaper to scan; ask whether an index exists
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for q in hot_queries(sample):
+                plan = explain(conn, q.statement)
+                scans = [n for n in _nodes(plan) if n.get("Relation Name") == q.table]
+                seq = [n for n in scans if n["Node Type"] == "Seq Scan"]
+                # Bitmap Index Scan nodes carry the index but no relation name
+                used = sorted({n["Index Name"] for n in _nodes(plan) if "Index Name" in n})
+                status = "SEQ SCAN" if seq else "ok"
+                print(f"{status:8} {q.name:40} {', '.join(used) or '-'}")
+                if args.verbose or seq:
+                    print(json.dumps(plan, indent=2))
+                if seq:
+                    failures.append(q.name)
+        finally:
+            trans.rollback()
+    if failures:
+        print(f"{len(failures)} hot queries fall back to a sequential scan: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
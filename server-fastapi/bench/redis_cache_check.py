@@ -0,0 +1,121 @@
+"""Exercise the Redis cache backend against a Redis-protocol server.
+
+    python -m bench.redis_cache_check [--url redis://localhost:6379/15]
+
+Without ``--url`` it starts ``bench.fake_redis`` on a free port. Through
+``utils.cache.build_cache`` it checks: misses and hits, the JSON round trip, that
+entries carry the cache TTL and expire after it, invalidation of several keys,
+that prefixes keep the catalog and read-your-writes caches apart (including
+``clear``), that the async methods give the same answers, and that an unreachable
+server counts as a miss instead of raising. Exits with status 1 on any problem.
+Only keys under the check's own prefixes are written; point ``--url`` at a
+scratch database anyway.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from typing import List
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+from bench import fake_redis
+from core import settings
+from utils.cache import Cache, build_cache
+
+PAYLOAD = {"data": [{"id": "p1", "price": 9.5, "tags": ["a", "é"], "stock": None}], "etag": 'W/"x"', "ok": True}
+
+
+def _cache(url: str, prefix: str, ttl: int) -> Cache:
+    settings.CACHE_BACKEND = "redis"
+    settings.REDIS_URL = url
+    return build_cache(ttl=ttl, prefix=prefix)
+
+
+def check(url: str) -> List[str]:
+    problems = []
+
+    def expect(name: str, got, want) -> None:
+        if got != want:
+            problems.append(f"{name}: got {got!r}, expected {want!r}")
+
+    run = uuid.uuid4().hex[:8]
+    catalog = _cache(url, f"bench-{run}:catalog:", ttl=60)
+    writers = _cache(url, f"bench-{run}:ryw:", ttl=60)
+    client = catalog.backend._client
+
+    expect("miss", catalog.get("product:1"), None)
+    catalog.set("product:1", PAYLOAD)
+    expect("json round trip", catalog.get("product:1"), PAYLOAD)
+    expect("counters", (catalog.hits, catalog.misses, catalog.errors), (1, 1, 0))
+    expect("ttl", client.ttl(f"bench-{run}:catalog:product:1"), 60)
+
+    catalog.set("category:1", [1, 2])
+    catalog.set("category:2", "x")
+    catalog.invalidate("category:1", "category:2")
+    expect("invalidate", [catalog.get("category:1"), catalog.get("category:2")], [None, None])
+    expect("invalidations", catalog.invalidations, 2)
+
+    writers.set("product:1", True)
+    expect("prefix isolation", writers.get("product:1"), True)
+    catalog.backend.clear()
+    expect("clear own prefix", catalog.get("product:1"), None)
+    expect("clear keeps other prefixes", writers.get("product:1"), True)
+    writers.backend.clear()
+
+    async def async_path():
+        await catalog.set_async("product:2", PAYLOAD)
+        got = await catalog.get_async("product:2")
+        loaded = await catalog.get_or_load_async("product:3", lambda: asyncio.sleep(0, result=[3]))
+        cached = await catalog.get_async("product:3")
+        await catalog.invalidate_async("product:2", "product:3")
+        return got, loaded, cached, await catalog.get_async("product:2")
+
+    expect("async path", asyncio.run(async_path()), (PAYLOAD, [3], [3], None))
+
+    short = _cache(url, f"bench-{run}:short:", ttl=1)
+    short.set("k", 1)
+    expect("before expiry", short.get("k"), 1)
+    time.sleep(1.5)
+    expect("after expiry", short.get("k"), None)
+    short.backend.clear()
+    expect("stats", (catalog.stats()["backend"], catalog.stats()["size"]), ("redis", None))
+
+    # Nothing listens on port 1: every call fails, and must degrade to a miss
+    # (the expected failures are logged as warnings; keep them out of the report)
+    down = _cache("redis://127.0.0.1:1/0", "bench:", ttl=60)
+    logging.getLogger("utils.cache").disabled = True
+    try:
+        down.set("k", 1)
+        expect("unreachable get", down.get("k"), None)
+        down.invalidate("k")
+    finally:
+        logging.getLogger("utils.cache").disabled = False
+    expect("unreachable errors", down.errors, 3)
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Redis server to test against (default: a local stand-in)")
+    args = parser.parse_args()
+    server = None
+    url = args.url
+    if url is None:
+        server = fake_redis.serve()
+        url = f"redis://127.0.0.1:{server.server_address[1]}/0"
+    try:
+        problems = check(url)
+    finally:
+        if server is not None:
+            server.shutdown()
+    for p in problems:
+        print(p)
+    print("redis cache: " + ("FAILED" if problems else "ok"))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
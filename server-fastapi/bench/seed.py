@@ -0,0 +1,248 @@
+"""Bulk-load a large synthetic dataset with COPY.
+
+    python -m bench.seed --products 1000000 --users 100000 --orders 300000 --comments 500000
+
+Loads categories, users (sellers among them), seller profiles and listings, products
+with JSONB descriptions/images/variants, inventory, zero sales ranks, orders with their
+``OrderItem`` and ``_OrderToProduct`` rows, and comments, streaming every table through
+``COPY ... FROM STDIN``. The product search trigger fires during COPY, so search works
+on the loaded rows. Tables are ANALYZEd afterwards. ``sort=bestselling|trending`` list
+the products in id order until ``python -m utils.sales rebuild`` ranks the seeded orders.
+
+Run it against a dedicated, migrated database (``alembic upgrade head``): rows are
+added to whatever is there, and ``--truncate`` empties every application table first.
+Every seeded user can log in as ``bench-user-<n>@example.com`` with ``PASSWORD``;
+users ``0 .. --sellers - 1`` are sellers. ``bench.load`` picks its accounts and ids
+from the loaded data.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Sequence
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+from db.database import engine
+from db import models
+
+PASSWORD = "bench-password"
+USERNAME = "bench-user-{}@example.com"
+
+WORDS = (
+    "wireless bluetooth headphones noise cancelling portable speaker smart watch fitness "
+    "tracker laptop stand ergonomic keyboard mechanical mouse gaming monitor curved usb "
+    "charger cable organic cotton shirt running shoes leather wallet backpack travel mug "
+    "stainless steel kitchen knife cast iron skillet coffee grinder espresso lamp desk "
+    "garden hose outdoor tent camping stove yoga mat dumbbell water bottle"
+).split()
+COLORS = ["black", "white", "red", "blue", "green", "silver", "gold", "grey"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+
+
+def _uid(rng: random.Random) -> str:
+    # Drawn from the seeded generator, so the same --seed yields the same ids
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def copy_rows(conn, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+    """Stream ``rows`` into ``table`` with COPY; returns the row count."""
+    cols = ", ".join(f'"{c}"' for c in columns)
+    n = 0
+    with conn.cursor() as cur:
+        with cur.copy(f'COPY "{table}" ({cols}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+                n += 1
+    return n
+
+
+class Dataset:
+    """Ids generated up front so dependent tables can reference them while streaming."""
+
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.now = datetime.utcnow()
+        self.category_ids = [_uid(rng) for _ in range(args.categories)]
+        self.user_ids = [_uid(rng) for _ in range(args.users)]
+        self.seller_ids = [_uid(rng) for _ in range(args.sellers)]
+        self.product_ids = [_uid(rng) for _ in range(args.products)]
+        self.prices = [round(rng.uniform(2, 500), 2) for _ in range(args.products)]
+        # Filled in as products() streams, for tables that copy the product's category
+        self.product_categories: List[str] = []
+
+    def ts(self) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randrange(2 * 365 * 86400))
+
+    def title(self) -> str:
+        return " ".join(self.rng.sample(WORDS, 3)).title()
+
+    def categories(self):
+        for i, cid in enumerate(self.category_ids):
+            yield cid, f"Bench category {i}", self.now, self.now
+
+    def users(self, password_hash: str):
+        for i, uid in enumerate(self.user_ids):
+            roles = ["seller"] if i < self.args.sellers else []
+            yield (uid, USERNAME.format(i), password_hash, json.dumps(roles), f"Bench{i}", "User",
+                   False, 0, self.ts(), self.now)
+
+    def sellers(self):
+        for i, sid in enumerate(self.seller_ids):
+            yield sid, self.user_ids[i], f"Bench seller {i}", self.now, self.now
+
+    def products(self):
+        rng = self.rng
+        for pid, price in zip(self.product_ids, self.prices):
+            images = [f"https://img.example.com/{pid}/{k}.jpg" for k in range(rng.randint(1, 5))]
+            variants = [
+                {"sku": f"{pid[:8]}-{c}-{s}", "color": c, "size": s, "price": price}
+                for c in rng.sample(COLORS, 2)
+                for s in rng.sample(SIZES, 2)
+            ]
+            description = [" ".join(rng.choices(WORDS, k=12)) for _ in range(3)]
+            category_id = rng.choice(self.category_ids)
+            self.product_categories.append(category_id)
+            yield (pid, category_id, self.title(), price, round(price * 1.2, 2),
+                   json.dumps(description), json.dumps(rng.sample(COLORS, 3)), json.dumps(images),
+                   json.dumps(variants), self.ts(), self.now)
+
+    def seller_products(self):
+        for pid in self.product_ids:
+            yield _uid(self.rng), self.rng.choice(self.seller_ids), pid, self.now
+
+    def inventory(self):
+        for pid in self.product_ids:
+            yield pid, 1_000_000, self.now
+
+    def sales_ranks(self):
+        # Unsold, as migration 0010 and product creation start every product
+        for pid, category_id in zip(self.product_ids, self.product_categories):
+            yield pid, category_id, 0, 0.0, self.now
+
+    def orders(self, items: List[tuple], links: List[tuple]):
+        """Orders; their item and _OrderToProduct rows are collected into ``items`` / ``links``."""
+        rng = self.rng
+        n_products = len(self.product_ids)
+        for _ in range(self.args.orders):
+            oid = _uid(rng)
+            total = 0.0
+            picked = {rng.randrange(n_products) for _ in range(rng.randint(1, self.args.max_items))}
+            for k in picked:
+                qty = rng.randint(1, 3)
+                total += self.prices[k] * qty
+                items.append((_uid(rng), oid, self.product_ids[k], qty, self.prices[k]))
+                links.append((oid, self.product_ids[k]))
+            created = self.ts()
+            yield (oid, rng.choice(self.user_ids), f"pi_bench_{oid.replace('-', '')}", True,
+                   round(total, 2), json.dumps({"paymentMode": "stripe"}), created, created)
+
+    def comments(self):
+        rng = self.rng
+        for _ in range(self.args.comments):
+            created = self.ts()
+            yield (_uid(rng), rng.choice(self.product_ids), rng.choice(self.user_ids),
+                   " ".join(rng.choices(WORDS, k=rng.randint(5, 25))), created, created)
+
+
+def _timed(label: str, load: Callable[[], int]) -> None:
+    start = time.perf_counter()
+    n = load()
+    elapsed = time.perf_counter() - start
+    print(f"{label:16} {n:>10} rows {elapsed:8.1f} s {n / max(elapsed, 1e-9):>10.0f} rows/s", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--sellers", type=int, default=2_000, help="users 0..N-1 become sellers")
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=300_000)
+    parser.add_argument("--max-items", type=int, default=4, help="max distinct products per order")
+    parser.add_argument("--comments", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truncate", action="store_true", help="empty all application tables first")
+    args = parser.parse_args()
+    if args.sellers > args.users:
+        parser.error("--sellers cannot exceed --users")
+
+    from utils.passwords import pwd_context
+
+    data = Dataset(args, random.Random(args.seed))
+    # One hash for every user: hashing per row would dominate the load
+    password_hash = pwd_context().hash(PASSWORD)
+
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        if args.truncate:
+            tables = ", ".join(f'"{t.name}"' for t in models.Base.metadata.sorted_tables)
+            conn.execute(f"TRUNCATE {tables} CASCADE")
+        _timed("Category", lambda: copy_rows(conn, "Category", ["id", "name", "createdAt", "updatedAt"], data.categories()))
+        _timed(
+            "User",
+            lambda: copy_rows(
+                conn,
+                "User",
+                ["id", "username", "password", "roles", "firstName", "lastName", "isAdmin", "tokenVersion",
+                 "createdAt", "updatedAt"],
+                data.users(password_hash),
+            ),
+        )
+        _timed(
+            "SellerProfile",
+            lambda: copy_rows(conn, "SellerProfile", ["id", "userId", "displayName", "createdAt", "updatedAt"], data.sellers()),
+        )
+        _timed(
+            "Product",
+            lambda: copy_rows(
+                conn,
+                "Product",
+                ["id", "categoryId", "title", "discountPrice", "salePrice", "description", "colors", "images",
+                 "variants", "createdAt", "updatedAt"],
+                data.products(),
+            ),
+        )
+        _timed(
+            "SellerProduct",
+            lambda: copy_rows(conn, "SellerProduct", ["id", "sellerId", "productId", "createdAt"], data.seller_products()),
+        )
+        _timed("Inventory", lambda: copy_rows(conn, "Inventory", ["productId", "stock", "updatedAt"], data.inventory()))
+        _timed(
+            "ProductSalesRank",
+            lambda: copy_rows(
+                conn,
+                "ProductSalesRank",
+                ["productId", "categoryId", "recentUnits", "trendScore", "updatedAt"],
+                data.sales_ranks(),
+            ),
+        )
+        items: List[tuple] = []
+        links: List[tuple] = []
+        _timed(
+            "Order",
+            lambda: copy_rows(
+                conn,
+                "Order",
+                ["id", "userId", "paymentIntent", "paymentStatus", "price", "status", "createdAt", "updatedAt"],
+                data.orders(items, links),
+            ),
+        )
+        _timed("OrderItem", lambda: copy_rows(conn, "OrderItem", ["id", "orderId", "productId", "quantity", "unitPrice"], items))
+        _timed("_OrderToProduct", lambda: copy_rows(conn, "_OrderToProduct", ["A", "B"], links))
+        _timed(
+            "Comment",
+            lambda: copy_rows(conn, "Comment", ["id", "productId", "userId", "content", "createdAt", "updatedAt"], data.comments()),
+        )
+        for table in models.Base.metadata.sorted_tables:
+            conn.execute(f'ANALYZE "{table.name}"')
+        raw.commit()
+    finally:
+        raw.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Hammer a single SKU from many workers and check nothing is oversold.
+
+    python -m bench.stock_contention --workers 32 --attempts 20 --stock 100
+
+Each attempt reserves ``--qty`` units through ``routers.orders.reserve_stock`` in its
+own session and commits. At the end the number of successful reservations must equal
+``stock // qty`` and the remaining stock must be ``stock % qty``; otherwise the script
+exits with status 1. The temporary category/product rows are removed afterwards.
+"""
+import argparse
+import sys
+import threading
+import time
+import uuid
+
+from bench import APP_DIR  # noqa: F401  (puts the app on sys.path)
+from db.database import SessionLocal
+from db import models
+from routers.orders import InsufficientStock, reserve_stock
+
+
+def _setup(stock: int) -> str:
+    db = SessionLocal()
+    try:
+        cat = models.Category(id=str(uuid.uuid4()), name="bench-stock-contention")
+        product = models.Product(
+            id=str(uuid.uuid4()),
+            categoryId=cat.id,
+            title="bench contention sku",
+            discountPrice=1.0,
+            salePrice=1.0,
+            description=[],
+            colors=[],
+            images=[],
+            variants=[],
+        )
+        db.add(cat)
+        db.flush()
+        db.add(product)
+        db.flush()
+        db.add(models.Inventory(productId=product.id, stock=stock))
+        db.commit()
+        return product.id
+    finally:
+        db.close()
+
+
+def _teardown(product_id: str) -> None:
+    db = SessionLocal()
+    try:
+        product = db.get(models.Product, product_id)
+        category_id = product.categoryId
+        db.query(models.Inventory).filter(models.Inventory.productId == product_id).delete()
+        db.delete(product)
+        db.query(models.Category).filter(models.Category.id == category_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(workers: int, attempts: int, stock: int, qty: int) -> bool:
+    product_id = _setup(stock)
+    counts = {"ok": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(workers)
+
+    def worker():
+        start.wait()
+        for _ in range(attempts):
+            db = SessionLocal()
+            try:
+                reserve_stock(db, {product_id: qty})
+                db.commit()
+                outcome = "ok"
+            except InsufficientStock:
+                db.rollback()
+                outcome = "rejected"
+            except Exception as exc:  # deadlocks, serialization failures, ...
+                db.rollback()
+                print(f"worker error: {exc!r}", file=sys.stderr)
+                outcome = "errors"
+            finally:
+                db.close()
+            with lock:
+                counts[outcome] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    db = SessionLocal()
+    try:
+        remaining = db.get(models.Inventory, product_id).stock
+    finally:
+        db.close()
+    _teardown(product_id)
+
+    total = workers * attempts
+    print(
+        f"{total} reservations in {elapsed:.2f}s ({total / elapsed:.0f}/s): "
+        f"ok={counts['ok']} rejected={counts['rejected']} errors={counts['errors']} "
+        f"remaining_stock={remaining}"
+    )
+    expected_ok = min(total, stock // qty)
+    expected_remaining = stock - expected_ok * qty
+    passed = (
+        counts["ok"] == expected_ok and remaining == expected_remaining and counts["errors"] == 0
+    )
+    if not passed:
+        print(f"FAIL: expected ok={expected_ok} remaining_stock={expected_remaining}", file=sys.stderr)
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--attempts", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--qty", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.workers, args.attempts, args.stock, args.qty) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Baseline schema (tables originally created by Prisma).
+
+Databases that already have these tables should be stamped instead of upgraded:
+`alembic stamp 0001_baseline`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "User",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("firstName", sa.String(), nullable=True),
+        sa.Column("lastName", sa.String(), nullable=True),
+        sa.Column("isAdmin", sa.Boolean(), nullable=True),
+        sa.Column("username", sa.String(), nullable=False, unique=True),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("roles", JSONB(), nullable=True),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "Category",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "Product",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("categoryId", sa.String(), sa.ForeignKey("Category.id"), nullable=False),
+        sa.Column("colors", JSONB(), nullable=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("description", JSONB(), nullable=True),
+        sa.Column("discountPrice", sa.Float(), nullable=False),
+        sa.Column("images", JSONB(), nullable=True),
+        sa.Column("salePrice", sa.Float(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("variants", JSONB(), nullable=True),
+    )
+    op.create_table(
+        "Review",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("rating", sa.Integer(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id"), nullable=True),
+        sa.Column("userId", sa.String(), sa.ForeignKey("User.id"), nullable=True),
+    )
+    op.create_table(
+        "Comment",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id"), nullable=False),
+        sa.Column("userId", sa.String(), sa.ForeignKey("User.id"), nullable=False),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "Order",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("paymentIntent", sa.String(), nullable=False),
+        sa.Column("paymentStatus", sa.Boolean(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("status", JSONB(), nullable=True),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("userId", sa.String(), sa.ForeignKey("User.id"), nullable=True),
+    )
+    op.create_table(
+        "SellerProfile",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("userId", sa.String(), sa.ForeignKey("User.id"), nullable=False, unique=True),
+        sa.Column("displayName", sa.String(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "SellerProduct",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("sellerId", sa.String(), sa.ForeignKey("SellerProfile.id"), nullable=False),
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id"), nullable=False, unique=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "Inventory",
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id"), primary_key=True),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "OrderItem",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("orderId", sa.String(), sa.ForeignKey("Order.id"), nullable=False),
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("unitPrice", sa.Float(), nullable=False),
+    )
+    op.create_table(
+        "Address",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("userId", sa.String(), sa.ForeignKey("User.id"), nullable=False),
+        sa.Column("line1", sa.String(), nullable=False),
+        sa.Column("line2", sa.String(), nullable=True),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("state", sa.String(), nullable=True),
+        sa.Column("postalCode", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("isDefault", sa.Boolean(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "_OrderToProduct",
+        sa.Column("A", sa.String(), sa.ForeignKey("Order.id"), primary_key=True),
+        sa.Column("B", sa.String(), sa.ForeignKey("Product.id"), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in [
+        "_OrderToProduct",
+        "Address",
+        "OrderItem",
+        "Inventory",
+        "SellerProduct",
+        "SellerProfile",
+        "Order",
+        "Comment",
+        "Review",
+        "Product",
+        "Category",
+        "User",
+    ]:
+        op.drop_table(table)
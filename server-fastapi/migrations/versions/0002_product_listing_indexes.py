@@ -0,0 +1,41 @@
+"""Product listing keyset indexes.
+
+Revision ID: 0002_product_listing_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_product_listing_indexes"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("Product_createdAt_id_idx", ["createdAt", "id"]),
+    ("Product_discountPrice_id_idx", ["discountPrice", "id"]),
+    ("Product_title_id_idx", ["title", "id"]),
+    ("Product_categoryId_createdAt_id_idx", ["categoryId", "createdAt", "id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name, "Product", columns, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="Product", postgresql_concurrently=True, if_exists=True)
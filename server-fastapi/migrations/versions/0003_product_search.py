@@ -0,0 +1,71 @@
+"""Product full-text search vector, trigger and GIN index.
+
+The column is added empty; fill existing rows in batches afterwards with
+`python -m utils.search backfill` (cwd: server-fastapi/app).
+
+Revision ID: 0003_product_search
+Revises: 0002_product_listing_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_product_search"
+down_revision: Union[str, Sequence[str], None] = "0002_product_listing_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("Product", sa.Column("searchVector", TSVECTOR(), nullable=True))
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW."searchVector" :=
+                setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                setweight(
+                    jsonb_to_tsvector('english', coalesce(NEW.description, '[]'::jsonb), '["string"]'),
+                    'B'
+                );
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER product_search_vector_trg
+        BEFORE INSERT OR UPDATE OF title, description ON "Product"
+        FOR EACH ROW EXECUTE FUNCTION product_search_vector_update()
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "Product_searchVector_idx",
+            "Product",
+            ["searchVector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "Product_searchVector_idx",
+            table_name="Product",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.execute('DROP TRIGGER IF EXISTS product_search_vector_trg ON "Product"')
+    op.execute("DROP FUNCTION IF EXISTS product_search_vector_update()")
+    op.drop_column("Product", "searchVector")
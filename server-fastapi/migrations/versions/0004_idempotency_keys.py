@@ -0,0 +1,41 @@
+"""Idempotency keys for POST /api/orders.
+
+Revision ID: 0004_idempotency_keys
+Revises: 0003_product_search
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_idempotency_keys"
+down_revision: Union[str, Sequence[str], None] = "0003_product_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "IdempotencyKey",
+        sa.Column("scope", sa.String(), primary_key=True),
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("requestHash", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("responseCode", sa.Integer(), nullable=True),
+        sa.Column("responseBody", JSONB(), nullable=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("lockedUntil", sa.DateTime(), nullable=True),
+        sa.Column("expiresAt", sa.DateTime(), nullable=False),
+    )
+    op.create_index("IdempotencyKey_expiresAt_idx", "IdempotencyKey", ["expiresAt"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("IdempotencyKey_expiresAt_idx", table_name="IdempotencyKey")
+    op.drop_table("IdempotencyKey")
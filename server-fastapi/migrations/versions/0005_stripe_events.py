@@ -0,0 +1,41 @@
+"""Stripe webhook event log.
+
+Revision ID: 0005_stripe_events
+Revises: 0004_idempotency_keys
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_stripe_events"
+down_revision: Union[str, Sequence[str], None] = "0004_idempotency_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "StripeEvent",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("paymentIntent", sa.String(), nullable=True),
+        sa.Column("receivedAt", sa.DateTime(), nullable=False),
+        sa.Column("processedAt", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "StripeEvent_unprocessed_idx",
+        "StripeEvent",
+        ["receivedAt"],
+        postgresql_where=sa.text('"processedAt" IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("StripeEvent_unprocessed_idx", table_name="StripeEvent")
+    op.drop_table("StripeEvent")
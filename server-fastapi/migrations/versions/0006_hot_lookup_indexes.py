@@ -0,0 +1,44 @@
+"""Indexes for hot lookup columns.
+
+Revision ID: 0006_hot_lookup_indexes
+Revises: 0005_stripe_events
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_hot_lookup_indexes"
+down_revision: Union[str, Sequence[str], None] = "0005_stripe_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Product.categoryId is already served by Product_categoryId_createdAt_id_idx (0002).
+INDEXES = [
+    ("Order_paymentIntent_idx", "Order", ["paymentIntent"]),
+    ("Order_userId_createdAt_id_idx", "Order", ["userId", "createdAt", "id"]),
+    ("Order_createdAt_id_idx", "Order", ["createdAt", "id"]),
+    ("OrderItem_orderId_idx", "OrderItem", ["orderId"]),
+    ("Comment_productId_createdAt_id_idx", "Comment", ["productId", "createdAt", "id"]),
+    ("SellerProduct_sellerId_idx", "SellerProduct", ["sellerId"]),
+    ("Address_userId_idx", "Address", ["userId"]),
+    ("SellerProfile_displayName_idx", "SellerProfile", ["displayName"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,30 @@
+"""Per-user token version for revoking issued JWTs.
+
+Revision ID: 0007_user_token_version
+Revises: 0006_hot_lookup_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_user_token_version"
+down_revision: Union[str, Sequence[str], None] = "0006_hot_lookup_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant default: no table rewrite on Postgres 11+
+    op.add_column(
+        "User", sa.Column("tokenVersion", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("User", "tokenVersion")
@@ -0,0 +1,64 @@
+"""Review aggregates per product, and review indexes.
+
+Revision ID: 0008_product_ratings
+Revises: 0007_user_token_version
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_product_ratings"
+down_revision: Union[str, Sequence[str], None] = "0007_user_token_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The unique index fails if a user already has two reviews of one product; remove
+# the duplicates first.
+INDEXES = [
+    ("Review_productId_userId_key", ["productId", "userId"], True),
+    ("Review_productId_createdAt_id_idx", ["productId", "createdAt", "id"], False),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ProductRating",
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("reviewCount", sa.Integer(), nullable=False),
+        sa.Column("ratingSum", sa.Integer(), nullable=False),
+        *[sa.Column(f"stars{n}", sa.Integer(), nullable=False) for n in range(1, 6)],
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    # Backfill from existing reviews; the same statement as utils.reviews.rebuild
+    op.execute(
+        """
+        INSERT INTO "ProductRating"
+            ("productId", "reviewCount", "ratingSum", stars1, stars2, stars3, stars4, stars5, "updatedAt")
+        SELECT "productId", count(*), sum(rating),
+               count(*) FILTER (WHERE rating = 1), count(*) FILTER (WHERE rating = 2),
+               count(*) FILTER (WHERE rating = 3), count(*) FILTER (WHERE rating = 4),
+               count(*) FILTER (WHERE rating = 5), now() AT TIME ZONE 'utc'
+        FROM "Review"
+        WHERE "productId" IS NOT NULL AND rating BETWEEN 1 AND 5
+        GROUP BY "productId"
+        """
+    )
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, columns, unique in INDEXES:
+            op.create_index(
+                name, "Review", columns, unique=unique, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name="Review", postgresql_concurrently=True, if_exists=True)
+    op.drop_table("ProductRating")
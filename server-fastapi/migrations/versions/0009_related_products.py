@@ -0,0 +1,50 @@
+"""Frequently-bought-together neighbours and batch job checkpoints.
+
+Revision ID: 0009_related_products
+Revises: 0008_product_ratings
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_related_products"
+down_revision: Union[str, Sequence[str], None] = "0008_product_ratings"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "RelatedProduct",
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("relatedIds", ARRAY(sa.String()), nullable=False),
+        sa.Column("scores", ARRAY(sa.REAL()), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "JobCheckpoint",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("position", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    # Databases created by Prisma already have it under this name
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "_OrderToProduct_B_index", "_OrderToProduct", ["B"], postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "_OrderToProduct_B_index", table_name="_OrderToProduct", postgresql_concurrently=True, if_exists=True
+        )
+    op.drop_table("JobCheckpoint")
+    op.drop_table("RelatedProduct")
@@ -0,0 +1,61 @@
+"""Daily sales rollups and bestselling / trending ranking keys.
+
+Revision ID: 0010_sales_rollups
+Revises: 0009_related_products
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_sales_rollups"
+down_revision: Union[str, Sequence[str], None] = "0009_related_products"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RANK_INDEXES = [
+    ("ProductSalesRank_recentUnits_productId_idx", ["recentUnits", "productId"]),
+    ("ProductSalesRank_categoryId_recentUnits_productId_idx", ["categoryId", "recentUnits", "productId"]),
+    ("ProductSalesRank_trendScore_productId_idx", ["trendScore", "productId"]),
+    ("ProductSalesRank_categoryId_trendScore_productId_idx", ["categoryId", "trendScore", "productId"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ProductSalesDaily",
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("units", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "ProductSalesRank",
+        sa.Column("productId", sa.String(), sa.ForeignKey("Product.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("categoryId", sa.String(), nullable=True),
+        sa.Column("recentUnits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("trendScore", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+    )
+    # Every product starts unranked, so the sales orderings list the whole catalog
+    # until the first `python -m utils.sales rebuild` fills in the counts
+    op.execute(
+        'INSERT INTO "ProductSalesRank" ("productId", "categoryId", "updatedAt") '
+        'SELECT id, "categoryId", now() AT TIME ZONE \'utc\' FROM "Product"'
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ProductSalesDaily_day_idx", "ProductSalesDaily", ["day"], postgresql_concurrently=True, if_not_exists=True
+        )
+        for name, columns in RANK_INDEXES:
+            op.create_index(name, "ProductSalesRank", columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("ProductSalesRank")
+    op.drop_table("ProductSalesDaily")